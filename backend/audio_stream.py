@@ -0,0 +1,255 @@
+# backend/audio_stream.py
+
+import collections
+import logging
+import queue
+import threading
+
+import ffmpeg
+import numpy as np
+
+from vad import transcribe_speech
+
+SAMPLE_RATE = 16000
+
+# Segment with timestamps on the original recording's timeline; the speaker is
+# set on segments read back after diarization
+TimedSegment = collections.namedtuple(
+    "TimedSegment", ["start", "end", "text", "avg_logprob", "no_speech_prob", "speaker"], defaults=(None,)
+)
+
+# A media file whose decoded s16le PCM pcm_stream() also hands to `sink`, a
+# pcm_cache.CacheFill, so the PCM cache is filled by the decode the model reads
+DecodeTee = collections.namedtuple("DecodeTee", ["path", "sink"])
+
+_END_OF_STREAM = object()
+
+
+class PCMStream:
+    """
+    Decodes a media file with ffmpeg into 16 kHz mono float32 PCM and hands it out
+    in fixed-size blocks through a bounded queue. The decoder thread runs ahead of
+    the consumer by at most `max_blocks` blocks, which caps the memory used.
+    Decoding begins `start` seconds into the file. A `sink` gets every decoded
+    chunk as s16le bytes and is committed once ffmpeg has decoded to the end,
+    or discarded if it failed or the stream was closed first.
+    """
+
+    def __init__(self, path, block_seconds=30, max_blocks=8, start=0.0, sink=None):
+        self.path = path
+        self.start_seconds = start
+        self.sink = sink
+        self.block_bytes = int(block_seconds * SAMPLE_RATE) * 2  # s16le samples
+        self._queue = queue.Queue(maxsize=max_blocks)
+        self._closed = threading.Event()
+        self._process = None
+        self._thread = None
+        self._error = None
+
+    def start(self):
+        self._process = (
+            ffmpeg.input(self.path, **({"ss": self.start_seconds} if self.start_seconds else {}))
+            .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar="16k")
+            .global_args("-nostdin", "-loglevel", "error")
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _read(self):
+        try:
+            while not self._closed.is_set():
+                data = self._process.stdout.read(self.block_bytes)
+                if not data:
+                    break
+                data = data[: len(data) - len(data) % 2]
+                if self.sink:
+                    self.sink.write(data)
+                block = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+                self._put(block)
+            stderr = self._process.stderr.read()
+            if self._process.wait() != 0 and not self._closed.is_set():
+                message = stderr.decode("utf-8", errors="replace").strip()
+                self._error = RuntimeError(f"ffmpeg failed to decode {self.path}: {message}")
+        except Exception as e:
+            self._error = e
+        finally:
+            if self.sink:
+                if self._error or self._closed.is_set():
+                    self.sink.discard()
+                else:
+                    self.sink.commit()
+            self._put(_END_OF_STREAM)
+
+    def __iter__(self):
+        while True:
+            block = self._queue.get()
+            if block is _END_OF_STREAM:
+                if self._error:
+                    raise self._error
+                return
+            yield block
+
+    def close(self):
+        self._closed.set()
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ArrayStream:
+    """
+    Hands out already decoded s16le PCM, e.g. a memory-mapped PCMCache file, in
+    float32 blocks with the same interface as PCMStream. Only the block being
+    converted is read into memory.
+    """
+
+    def __init__(self, samples, block_seconds=30):
+        self.samples = samples
+        self.block_samples = int(block_seconds * SAMPLE_RATE)
+
+    def __iter__(self):
+        for start in range(0, len(self.samples), self.block_samples):
+            yield self.samples[start : start + self.block_samples].astype(np.float32) / 32768.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def pcm_stream(source, block_seconds=30, max_blocks=8, start=0.0):
+    """
+    Returns an ArrayStream for decoded int16 samples, or a PCMStream that decodes
+    a media file path or DecodeTee with ffmpeg, beginning `start` seconds in.
+    """
+    if isinstance(source, np.ndarray):
+        return ArrayStream(source[int(start * SAMPLE_RATE) :], block_seconds)
+    if isinstance(source, DecodeTee):
+        return PCMStream(source.path, block_seconds, max_blocks, start, sink=source.sink)
+    return PCMStream(source, block_seconds, max_blocks, start)
+
+
+def quiet_cut(audio, target, search_seconds):
+    """
+    Returns a sample index close to `target` that falls in the quietest 100 ms frame
+    of the preceding `search_seconds`, so windows are not cut in the middle of a word.
+    """
+    frame = SAMPLE_RATE // 10
+    start = max(0, target - int(search_seconds * SAMPLE_RATE))
+    frames = (target - start) // frame
+    if frames == 0:
+        return target
+    energy = np.square(audio[start : start + frames * frame].reshape(frames, frame)).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_windows(blocks, window_seconds, search_seconds=5.0):
+    """
+    Groups PCM blocks into windows of roughly `window_seconds` and yields
+    (offset_seconds, samples) pairs. The remainder after each cut is carried over
+    into the next window.
+    """
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    pending = []
+    pending_samples = 0
+    offset = 0
+
+    for block in blocks:
+        pending.append(block)
+        pending_samples += len(block)
+        if pending_samples < window_samples:
+            continue
+
+        audio = np.concatenate(pending)
+        cut = quiet_cut(audio, window_samples, search_seconds)
+        yield offset / SAMPLE_RATE, audio[:cut]
+
+        rest = audio[cut:].copy()
+        pending = [rest] if len(rest) else []
+        pending_samples = len(rest)
+        offset += cut
+
+    if pending_samples:
+        yield offset / SAMPLE_RATE, np.concatenate(pending)
+
+
+def transcribe_stream(
+    model,
+    source,
+    window_seconds=300,
+    buffer_seconds=240,
+    stats=None,
+    speech_filter=None,
+    start=0.0,
+    **options,
+):
+    """
+    Streams a media file through ffmpeg and transcribes it window by window, so
+    decoding of the next window overlaps with inference on the current one and no
+    WAV file is written. `source` may also be decoded int16 samples, which skip
+    ffmpeg. Yields TimedSegment objects on the original timeline.
+
+    The language detected in the first window is reused for the following ones and
+    the tail of the previous window is passed as the initial prompt. With a
+    `speech_filter` only the speech in each window reaches the model. Transcription
+    begins `start` seconds in, e.g. to resume a job. If a `stats` dict is given it
+    is filled with 'language', 'duration' and 'speech_seconds'.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("duration", start)
+    stats.setdefault("speech_seconds", 0.0)
+    block_seconds = 30
+    max_blocks = max(1, int(buffer_seconds // block_seconds))
+    previous_text = ""
+
+    with pcm_stream(source, block_seconds=block_seconds, max_blocks=max_blocks, start=start) as stream:
+        for offset, audio in iter_windows(stream, window_seconds):
+            offset += start
+            window_options = dict(options)
+            if stats.get("language") and "language" not in options:
+                window_options["language"] = stats["language"]
+            if previous_text and "initial_prompt" not in options:
+                window_options["initial_prompt"] = previous_text[-200:]
+
+            segments, info, speech_seconds = transcribe_speech(
+                model, audio, speech_filter, **window_options
+            )
+            if info is not None:
+                stats.setdefault("language", info.language)
+            stats["duration"] = offset + len(audio) / SAMPLE_RATE
+            stats["speech_seconds"] += speech_seconds
+
+            window_text = []
+            for segment in segments:
+                window_text.append(segment.text)
+                yield TimedSegment(
+                    start=offset + segment.start,
+                    end=offset + segment.end,
+                    text=segment.text,
+                    avg_logprob=segment.avg_logprob,
+                    no_speech_prob=segment.no_speech_prob,
+                )
+            previous_text = "".join(window_text).strip() or previous_text
+            logging.info(
+                f"[Worker] Transcribed window at {offset:.0f}s ({len(audio) / SAMPLE_RATE:.0f}s of audio)."
+            )
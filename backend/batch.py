@@ -0,0 +1,324 @@
+# backend/batch.py
+
+import concurrent.futures
+import glob
+import logging
+import os
+import time
+import uuid
+
+from ingest import INGEST_LEDGER_TABLE, link_or_copy
+from media_cache import hash_file
+from progress import probe_duration
+from storage import connect, transaction
+
+
+def collect_inputs(sources, is_supported, manifest=None):
+    """
+    Returns the absolute paths of the media files named by `sources`, sorted and
+    without duplicates. Directories are searched recursively and anything else
+    is expanded as a glob, where '**' matches subdirectories. A manifest lists
+    one path or glob per line; blank lines and '#' comments are skipped and
+    relative entries are taken from the manifest's folder.
+    """
+    sources = list(sources)
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    sources.append(os.path.join(base, os.path.expanduser(line)))
+
+    paths = set()
+    for source in sources:
+        source = os.path.expanduser(source)
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                paths.update(os.path.join(root, name) for name in files if is_supported(name))
+            continue
+        matches = [path for path in glob.glob(source, recursive=True) if os.path.isfile(path)]
+        if not matches:
+            logging.warning(f"[Batch] No files match {source}")
+        for path in matches:
+            if is_supported(path):
+                paths.add(path)
+            else:
+                logging.warning(f"[Batch] Skipping unsupported file {path}")
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def probe_file(path):
+    """
+    Returns (content_hash, duration) of a media file; run on the thread pool.
+    The duration only feeds the ETA, so it is None if ffprobe is missing.
+    """
+    content_hash = hash_file(path)
+    try:
+        return content_hash, probe_duration(path)
+    except OSError as e:
+        logging.warning(f"[Batch] Could not probe the duration of {path}: {e}")
+        return content_hash, None
+
+
+class BatchRefused(Exception):
+    pass
+
+
+class BatchImporter:
+    """
+    Queues a whole archive of files in the shared transcriptions table. Inputs
+    are hashed and probed in parallel, linked into the upload folder like
+    watch-folder files and registered in one transaction. Every source path is
+    recorded in the ingest_ledger table, so running the same batch again after an
+    interruption only checks which jobs are left: completed files are skipped
+    without being hashed again and failed ones are queued once more. If
+    `admit` returns a reason for the bytes that will be copied rather than
+    linked, nothing is queued and BatchRefused is raised.
+    """
+
+    def __init__(self, db_path, upload_folder, priority=0, profile=None, threads=None, admit=None):
+        self.db_path = db_path
+        self.upload_folder = upload_folder
+        self.priority = priority
+        self.profile = profile
+        self.threads = threads or min(32, (os.cpu_count() or 1) * 2)
+        self.admit = admit
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.db_path)
+        return self._conn
+
+    def ensure_schema(self):
+        conn = self._connection()
+        conn.execute(INGEST_LEDGER_TABLE)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_jobs (transcription_id TEXT PRIMARY KEY)")
+
+    def _link(self, path):
+        name, extension = os.path.splitext(os.path.basename(path))
+        unique_id = uuid.uuid4().hex
+        filename = f"{name}_{unique_id}{extension}"
+        link_or_copy(path, os.path.join(self.upload_folder, filename))
+        return unique_id, filename
+
+    def register(self, paths, cancel=None):
+        """
+        Queues the files that are not queued yet and returns the counts of
+        queued, requeued (failed before), skipped (already queued or done) and
+        unreadable files. All jobs of the batch are tracked by progress(). If the
+        `cancel` event is set while the files are hashed, nothing is queued and
+        None is returned.
+        """
+        conn = self._connection()
+        counts = {"queued": 0, "requeued": 0, "skipped": 0, "unreadable": 0}
+        ledger = {
+            path: (size, mtime, transcription_id)
+            for path, size, mtime, transcription_id in conn.execute(
+                """
+                SELECT l.path, l.size, l.mtime, l.transcription_id
+                FROM ingest_ledger l JOIN transcriptions t ON t.id = l.transcription_id
+                WHERE t.profile IS ?
+                """,
+                (self.profile,),
+            )
+        }
+
+        # Files recorded with the same size and mtime are not read again
+        known, new, devices = {}, [], {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                logging.error(f"[Batch] Cannot read {path}: {e}")
+                counts["unreadable"] += 1
+                continue
+            entry = ledger.get(path)
+            if entry and entry[:2] == (stat.st_size, stat.st_mtime):
+                known[path] = entry[2]
+            else:
+                new.append((path, stat.st_size, stat.st_mtime))
+                devices[path] = stat.st_dev
+
+        probed = {}
+        if new:
+            logging.info(f"[Batch] Hashing and probing {len(new)} file(s) on {self.threads} thread(s).")
+            started = time.monotonic()
+            with concurrent.futures.ThreadPoolExecutor(self.threads) as executor:
+                futures = {executor.submit(probe_file, path): path for path, _, _ in new}
+                for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                    try:
+                        probed[futures[future]] = future.result()
+                    except OSError as e:
+                        logging.error(f"[Batch] Cannot read {futures[future]}: {e}")
+                        counts["unreadable"] += 1
+                    if done % 100 == 0:
+                        logging.info(f"[Batch] Probed {done}/{len(new)} file(s).")
+                    if cancel is not None and cancel.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        return None
+            logging.info(f"[Batch] Probed {len(probed)} file(s) in {time.monotonic() - started:.1f}s.")
+
+        # Same content with this batch's profile uploaded or imported before, or twice in this batch
+        existing = {}
+        for path, (content_hash, _) in probed.items():
+            row = conn.execute(
+                """
+                SELECT id FROM transcriptions WHERE content_hash = ? AND profile IS ?
+                ORDER BY status = 'failed' LIMIT 1
+                """,
+                (content_hash, self.profile),
+            ).fetchone()
+            if row:
+                existing[content_hash] = row[0]
+
+        if self.admit and new:
+            # Files on the upload folder's filesystem are linked for free; the rest are copied
+            upload_device = os.stat(self.upload_folder).st_dev
+            incoming, hashes = 0, set(existing)
+            for path, size, _ in new:
+                if path in probed and probed[path][0] not in hashes:
+                    hashes.add(probed[path][0])
+                    if devices[path] != upload_device:
+                        incoming += size
+            reason = self.admit(incoming)
+            if reason:
+                raise BatchRefused(reason)
+
+        jobs, ledger_rows, linked = [], [], []
+        now = time.time()
+        try:
+            for path, size, mtime in new:
+                if path not in probed:
+                    continue
+                content_hash, duration = probed[path]
+                transcription_id = existing.get(content_hash)
+                if transcription_id is None:
+                    transcription_id, filename = self._link(path)
+                    linked.append(filename)
+                    existing[content_hash] = transcription_id
+                    jobs.append((transcription_id, filename, self.priority, content_hash, self.profile, duration))
+                known[path] = transcription_id
+                ledger_rows.append((path, size, mtime, content_hash, transcription_id, now))
+
+            with transaction(conn):
+                conn.executemany(
+                    """
+                    INSERT INTO transcriptions (id, filename, status, priority, content_hash, profile, audio_seconds)
+                    VALUES (?, ?, 'pending', ?, ?, ?, ?)
+                    """,
+                    jobs,
+                )
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO ingest_ledger
+                        (path, size, mtime, content_hash, transcription_id, ingested_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    ledger_rows,
+                )
+                counts["requeued"] = self._requeue_failed(conn, known)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO batch_jobs (transcription_id) VALUES (?)",
+                    [(transcription_id,) for transcription_id in set(known.values())],
+                )
+        except BaseException:
+            for filename in linked:
+                os.remove(os.path.join(self.upload_folder, filename))
+            raise
+        counts["queued"] = len(jobs)
+        counts["skipped"] = len(known) - len(jobs) - counts["requeued"]
+        return counts
+
+    def _requeue_failed(self, conn, sources):
+        """
+        Puts failed jobs of the batch back in the queue, linking the source again
+        if its upload was removed. Runs inside register()'s transaction.
+        """
+        requeued = 0
+        for path, transcription_id in sources.items():
+            row = conn.execute(
+                "SELECT filename FROM transcriptions WHERE id = ? AND status = 'failed'", (transcription_id,)
+            ).fetchone()
+            if not row:
+                continue
+            filename = row[0]
+            if not os.path.exists(os.path.join(self.upload_folder, filename)):
+                _, filename = self._link(path)
+            conn.execute(
+                """
+                UPDATE transcriptions
+                SET status = 'pending', filename = ?, priority = ?, profile = COALESCE(?, profile),
+                    attempts = 0
+                WHERE id = ?
+                """,
+                (filename, self.priority, self.profile, transcription_id),
+            )
+            requeued += 1
+        return requeued
+
+    def progress(self):
+        """
+        Returns the number of jobs in the batch, how many completed and failed,
+        how many have no known duration yet, and the audio seconds of all jobs
+        and of the finished ones.
+        """
+        total, completed, failed, unprobed, seconds, finished_seconds = self._connection().execute(
+            """
+            SELECT COUNT(*),
+                   COALESCE(SUM(t.status = 'completed'), 0),
+                   COALESCE(SUM(t.status = 'failed'), 0),
+                   COALESCE(SUM(t.audio_seconds IS NULL), 0),
+                   COALESCE(SUM(t.audio_seconds), 0),
+                   COALESCE(SUM(CASE WHEN t.status IN ('completed', 'failed') THEN t.audio_seconds END), 0)
+            FROM temp.batch_jobs b JOIN transcriptions t ON t.id = b.transcription_id
+            """
+        ).fetchone()
+        return {
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "unprobed": unprobed,
+            "audio_seconds": seconds,
+            "finished_audio_seconds": finished_seconds,
+        }
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class BatchProgress:
+    """
+    Turns successive progress() snapshots into a status line with an ETA from
+    the audio finished since the batch started or, if some durations could not
+    be probed, from the number of files.
+    """
+
+    def __init__(self, initial):
+        self.initial = initial
+        self.started = time.monotonic()
+        self.by_audio = initial["unprobed"] == 0 and initial["audio_seconds"] > 0
+
+    def line(self, current):
+        finished = current["completed"] + current["failed"]
+        elapsed = time.monotonic() - self.started
+        if self.by_audio:
+            done = current["finished_audio_seconds"] - self.initial["finished_audio_seconds"]
+            left = current["audio_seconds"] - current["finished_audio_seconds"]
+        else:
+            done = finished - self.initial["completed"] - self.initial["failed"]
+            left = current["total"] - finished
+        eta = format_duration(left * elapsed / done) if done > 0 and left > 0 else "-"
+        line = f"[Batch] {finished}/{current['total']} file(s) done, {current['failed']} failed"
+        if self.by_audio:
+            line += (
+                f", {format_duration(current['finished_audio_seconds'])}"
+                f" of {format_duration(current['audio_seconds'])} audio"
+            )
+        return f"{line}, elapsed {format_duration(elapsed)}, ETA {eta}"
@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_chunked.py
+"""
+Measures wall-clock speedup of chunked parallel transcription against core count
+on a fixed local clip:
+
+    python benchmarks/bench_chunked.py path/to/clip.wav --model small --cores 1 2 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from faster_whisper import WhisperModel  # noqa: E402
+
+from chunked import ChunkedTranscriber  # noqa: E402
+
+
+def run_sequential(clip, model_name, cores, options):
+    model = WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=cores)
+    start = time.perf_counter()
+    segments, info = model.transcribe(clip, **options)
+    count = sum(1 for _ in segments)
+    return time.perf_counter() - start, count, info.duration
+
+
+def run_chunked(clip, model_name, cores, window_seconds, options):
+    transcriber = ChunkedTranscriber(
+        model_name,
+        compute_type="int8",
+        workers=cores,
+        cpu_threads=1,
+        window_seconds=window_seconds,
+    )
+    try:
+        # Start every worker and load its model before timing
+        executor = transcriber._get_executor()
+        for future in [executor.submit(time.sleep, 0.5) for _ in range(cores)]:
+            future.result()
+        start = time.perf_counter()
+        count = sum(1 for _ in transcriber.transcribe(clip, **options))
+        return time.perf_counter() - start, count
+    finally:
+        transcriber.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clip", help="Local audio or video file used for every run")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--cores", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--window-seconds", type=float, default=60)
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    options = {"beam_size": args.beam_size}
+    cores_list = sorted(set(args.cores))
+
+    baseline, baseline_segments, duration = run_sequential(args.clip, args.model, cores_list[0], options)
+    print(f"Clip duration: {duration:.1f}s, model: {args.model}")
+    print(f"{'mode':<12}{'cores':>6}{'wall (s)':>10}{'RTF':>8}{'speedup':>9}{'segments':>10}")
+    print(f"{'sequential':<12}{cores_list[0]:>6}{baseline:>10.1f}{baseline / duration:>8.3f}{1.0:>9.2f}{baseline_segments:>10}")
+
+    results = {"clip": args.clip, "duration": duration, "model": args.model, "baseline": baseline, "runs": []}
+    for cores in cores_list:
+        elapsed, count = run_chunked(args.clip, args.model, cores, args.window_seconds, options)
+        speedup = baseline / elapsed
+        print(f"{'chunked':<12}{cores:>6}{elapsed:>10.1f}{elapsed / duration:>8.3f}{speedup:>9.2f}{count:>10}")
+        results["runs"].append({"cores": cores, "wall_seconds": elapsed, "speedup": speedup, "segments": count})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# backend/benchmarks/bench_diarization.py
+"""
+Measures the diarization stage on a synthetic conversation with known speakers:
+
+    python benchmarks/bench_diarization.py --seconds 1800 --speakers 3
+    python benchmarks/bench_diarization.py --model wespeaker_resnet34.onnx --whisper-model small
+
+Voices are pulse trains at different pitches through different formant filters,
+taking turns of 3-10 seconds with short pauses. The report has the time to
+embed and cluster the audio, a re-run served from the embedding cache, the
+number of speakers found and the share of segments labelled with the right
+speaker. With --whisper-model the clip is also transcribed alone and again
+with diarization on a thread next to it, as in the service, which gives the
+wall-clock time diarization adds to a job.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.signal import lfilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_stream import SAMPLE_RATE  # noqa: E402
+from diarization import Diarizer, EmbeddingCache, OnnxEmbedder, SpectralEmbedder, assign_speakers  # noqa: E402
+from vad import SpeechFilter  # noqa: E402
+
+# Pitch and first three formants of each synthetic voice
+VOICES = [
+    (110, (730, 1090, 2440)),
+    (220, (270, 2290, 3010)),
+    (160, (530, 1840, 2480)),
+    (250, (660, 1720, 2410)),
+    (130, (300, 870, 2240)),
+    (190, (440, 1020, 2240)),
+]
+
+
+def voice(rng, speaker, seconds):
+    f0, formants = VOICES[speaker]
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, 6)))
+    pulses = np.diff(np.floor(np.cumsum(pitch) / SAMPLE_RATE), prepend=0.0)
+    signal = pulses
+    for frequency in formants:
+        radius = np.exp(-np.pi * 80 / SAMPLE_RATE)
+        theta = 2 * np.pi * frequency / SAMPLE_RATE
+        signal = lfilter([1.0], [1.0, -2 * radius * np.cos(theta), radius**2], signal)
+    syllables = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t + rng.uniform(0, 6)) ** 2
+    signal = signal * syllables
+    return (signal / np.abs(signal).max() * 0.3).astype(np.float32)
+
+
+def conversation(seconds, speakers, seed=1):
+    """
+    Returns int16 samples of a conversation of about `seconds` and its turns as
+    (start, end, speaker).
+    """
+    rng = np.random.default_rng(seed)
+    parts, turns, position, previous = [], [], 0.0, -1
+    while position < seconds:
+        speaker = int(rng.integers(speakers))
+        while speakers > 1 and speaker == previous:
+            speaker = int(rng.integers(speakers))
+        previous = speaker
+        pause, length = rng.uniform(0.3, 1.0), rng.uniform(3, 10)
+        parts.append(np.zeros(int(pause * SAMPLE_RATE), dtype=np.float32))
+        parts.append(voice(rng, speaker, length))
+        turns.append((position + pause, position + pause + length, speaker))
+        position += pause + length
+    audio = np.concatenate(parts)
+    audio += 0.002 * rng.standard_normal(len(audio)).astype(np.float32)
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16), turns
+
+
+def segments_of(turns, length=5.0):
+    """
+    Splits the true turns into Whisper-like segments of at most `length` seconds.
+    """
+    segments = []
+    for start, end, speaker in turns:
+        while start < end:
+            segments.append((start, min(end, start + length), speaker))
+            start += length
+    return np.array(segments)
+
+
+def accuracy(truth, found):
+    """
+    Share of segments labelled right under the best mapping of found speakers
+    to true ones.
+    """
+    matrix = np.zeros((truth.max() + 1, max(found.max(), 0) + 1))
+    np.add.at(matrix, (truth, np.maximum(found, 0)), found >= 0)
+    rows, columns = linear_sum_assignment(-matrix)
+    return matrix[rows, columns].sum() / len(truth)
+
+
+def transcribe_wall_time(model, audio, diarizer=None):
+    """
+    Transcribes the clip, with the diarizer running on a thread next to it if
+    given, and returns the wall time until both are done.
+    """
+    started = time.perf_counter()
+    thread = None
+    if diarizer:
+        thread = threading.Thread(target=diarizer.run, args=(audio,))
+        thread.start()
+    segments, _ = model.transcribe(audio.astype(np.float32) / 32768.0, beam_size=1)
+    for _ in segments:
+        pass
+    if thread:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1800, help="Length of the conversation")
+    parser.add_argument("--speakers", type=int, default=3, choices=range(1, len(VOICES) + 1))
+    parser.add_argument("--model", help="ONNX speaker embedding model; spectral statistics without one")
+    parser.add_argument("--threads", type=int, default=1, help="onnxruntime threads")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--max-speakers", type=int, default=0)
+    parser.add_argument("--whisper-model", help="Also measure the time diarization adds next to this model")
+    parser.add_argument("--whisper-threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    audio, turns = conversation(args.seconds, args.speakers)
+    duration = len(audio) / SAMPLE_RATE
+    segments = segments_of(turns)
+    embedder = OnnxEmbedder(args.model, args.threads) if args.model else SpectralEmbedder()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        diarizer = Diarizer(
+            embedder,
+            SpeechFilter("energy", min_silence_seconds=0.2, pad_seconds=0.0),
+            threshold=args.threshold,
+            max_speakers=args.max_speakers,
+            cache=EmbeddingCache(tmp, 2**30),
+        )
+        started = time.perf_counter()
+        found = diarizer.run(audio, "bench")
+        cold_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        diarizer.run(audio, "bench")
+        cached_seconds = time.perf_counter() - started
+
+    labels = assign_speakers(segments[:, 0], segments[:, 1], found)
+    result = {
+        "audio_seconds": duration,
+        "speakers": args.speakers,
+        "embedder": embedder.name,
+        "diarization_seconds": cold_seconds,
+        "realtime_factor": cold_seconds / duration,
+        "cached_seconds": cached_seconds,
+        "speakers_found": len(set(found[2].tolist())),
+        "turns_found": len(found[0]),
+        "segment_accuracy": accuracy(segments[:, 2].astype(np.int64), labels),
+    }
+    print(
+        f"{duration:.0f}s of audio, {args.speakers} speaker(s), {embedder.name} embeddings\n"
+        f"diarization    {cold_seconds:.2f}s (RTF {result['realtime_factor']:.4f})\n"
+        f"cached re-run  {cached_seconds:.2f}s\n"
+        f"speakers found {result['speakers_found']} in {result['turns_found']} turn(s), "
+        f"{result['segment_accuracy']:.1%} of segments labelled right"
+    )
+
+    if args.whisper_model:
+        from faster_whisper import WhisperModel
+
+        model = WhisperModel(args.whisper_model, device="cpu", compute_type="int8", cpu_threads=args.whisper_threads)
+        alone = transcribe_wall_time(model, audio)
+        diarizer.cache = None
+        together = transcribe_wall_time(model, audio, diarizer)
+        result.update(transcribe_seconds=alone, transcribe_with_diarization_seconds=together)
+        print(
+            f"transcription  {alone:.1f}s alone, {together:.1f}s with diarization next to it "
+            f"(+{together - alone:.1f}s, {(together - alone) / alone:+.1%})"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "result": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# backend/benchmarks/bench_language.py
+"""
+Measures the throughput gain of the language pass and per-language model routing on local clips:
+
+    python benchmarks/bench_language.py fixtures/mixed/ --profile accurate --language-models en=distil-large-v3
+
+Every clip is transcribed twice: as before, by the profile's model detecting the
+language itself, and as the service does now, detection on a sample with the
+small model followed by the routed model pinned to that language. The report
+has the wall time and real-time factor of both, whether the detected language
+matches the one the baseline model found, and how similar the two transcripts
+are. Models are loaded before the clock starts.
+"""
+
+import argparse
+import collections
+import difflib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from faster_whisper import WhisperModel, decode_audio  # noqa: E402
+
+from audio_stream import SAMPLE_RATE  # noqa: E402
+from batch import collect_inputs  # noqa: E402
+from language import LanguageDetector, parse_language_models, route_profile  # noqa: E402
+from model_registry import compute_type_for, default_profiles  # noqa: E402
+
+EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".aac", ".mp4", ".mkv", ".mov", ".webm")
+
+
+def transcribe(model, audio, options):
+    started = time.perf_counter()
+    segments, info = model.transcribe(audio, **options)
+    text = " ".join(segment.text.strip() for segment in segments)
+    return text, info.language, time.perf_counter() - started
+
+
+def similarity(a, b):
+    return difflib.SequenceMatcher(None, a.lower().split(), b.lower().split(), autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sources", nargs="+", help="Clips, folders or globs of a mixed-language fixture set")
+    parser.add_argument("--profile", default="accurate", choices=["fast", "accurate"])
+    parser.add_argument("--fast-model", default="small")
+    parser.add_argument("--accurate-model", default="large-v3-turbo")
+    parser.add_argument("--detect-model", default="tiny")
+    parser.add_argument("--language-models", default="en=distil-large-v3")
+    parser.add_argument("--min-probability", type=float, default=0.7)
+    parser.add_argument("--sample-seconds", type=float, default=30)
+    parser.add_argument("--sample-offset", type=float, default=30)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    clips = collect_inputs(args.sources, lambda name: name.lower().endswith(EXTENSIONS))
+    if not clips:
+        sys.exit("No clips found")
+    profile = default_profiles(args.fast_model, args.accurate_model)[args.profile]
+    language_models = parse_language_models(args.language_models)
+    compute_type = compute_type_for(profile, "cpu")
+
+    models = {}
+
+    def model_for(name, model_compute_type=compute_type):
+        if name not in models:
+            started = time.perf_counter()
+            models[name] = WhisperModel(
+                name, device="cpu", compute_type=model_compute_type, cpu_threads=args.threads
+            )
+            print(f"Loaded {name} ({model_compute_type}) in {time.perf_counter() - started:.1f}s")
+        return models[name]
+
+    detector = LanguageDetector(
+        lambda: model_for(args.detect_model, "int8"),
+        sample_seconds=args.sample_seconds,
+        offset_seconds=args.sample_offset,
+    )
+    detector.preload()
+    model_for(profile.model)
+    for name in set(language_models.values()):
+        model_for(name)
+
+    print(
+        f"{'clip':<32}{'audio (s)':>10}{'lang':>6}{'prob':>6}{'model':>20}"
+        f"{'base (s)':>10}{'detect (s)':>11}{'routed (s)':>11}{'speedup':>9}{'same text':>10}"
+    )
+    runs = []
+    for path in clips:
+        audio = decode_audio(path)
+        duration = len(audio) / SAMPLE_RATE
+        samples = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+        base_text, base_language, base_seconds = transcribe(model_for(profile.model), audio, profile.options)
+
+        started = time.perf_counter()
+        language, probability = detector.detect(samples)
+        detect_seconds = time.perf_counter() - started
+        routed = route_profile(profile, language, probability, language_models, args.min_probability)
+        text, _, routed_seconds = transcribe(model_for(routed.model), audio, routed.options)
+
+        run = {
+            "clip": path,
+            "audio_seconds": duration,
+            "language": language,
+            "probability": probability,
+            "baseline_language": base_language,
+            "model": routed.model,
+            "baseline_seconds": base_seconds,
+            "detect_seconds": detect_seconds,
+            "routed_seconds": routed_seconds,
+            "speedup": base_seconds / (detect_seconds + routed_seconds),
+            "text_similarity": similarity(base_text, text),
+        }
+        runs.append(run)
+        print(
+            f"{os.path.basename(path)[:31]:<32}{duration:>10.1f}{language or '-':>6}{probability:>6.2f}"
+            f"{routed.model[-19:]:>20}{base_seconds:>10.1f}{detect_seconds:>11.2f}{routed_seconds:>11.1f}"
+            f"{run['speedup']:>8.2f}x{run['text_similarity']:>10.2f}"
+        )
+
+    audio_seconds = sum(run["audio_seconds"] for run in runs)
+    base_seconds = sum(run["baseline_seconds"] for run in runs)
+    routed_seconds = sum(run["detect_seconds"] + run["routed_seconds"] for run in runs)
+    summary = {
+        "clips": len(runs),
+        "audio_seconds": audio_seconds,
+        "baseline_audio_seconds_per_second": audio_seconds / base_seconds,
+        "routed_audio_seconds_per_second": audio_seconds / routed_seconds,
+        "speedup": base_seconds / routed_seconds,
+        "language_agreement": sum(run["language"] == run["baseline_language"] for run in runs) / len(runs),
+        "models": dict(collections.Counter(run["model"] for run in runs)),
+    }
+    print(
+        f"\n{len(runs)} clip(s), {audio_seconds:.0f}s of audio: baseline "
+        f"{summary['baseline_audio_seconds_per_second']:.2f}x real time, routed "
+        f"{summary['routed_audio_seconds_per_second']:.2f}x real time ({summary['speedup']:.2f}x faster), "
+        f"language agreement {summary['language_agreement']:.0%}, models {summary['models']}"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "summary": summary, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
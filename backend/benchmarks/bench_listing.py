@@ -0,0 +1,126 @@
+# backend/benchmarks/bench_listing.py
+"""
+Measures index page and RSS feed latency against table size, comparing the
+keyset-paginated listing and cached feed with a full-table listing and an
+uncached feed:
+
+    python benchmarks/bench_listing.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, ".."))
+sys.path.insert(0, os.path.join(here, "..", "..", "frontend"))
+
+from listing import (LISTING_INDEXES, FeedCache, iter_rss,  # noqa: E402
+                     latest_completed, list_page)
+from schema import ensure_schema  # noqa: E402
+
+
+def fill(conn, start, count, rng):
+    base = 1700000000
+    rows = []
+    for i in range(start, start + count):
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(base + i * 60))
+        rows.append(
+            (
+                uuid.UUID(int=rng.getrandbits(128)).hex,
+                f"file_{i}.mp4",
+                f"Title {i}",
+                "word " * 3000,
+                "<article><p>" + "summary " * 150 + "</p></article>",
+                rng.choice(["completed"] * 8 + ["failed", "pending"]),
+                created,
+                base + i * 60 + 30,
+            )
+        )
+    conn.executemany(
+        """
+        INSERT INTO transcriptions
+            (id, filename, title, transcription, summary, status, created_at, completed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    conn.commit()
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--feed-items", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "transcriptions.db"))
+        conn.execute("PRAGMA synchronous = OFF")
+        ensure_schema(conn)
+        for statement in LISTING_INDEXES:
+            conn.execute(statement)
+
+        size = 0
+        print(f"{'rows':>8} {'full list':>10} {'page 1':>8} {'deep page':>9} "
+              f"{'feed full':>10} {'feed build':>11} {'feed hit':>9}  (ms, median)")
+        for target in sorted(args.sizes):
+            fill(conn, size, target - size, rng)
+            size = target
+
+            def full_list():
+                conn.execute(
+                    "SELECT id, filename, status FROM transcriptions ORDER BY created_at DESC"
+                ).fetchall()
+
+            def deep_page():
+                cursor = None
+                for _ in range(min(100, size // args.page_size)):
+                    _, _, cursor = list_page(conn, args.page_size, before=cursor)
+
+            def feed_full_table():
+                # Every row with transcript and summary text, as the feed used to read
+                rows = conn.execute(
+                    """
+                    SELECT filename, title, transcription, summary, status, created_at
+                    FROM transcriptions ORDER BY created_at DESC
+                    """
+                ).fetchall()
+                "".join(iter_rss((r[0], r[1], r[3], r[5]) for r in rows if r[4] == "completed"))
+
+            def feed_build():
+                "".join(iter_rss(latest_completed(conn, args.feed_items)))
+
+            cache = FeedCache(args.feed_items)
+            cache.get(conn)
+            pages = min(100, size // args.page_size)
+            print(
+                f"{size:>8} {measure(full_list, args.repeat):>10.1f} "
+                f"{measure(lambda: list_page(conn, args.page_size), args.repeat):>8.2f} "
+                f"{measure(deep_page, args.repeat) / max(pages, 1):>9.2f} "
+                f"{measure(feed_full_table, args.repeat):>10.1f} "
+                f"{measure(feed_build, args.repeat):>11.2f} "
+                f"{measure(lambda: cache.get(conn), args.repeat):>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_pcm_cache.py
+"""
+Measures the time to get 16 kHz PCM for a clip: a cold ffmpeg decode into the
+PCM cache, a cache hit, and the header probe that skips ffmpeg for inputs that
+already are 16 kHz mono PCM WAV:
+
+    python benchmarks/bench_pcm_cache.py path/to/clip.mp4 --runs 5
+
+Every path is timed up to the last sample being read, as a transcription would.
+--max-mb below the clip's decoded size shows the cache evicting the previous
+entry.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_stream import SAMPLE_RATE, ArrayStream  # noqa: E402
+from media_cache import hash_file  # noqa: E402
+from pcm_cache import PCMCache, read_pcm_wav  # noqa: E402
+
+
+def read_all(samples):
+    return sum(len(block) for block in ArrayStream(samples))
+
+
+def timed(runs, fn):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clip", help="Local audio or video file")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-mb", type=float, default=1024)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    content_hash = hash_file(args.clip)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PCMCache(os.path.join(tmp, "pcm"), int(args.max_mb * 2**20))
+
+        def cold():
+            for name in os.listdir(cache.folder):
+                os.remove(os.path.join(cache.folder, name))
+            read_all(cache.store(content_hash, args.clip))
+
+        cold_seconds = timed(args.runs, cold)
+        hit_seconds = timed(args.runs, lambda: read_all(cache.open(content_hash)))
+
+        # The cached PCM written out as a WAV the service would not send to ffmpeg
+        samples = cache.open(content_hash)
+        wav_path = os.path.join(tmp, "clip.wav")
+        with wave.open(wav_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(samples.tobytes())
+        wav_seconds = timed(args.runs, lambda: read_all(read_pcm_wav(wav_path)))
+        duration = len(samples) / SAMPLE_RATE
+        metrics = cache.metrics()
+
+    print(f"Clip duration: {duration:.1f}s, decoded size {len(samples) * 2 / 2**20:.1f} MiB")
+    print(f"{'path':<22}{'seconds':>10}{'x realtime':>12}")
+    results = {"clip": args.clip, "duration": duration, "runs": args.runs, "paths": {}}
+    for name, seconds in (
+        ("ffmpeg decode (miss)", cold_seconds),
+        ("PCM cache hit", hit_seconds),
+        ("16 kHz WAV fast path", wav_seconds),
+    ):
+        print(f"{name:<22}{seconds:>10.3f}{duration / seconds:>12.0f}")
+        results["paths"][name] = seconds
+    results["cache"] = metrics
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
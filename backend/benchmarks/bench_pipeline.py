@@ -0,0 +1,402 @@
+# backend/benchmarks/bench_pipeline.py
+"""
+End-to-end benchmark of the backend service on deterministic synthetic media:
+
+    python benchmarks/bench_pipeline.py --jobs 8 --seconds 120 --json before.json
+    python benchmarks/bench_pipeline.py --jobs 8 --seconds 120 --compare before.json
+
+The backend folder is copied to a temporary directory and transcriber.py runs
+there unchanged (worker pool, summary stage, status server), with the OpenAI
+API served by benchmarks/mock_openai.py. Jobs are queued the way the frontend
+queues uploads. The report has jobs/hour, p50/p95 latency from queueing to
+'completed', the real-time factor of inference, the per-stage medians from the
+job_metrics table, peak RSS and peak disk.
+
+--stub-model replaces Whisper with a model that returns one segment per five
+seconds of audio after sleeping --stub-rtf times the audio length, so the rest
+of the pipeline can be measured without model files. Results carry the git
+commit, so runs on different commits can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+
+import numpy as np
+
+here = os.path.dirname(os.path.abspath(__file__))
+backend = os.path.join(here, "..")
+sys.path.insert(0, here)
+
+from mock_openai import MockOpenAIServer  # noqa: E402
+
+# Runs transcriber.py as __main__, with Whisper replaced when BENCH_STUB_RTF is set
+LAUNCHER = """
+import os, runpy, time
+rtf = os.getenv("BENCH_STUB_RTF")
+if rtf:
+    import faster_whisper, faster_whisper.utils
+    from faster_whisper.transcribe import Segment, TranscriptionInfo
+
+    class StubModel:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def transcribe(self, audio, **options):
+            seconds = len(audio) / 16000
+            time.sleep(seconds * float(rtf))
+            segments = [
+                Segment(id=i, seek=0, start=start, end=min(start + 5, seconds),
+                        text=f" Sentence {i} of the synthetic clip.", tokens=[],
+                        avg_logprob=-0.2, compression_ratio=1.0, no_speech_prob=0.01,
+                        words=None, temperature=0.0)
+                for i, start in enumerate(range(0, int(seconds), 5))
+            ]
+            info = TranscriptionInfo(language="en", language_probability=1.0, duration=seconds,
+                                     duration_after_vad=seconds, all_language_probs=None,
+                                     transcription_options=None, vad_options=None)
+            return iter(segments), info
+
+        def detect_language(self, audio, **options):
+            time.sleep(min(len(audio) / 16000, 30) * float(rtf))
+            return "en", 0.99, [("en", 0.99)]
+
+    faster_whisper.WhisperModel = StubModel
+    faster_whisper.utils.download_model = lambda name, **kwargs: name
+runpy.run_path("transcriber.py", run_name="__main__")
+"""
+
+# Metrics compared by --compare and whether a higher value is better
+COMPARED = [
+    ("jobs_per_hour", True),
+    ("latency_p50_seconds", False),
+    ("latency_p95_seconds", False),
+    ("realtime_factor_p50", False),
+    ("startup_seconds", False),
+    ("peak_rss_bytes", False),
+    ("peak_disk_bytes", False),
+]
+
+
+def write_fixture(path, seconds, seed, sample_rate=16000, channels=1):
+    """
+    Writes a WAV of voiced bursts separated by pauses over a low noise floor.
+    The same seed always gives the same file.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = rng.uniform(100, 220)
+    voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    envelope = np.zeros_like(t)
+    position = 0.0
+    while position < seconds:
+        burst = rng.uniform(0.3, 2.0)
+        start, end = int(position * sample_rate), int((position + burst) * sample_rate)
+        envelope[start:end] = rng.uniform(0.2, 0.5)
+        position += burst + rng.uniform(0.2, 1.5)
+    signal = voiced * envelope + rng.normal(0, 0.003, len(t))
+    samples = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.repeat(samples, channels).tobytes())
+
+
+def make_fixtures(folder, count, seconds, media_format):
+    """
+    Writes `count` different clips: 'wav16' is 16 kHz mono PCM, which skips
+    ffmpeg, 'wav' 44.1 kHz stereo and 'mp4' AAC audio with a small video track.
+    """
+    paths = []
+    for i in range(count):
+        wav_path = os.path.join(folder, f"clip_{i}.wav")
+        if media_format == "wav16":
+            write_fixture(wav_path, seconds, seed=i)
+        else:
+            write_fixture(wav_path, seconds, seed=i, sample_rate=44100, channels=2)
+        if media_format == "mp4":
+            mp4_path = os.path.join(folder, f"clip_{i}.mp4")
+            subprocess.run(
+                [
+                    "ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"color=c=black:s=320x240:r=10:d={seconds}", "-i", wav_path,
+                    "-c:v", "libx264", "-c:a", "aac", "-shortest", "-fflags", "+bitexact", mp4_path,
+                ],
+                check=True,
+            )
+            os.remove(wav_path)
+            wav_path = mp4_path
+        paths.append(wav_path)
+    return paths
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "."], cwd=backend, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"transcriber.py exited with code {process.returncode} during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=2):
+                return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    sys.exit(f"transcriber.py was not ready after {timeout:.0f}s")
+
+
+def queue_jobs(db_path, upload_folder, fixtures, profile):
+    """
+    Copies the clips into the upload folder and inserts pending rows, as the
+    frontend does for an upload. Returns {transcription_id: queued_at}.
+    """
+    queued = {}
+    conn = sqlite3.connect(db_path, timeout=30)
+    for path in fixtures:
+        name, ext = os.path.splitext(os.path.basename(path))
+        filename = f"{name}_{uuid.uuid4().hex}{ext}"
+        shutil.copyfile(path, os.path.join(upload_folder, filename))
+        transcription_id = uuid.uuid4().hex
+        with conn:
+            conn.execute(
+                "INSERT INTO transcriptions (id, filename, status, profile) VALUES (?, ?, 'pending', ?)",
+                (transcription_id, filename, profile),
+            )
+        queued[transcription_id] = time.time()
+    conn.close()
+    return queued
+
+
+def wait_finished(db_path, queued, process, timeout):
+    deadline = time.time() + timeout
+    conn = sqlite3.connect(db_path, timeout=30)
+    placeholders = ", ".join("?" * len(queued))
+    try:
+        while time.time() < deadline:
+            if process.poll() is not None:
+                sys.exit(f"transcriber.py exited with code {process.returncode}")
+            rows = conn.execute(
+                f"""
+                SELECT id, status, completed_at, audio_seconds, peak_rss_bytes, peak_disk_bytes
+                FROM transcriptions WHERE id IN ({placeholders}) AND status IN ('completed', 'failed')
+                """,
+                list(queued),
+            ).fetchall()
+            if len(rows) == len(queued):
+                return rows
+            time.sleep(0.2)
+    finally:
+        conn.close()
+    sys.exit(f"Jobs did not finish within {timeout:.0f}s")
+
+
+def stage_medians(db_path, ids):
+    conn = sqlite3.connect(db_path, timeout=30)
+    placeholders = ", ".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT transcription_id, stage, seconds FROM job_metrics WHERE transcription_id IN ({placeholders})",
+        list(ids),
+    ).fetchall()
+    conn.close()
+    per_job = {}
+    for transcription_id, stage, seconds in rows:
+        stages = per_job.setdefault(stage, {})
+        stages[transcription_id] = stages.get(transcription_id, 0.0) + seconds
+    return {stage: statistics.median(values.values()) for stage, values in sorted(per_job.items())}, per_job
+
+
+def peak_rss(pid):
+    """
+    Returns the peak RSS of the service's main process from /proc, or None.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def folder_size(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run(args, tmp, fixtures):
+    service_dir = os.path.join(tmp, "backend")
+    shutil.copytree(
+        backend,
+        service_dir,
+        ignore=shutil.ignore_patterns("import", "model_cache", "benchmarks", "__pycache__", "*.pyc"),
+    )
+    import_folder = os.path.join(service_dir, "import")
+    db_path = os.path.join(import_folder, "transcriptions.db")
+    status_port = free_port()
+    openai = MockOpenAIServer(latency=args.summary_latency).start()
+
+    env = dict(os.environ)
+    env.update(
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=openai.url,
+        STATUS_PORT=str(status_port),
+        MODEL_CACHE_DIR=os.getenv("MODEL_CACHE_DIR", os.path.join(os.path.abspath(backend), "model_cache")),
+        DEFAULT_PROFILE=args.profile,
+        FAST_PROFILE_MODEL=args.model,
+        ACCURATE_PROFILE_MODEL=args.model,
+        WORKERS=str(args.workers),
+        QUEUE_IDLE_SECONDS="0.5",
+    )
+    if args.stub_model:
+        env["BENCH_STUB_RTF"] = str(args.stub_rtf)
+    log = open(os.path.join(tmp, "transcriber.out"), "w")
+    started = time.time()
+    process = subprocess.Popen(
+        [sys.executable, "-c", LAUNCHER], cwd=service_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    try:
+        wait_ready(status_port, process, args.timeout)
+        startup_seconds = time.time() - started
+        queued = queue_jobs(db_path, os.path.join(import_folder, "uploads"), fixtures, args.profile)
+        rows = wait_finished(db_path, queued, process, args.timeout)
+        wall_seconds = max(row[2] or 0 for row in rows) - min(queued.values())
+        rss = peak_rss(process.pid)
+        disk = folder_size(import_folder)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        openai.stop()
+        log.close()
+
+    completed = [row for row in rows if row[1] == "completed"]
+    if not completed:
+        sys.exit(f"All jobs failed, see the service log: {log.name}")
+    latencies = [row[2] - queued[row[0]] for row in completed]
+    stages, per_job = stage_medians(db_path, list(queued))
+    inference = per_job.get("inference", {})
+    factors = [inference[row[0]] / row[3] for row in completed if row[3] and row[0] in inference]
+    return {
+        "jobs": len(rows),
+        "failed": len(rows) - len(completed),
+        "wall_seconds": round(wall_seconds, 2),
+        "jobs_per_hour": round(len(completed) / wall_seconds * 3600, 1),
+        "latency_p50_seconds": round(statistics.median(latencies), 2),
+        "latency_p95_seconds": round(percentile(latencies, 0.95), 2),
+        "realtime_factor_p50": round(statistics.median(factors), 4) if factors else None,
+        "realtime_factor_p95": round(percentile(factors, 0.95), 4) if factors else None,
+        "startup_seconds": round(startup_seconds, 2),
+        "peak_rss_bytes": max([rss or 0] + [row[4] or 0 for row in rows]),
+        "peak_disk_bytes": max([row[5] or 0 for row in rows]),
+        "import_folder_bytes": disk,
+        "stage_seconds_p50": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+        "summary_requests": openai.requests,
+    }
+
+
+def compare(baseline, results):
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('created_at')}):")
+    print(f"{'metric':<24}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, higher_is_better in COMPARED:
+        before, after = baseline.get(name), results.get(name)
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        better = change > 0 if higher_is_better else change < 0
+        print(f"{name:<24}{before:>14}{after:>14}{change:>+9.1f}%{'' if abs(change) < 1 else ' better' if better else ' worse'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=120, help="Length of each clip")
+    parser.add_argument("--format", default="wav", choices=["wav16", "wav", "mp4"])
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--profile", default="fast", choices=["fast", "accurate"])
+    parser.add_argument("--workers", type=int, default=0, help="WORKERS for the service, 0 sizes the pool")
+    parser.add_argument("--summary-latency", type=float, default=0.5)
+    parser.add_argument("--stub-model", action="store_true")
+    parser.add_argument("--stub-rtf", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures_dir = os.path.join(tmp, "fixtures")
+        os.makedirs(fixtures_dir)
+        fixtures = make_fixtures(fixtures_dir, args.jobs, args.seconds, args.format)
+        results = run(args, tmp, fixtures)
+
+    results = dict(
+        commit=git_commit(),
+        created_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        config={key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        **results,
+    )
+    print(
+        f"{results['jobs']} jobs of {args.seconds:.0f}s ({args.format}, {args.model}"
+        f"{', stub' if args.stub_model else ''}): {results['jobs_per_hour']:.0f} jobs/hour, "
+        f"latency p50 {results['latency_p50_seconds']}s p95 {results['latency_p95_seconds']}s, "
+        f"RTF p50 {results['realtime_factor_p50']}, {results['failed']} failed"
+    )
+    print(
+        f"startup {results['startup_seconds']}s, peak RSS {results['peak_rss_bytes'] / 2**20:.0f} MiB, "
+        f"peak job disk {results['peak_disk_bytes'] / 2**20:.1f} MiB"
+    )
+    print("stage medians: " + ", ".join(f"{k} {v:.3f}s" for k, v in results["stage_seconds_p50"].items()))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_profiles.py
+"""
+Compares the transcription profiles on a local clip: model load time, resident
+memory of the loaded model, peak RSS while transcribing and real-time factor:
+
+    python benchmarks/bench_profiles.py path/to/clip.wav --threads 4
+
+Each profile runs through a ModelRegistry, as in the service. --budget-gb below
+the sum of the models shows the registry unloading the idle one before loading
+the next.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from faster_whisper import WhisperModel, decode_audio  # noqa: E402
+
+from audio_stream import SAMPLE_RATE  # noqa: E402
+from model_registry import ModelRegistry, compute_type_for, default_profiles  # noqa: E402
+from resources import ResourceMonitor, current_rss_bytes  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clip", help="Local audio or video file used for every run")
+    parser.add_argument("--profiles", nargs="+", default=["fast", "accurate"])
+    parser.add_argument("--fast-model", default="small")
+    parser.add_argument("--accurate-model", default="large-v3-turbo")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--budget-gb", type=float, default=64)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    profiles = default_profiles(args.fast_model, args.accurate_model)
+    audio = decode_audio(args.clip)
+    duration = len(audio) / SAMPLE_RATE
+    registry = ModelRegistry(
+        lambda key: WhisperModel(key[0], device="cpu", compute_type=key[1], cpu_threads=args.threads),
+        int(args.budget_gb * 2**30),
+    )
+
+    print(f"Clip duration: {duration:.1f}s, {args.threads} thread(s)")
+    print(
+        f"{'profile':<10}{'model':<16}{'compute':<14}{'beam':>5}{'load (s)':>10}"
+        f"{'model MiB':>11}{'peak MiB':>10}{'wall (s)':>10}{'RTF':>8}{'segments':>10}"
+    )
+    results = {"clip": args.clip, "duration": duration, "threads": args.threads, "runs": []}
+    for name in args.profiles:
+        profile = profiles[name]
+        key = (profile.model, compute_type_for(profile, "cpu"))
+        before = current_rss_bytes()
+        start = time.perf_counter()
+        with registry.use(key) as model:
+            load_seconds = time.perf_counter() - start
+            model_bytes = current_rss_bytes() - before
+            with ResourceMonitor(interval=0.1) as usage:
+                start = time.perf_counter()
+                segments, _ = model.transcribe(audio, **profile.options)
+                count = sum(1 for _ in segments)
+                elapsed = time.perf_counter() - start
+        print(
+            f"{name:<10}{profile.model:<16}{key[1]:<14}{profile.options['beam_size']:>5}"
+            f"{load_seconds:>10.1f}{model_bytes / 2**20:>11.0f}{usage.peak_rss_bytes / 2**20:>10.0f}"
+            f"{elapsed:>10.1f}{elapsed / duration:>8.3f}{count:>10}"
+        )
+        results["runs"].append(
+            {
+                "profile": name,
+                "model": profile.model,
+                "compute_type": key[1],
+                "options": profile.options,
+                "load_seconds": load_seconds,
+                "model_rss_bytes": model_bytes,
+                "peak_rss_bytes": usage.peak_rss_bytes,
+                "wall_seconds": elapsed,
+                "rtf": elapsed / duration,
+                "segments": count,
+            }
+        )
+    results["registry"] = registry.metrics()
+    print(f"Registry: {registry.loads} load(s), {registry.evictions} eviction(s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
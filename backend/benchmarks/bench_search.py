@@ -0,0 +1,126 @@
+# backend/benchmarks/bench_search.py
+"""
+Measures /search query latency over a synthetic corpus indexed by the real FTS5
+triggers, with segments stored through SegmentStore:
+
+    python benchmarks/bench_search.py --transcripts 100000 --segments 20
+
+The corpus is deterministic for a given --seed; words follow a Zipf-like
+distribution so common, medium and rare terms are all exercised. Pass --db to
+keep the generated database and reuse it on later runs.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, ".."))
+sys.path.insert(0, os.path.join(here, "..", "..", "frontend"))
+
+from audio_stream import TimedSegment  # noqa: E402
+from schema import ensure_schema  # noqa: E402
+from search import search  # noqa: E402
+from search_index import ensure_schema as ensure_search_index  # noqa: E402
+from segments import SegmentStore  # noqa: E402
+
+VOCABULARY_SIZE = 20000
+
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 9))))
+    words = sorted(words)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+    return words, cum_weights
+
+
+def build_corpus(db_path, transcripts, segments, seed):
+    rng = random.Random(seed)
+    words, cum_weights = make_vocabulary(rng)
+
+    def sentence(length):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=length))
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous = OFF")
+    ensure_schema(conn)
+    ensure_search_index(conn)
+    store = SegmentStore(db_path)
+    store.ensure_schema()
+    store._connection().execute("PRAGMA synchronous = OFF")
+
+    start = time.perf_counter()
+    for i in range(transcripts):
+        transcription_id = uuid.UUID(int=rng.getrandbits(128)).hex
+        writer = store.writer(transcription_id)
+        texts = [sentence(12) for _ in range(segments)]
+        for j, text in enumerate(texts):
+            writer.add(TimedSegment(j * 6.0, j * 6.0 + 5.5, text, -0.2, 0.01))
+        writer.flush()
+        conn.execute(
+            """
+            INSERT INTO transcriptions (id, filename, title, transcription, summary, status)
+            VALUES (?, ?, ?, ?, ?, 'completed')
+            """,
+            (transcription_id, f"file_{i}.mp4", sentence(5), " ".join(texts), sentence(60)),
+        )
+        conn.commit()
+        if (i + 1) % 10000 == 0:
+            print(f"  indexed {i + 1} transcripts in {time.perf_counter() - start:.0f}s")
+    conn.close()
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transcripts", type=int, default=100000)
+    parser.add_argument("--segments", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="database file to build or reuse")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "transcriptions.db")
+        if not os.path.exists(db_path):
+            print(f"Building {args.transcripts} transcripts x {args.segments} segments...")
+            build_corpus(db_path, args.transcripts, args.segments, args.seed)
+        words, _ = make_vocabulary(random.Random(args.seed))
+        print(f"Database size {os.path.getsize(db_path) / 2**20:.0f} MiB")
+
+        queries = {
+            "common word": words[0],
+            "medium word": words[100],
+            "rare word": words[5000],
+            "two words": f"{words[10]} {words[200]}",
+            "prefix": words[50][:3],
+        }
+        conn = sqlite3.connect(db_path)
+        for label, query in queries.items():
+            for page in (1, 5):
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    results, _ = search(conn, db_path, query, page=page)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                print(
+                    f"{label:12} {query!r:22} page {page}: {len(results):2} results, "
+                    f"p50 {statistics.median(timings):7.1f} ms, p95 {p95:7.1f} ms"
+                )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
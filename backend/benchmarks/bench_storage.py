@@ -0,0 +1,204 @@
+# backend/benchmarks/bench_storage.py
+"""
+Measures frontend read latency while backend threads write to the same SQLite
+database, with the rollback journal the services used to run on and with WAL:
+
+    python benchmarks/bench_storage.py --rows 20000 --writers 4 --readers 4 --seconds 10
+
+Writers do what transcription workers do: frequent progress updates and, per
+finished job, the compressed transcript, its search text and the status in one
+transaction. Readers request the index page, rebuild the RSS feed and run a
+search. Every thread uses its own pooled connection, as the services do.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, ".."))
+sys.path.insert(0, os.path.join(here, "..", "..", "frontend"))
+
+from listing import LISTING_INDEXES, iter_rss, latest_completed, list_page  # noqa: E402
+from schema import MIGRATIONS, ensure_schema  # noqa: E402
+from search import search  # noqa: E402
+from search_index import ensure_schema as ensure_search_index  # noqa: E402
+from search_index import index_transcript  # noqa: E402
+from segments import SegmentStore  # noqa: E402
+from storage import ConnectionPool, enable_wal, migrate, save_transcript  # noqa: E402
+
+WORDS = [f"w{i:04d}" for i in range(2000)]
+
+
+def transcript(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def create_database(path, rows, words, journal_mode, rng):
+    if journal_mode == "wal":
+        enable_wal(path)
+    db = ConnectionPool(path)
+    conn = db.connection()
+    ensure_schema(conn)
+    ensure_search_index(conn)
+    for statement in LISTING_INDEXES:
+        conn.execute(statement)
+    migrate(conn, MIGRATIONS)
+    SegmentStore(path).ensure_schema()
+    base = 1700000000
+    with db.transaction():
+        for i in range(rows):
+            transcription_id = uuid.UUID(int=rng.getrandbits(128)).hex
+            conn.execute(
+                """
+                INSERT INTO transcriptions (id, filename, title, summary, status, created_at, completed_at)
+                VALUES (?, ?, ?, ?, 'completed', ?, ?)
+                """,
+                (
+                    transcription_id,
+                    f"file_{i}.mp4",
+                    f"Title {i}",
+                    "<article><p>" + transcript(rng, 60) + "</p></article>",
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(base + i * 60)),
+                    base + i * 60 + 30,
+                ),
+            )
+            text = transcript(rng, words)
+            index_transcript(conn, transcription_id, text)
+            save_transcript(conn, transcription_id, text)
+    db.close()
+
+
+def writer(db, stop, counts, errors, rng, words):
+    """
+    Runs jobs back to back: progress updates, then the stored result.
+    """
+    while not stop.is_set():
+        transcription_id = uuid.uuid4().hex
+        try:
+            db.execute(
+                "INSERT INTO transcriptions (id, filename, status) VALUES (?, ?, 'processing')",
+                (transcription_id, f"{transcription_id}.mp4"),
+            )
+            for position in range(20):
+                db.execute(
+                    """
+                    UPDATE transcriptions
+                    SET progress_stage = 'transcribing', progress_position = ?, progress_updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (position * 30.0, time.time(), transcription_id),
+                )
+                counts["writes"] += 1
+            text = transcript(rng, words)
+            with db.transaction() as conn:
+                index_transcript(conn, transcription_id, text)
+                save_transcript(conn, transcription_id, text)
+                conn.execute(
+                    "UPDATE transcriptions SET status = 'completed', completed_at = ? WHERE id = ?",
+                    (time.time(), transcription_id),
+                )
+            counts["jobs"] += 1
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+
+
+def reader(db, db_path, stop, timings, errors, rng):
+    while not stop.is_set():
+        for name, function in (
+            ("index page", lambda conn: list_page(conn, 50)),
+            ("rss feed", lambda conn: "".join(iter_rss(latest_completed(conn, 50)))),
+            ("search", lambda conn: search(conn, db_path, rng.choice(WORDS))),
+        ):
+            started = time.perf_counter()
+            try:
+                function(db.connection())
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            timings[name].append((time.perf_counter() - started) * 1000)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else float("nan")
+
+
+def run(args, journal_mode):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transcriptions.db")
+        create_database(path, args.rows, args.words, journal_mode, rng)
+        db = ConnectionPool(path, timeout=args.busy_timeout)
+        stop = threading.Event()
+        counts = {"writes": 0, "jobs": 0}
+        timings = {"index page": [], "rss feed": [], "search": []}
+        errors = []
+        threads = [
+            threading.Thread(target=writer, args=(db, stop, counts, errors, random.Random(i), args.words))
+            for i in range(args.writers)
+        ] + [
+            threading.Thread(target=reader, args=(db, path, stop, timings, errors, random.Random(100 + i)))
+            for i in range(args.readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        db.close()
+
+    result = {
+        "journal_mode": journal_mode,
+        "writes_per_second": round(counts["writes"] / args.seconds, 1),
+        "jobs_per_second": round(counts["jobs"] / args.seconds, 2),
+        "errors": len(errors),
+        "reads": {},
+    }
+    print(
+        f"{journal_mode:<8} writer: {result['writes_per_second']:.0f} progress updates/s, "
+        f"{result['jobs_per_second']:.1f} results/s, {len(errors)} errors"
+    )
+    for name, values in timings.items():
+        result["reads"][name] = {
+            "count": len(values),
+            "p50_ms": round(statistics.median(values), 2) if values else None,
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "max_ms": round(max(values), 2) if values else None,
+        }
+        print(
+            f"{'':<8} {name:<12} {len(values):>6} reads, p50 {result['reads'][name]['p50_ms']} ms, "
+            f"p95 {result['reads'][name]['p95_ms']} ms, max {result['reads'][name]['max_ms']} ms"
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=2000, help="Words per transcript")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--busy-timeout", type=float, default=30)
+    parser.add_argument("--modes", nargs="+", default=["delete", "wal"], choices=["delete", "wal"])
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = [run(args, mode) for mode in args.modes]
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
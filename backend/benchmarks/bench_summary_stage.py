@@ -0,0 +1,86 @@
+# backend/benchmarks/bench_summary_stage.py
+"""
+Runs the summary stage against the local mock OpenAI server and reports how many
+transcribed jobs per second it completes at a given concurrency:
+
+    python benchmarks/bench_summary_stage.py --jobs 200 --concurrency 8 --latency 0.5
+
+Use --words above the chunk budget (e.g. --words 40000 --chunk-tokens 8000) to
+exercise the map-reduce path.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from openai import AsyncOpenAI  # noqa: E402
+
+from job_queue import JobQueue  # noqa: E402
+from mock_openai import MockOpenAIServer  # noqa: E402
+from schema import ensure_schema  # noqa: E402
+from search_index import ensure_schema as ensure_search_index  # noqa: E402
+from summarizer import SummaryStage  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.1)
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--chunk-tokens", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency, rate_limit_ratio=args.rate_limit_ratio).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "transcriptions.db")
+        conn = sqlite3.connect(db_path)
+        ensure_schema(conn)
+        ensure_search_index(conn)
+        conn.executemany(
+            "INSERT INTO transcriptions (id, filename, transcription, status) VALUES (?, ?, ?, 'transcribed')",
+            [(uuid.uuid4().hex, f"file_{i}.wav", "word. " * args.words) for i in range(args.jobs)],
+        )
+        conn.commit()
+
+        queue = JobQueue(db_path, claim_status="transcribed", active_status="summarizing")
+        stage = SummaryStage(
+            queue,
+            db_path,
+            lambda: AsyncOpenAI(api_key="mock", base_url=server.url, max_retries=0),
+            concurrency=args.concurrency,
+            chunk_tokens=args.chunk_tokens,
+            base_delay=0.05,
+        )
+        start = time.perf_counter()
+        stage.start()
+        while conn.execute("SELECT COUNT(*) FROM transcriptions WHERE status != 'completed'").fetchone()[0]:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        stage.shutdown(timeout=5)
+        failed, prompt_tokens, completion_tokens, mean_seconds = conn.execute(
+            """
+            SELECT SUM(summary = 'No Summary'), SUM(summary_prompt_tokens),
+                   SUM(summary_completion_tokens), AVG(summary_seconds)
+            FROM transcriptions
+            """
+        ).fetchone()
+    server.stop()
+
+    print(
+        f"{args.jobs} summaries in {elapsed:.2f}s ({args.jobs / elapsed:.1f}/s) at concurrency "
+        f"{args.concurrency}; {server.requests} requests, {server.rate_limited} rate-limited, "
+        f"peak {server.max_concurrent} concurrent, {failed} failed; "
+        f"{prompt_tokens}+{completion_tokens} tokens, {mean_seconds:.2f}s mean latency per job"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_vad.py
+"""
+Measures the real-time factor of streamed transcription with the VAD pre-pass
+off, with Silero VAD and with the energy threshold, on a local clip:
+
+    python benchmarks/bench_vad.py path/to/clip.wav --model small --gap-seconds 20
+
+--gap-seconds inserts that much silence after every --gap-every seconds of the
+clip, to imitate recordings with long pauses. The transcript of each VAD run is
+compared word by word with the run without VAD.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from faster_whisper import WhisperModel, decode_audio  # noqa: E402
+
+from audio_stream import SAMPLE_RATE, transcribe_stream  # noqa: E402
+from vad import SpeechFilter  # noqa: E402
+
+
+def write_with_gaps(clip, path, gap_seconds, gap_every):
+    """
+    Writes the clip as 16 kHz mono WAV with silence inserted at regular intervals.
+    """
+    audio = decode_audio(clip)
+    if gap_seconds:
+        step = int(gap_every * SAMPLE_RATE)
+        gap = np.zeros(int(gap_seconds * SAMPLE_RATE), dtype=np.float32)
+        pieces = []
+        for start in range(0, len(audio), step):
+            pieces += [audio[start : start + step], gap]
+        audio = np.concatenate(pieces)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+    return len(audio) / SAMPLE_RATE
+
+
+def run(model, path, speech_filter, window_seconds, options):
+    stats = {}
+    start = time.perf_counter()
+    segments = list(
+        transcribe_stream(
+            model, path, window_seconds=window_seconds, stats=stats, speech_filter=speech_filter, **options
+        )
+    )
+    return time.perf_counter() - start, segments, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clip", help="Local audio or video file used for every run")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--window-seconds", type=float, default=300)
+    parser.add_argument("--gap-seconds", type=float, default=0)
+    parser.add_argument("--gap-every", type=float, default=30)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    model = WhisperModel(args.model, device="cpu", compute_type=args.compute_type)
+    options = {"beam_size": args.beam_size}
+    filters = {
+        "off": None,
+        "silero": SpeechFilter("silero"),
+        "energy": SpeechFilter("energy"),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clip.wav")
+        duration = write_with_gaps(args.clip, path, args.gap_seconds, args.gap_every)
+        print(f"Clip duration: {duration:.1f}s, model: {args.model} ({args.compute_type})")
+        print(f"{'VAD':<8}{'wall (s)':>10}{'RTF':>8}{'speedup':>9}{'speech':>8}{'segments':>10}{'same words':>12}")
+
+        results = {"clip": args.clip, "duration": duration, "model": args.model, "runs": []}
+        baseline = None
+        for name, speech_filter in filters.items():
+            elapsed, segments, stats = run(model, path, speech_filter, args.window_seconds, options)
+            words = " ".join(segment.text for segment in segments).split()
+            if baseline is None:
+                baseline = (elapsed, words)
+            similarity = difflib.SequenceMatcher(None, baseline[1], words, autojunk=False).ratio()
+            speech_ratio = stats["speech_seconds"] / stats["duration"] if stats["duration"] else 0.0
+            print(
+                f"{name:<8}{elapsed:>10.1f}{elapsed / duration:>8.3f}{baseline[0] / elapsed:>9.2f}"
+                f"{speech_ratio:>8.0%}{len(segments):>10}{similarity:>12.1%}"
+            )
+            results["runs"].append(
+                {
+                    "vad": name,
+                    "wall_seconds": elapsed,
+                    "rtf": elapsed / duration,
+                    "speech_ratio": speech_ratio,
+                    "segments": len(segments),
+                    "word_similarity": similarity,
+                }
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/benchmarks/queue_stress.py
+"""
+Multi-process stress test for the job queue: several processes claim jobs from one
+SQLite database as fast as they can and the claims are checked for duplicates.
+
+    python benchmarks/queue_stress.py --jobs 2000 --processes 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from job_queue import JobQueue  # noqa: E402
+from schema import ensure_schema  # noqa: E402
+
+
+def claim_all(db_path, worker_index, results):
+    queue = JobQueue(db_path, worker_id=f"stress-{worker_index}")
+    claimed = []
+    while True:
+        job = queue.claim()
+        if job is None:
+            break
+        claimed.append(job[0])
+        queue._connection().execute(
+            "UPDATE transcriptions SET status = 'completed' WHERE id = ?", (job[0],)
+        )
+        queue.release(job[0])
+    results.put((worker_index, claimed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "transcriptions.db")
+        conn = sqlite3.connect(db_path)
+        ensure_schema(conn)
+        conn.executemany(
+            "INSERT INTO transcriptions (id, filename, priority) VALUES (?, ?, ?)",
+            [(uuid.uuid4().hex, f"file_{i}.wav", i % 3) for i in range(args.jobs)],
+        )
+        conn.commit()
+
+        results = multiprocessing.Queue()
+        start = time.perf_counter()
+        workers = [
+            multiprocessing.Process(target=claim_all, args=(db_path, i, results))
+            for i in range(args.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        claims = dict(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        all_claims = [job for claimed in claims.values() for job in claimed]
+        duplicates = len(all_claims) - len(set(all_claims))
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM transcriptions WHERE status != 'completed'"
+        ).fetchone()[0]
+
+    for index in sorted(claims):
+        print(f"process {index}: {len(claims[index])} claims")
+    print(f"{len(all_claims)} claims in {elapsed:.2f}s ({len(all_claims) / elapsed:.0f}/s), "
+          f"{duplicates} double-claims, {pending} jobs left unfinished")
+    if duplicates or pending or len(all_claims) != args.jobs:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# backend/benchmarks/sse_check.py
+"""
+Holds many idle Server-Sent Events clients open on the frontend's progress hub
+while a job reports progress through ProgressReporter, and checks that every
+client sees the job through to completion without the hub starting a thread
+per client:
+
+    python benchmarks/sse_check.py --clients 2000 --updates 20
+
+Reports the fan-out latency from the progress write to the clients. Writes
+closer together than the poll interval are coalesced into one event.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, ".."))
+sys.path.insert(0, os.path.join(here, "..", "..", "frontend"))
+
+from events import ProgressHub  # noqa: E402
+from progress import ProgressReporter  # noqa: E402
+from schema import ensure_schema  # noqa: E402
+
+
+def current_rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def client(port, job_id, received, connected):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /events?id={job_id} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+    await writer.drain()
+    assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+    connected.release()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: "):
+                event = json.loads(line[6:])
+                received.append((event.get("position", event["status"]), time.perf_counter()))
+                if event["status"] == "completed":
+                    return
+    finally:
+        writer.close()
+
+
+async def run_clients(port, job_id, count, connected):
+    received = [[] for _ in range(count)]
+    await asyncio.gather(*(client(port, job_id, received[i], connected) for i in range(count)))
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between progress writes")
+    parser.add_argument("--poll", type=float, default=0.2, help="hub poll interval in seconds")
+    args = parser.parse_args()
+
+    # Each client uses two descriptors in this process, its own and the hub's
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, args.clients * 2 + 256)), hard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "transcriptions.db")
+        conn = sqlite3.connect(db_path)
+        ensure_schema(conn)
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO transcriptions (id, filename, status) VALUES (?, 'long.mp4', 'processing')",
+            (job_id,),
+        )
+        conn.commit()
+
+        hub = ProgressHub(db_path, host="127.0.0.1", port=0, poll_seconds=args.poll).start()
+        time.sleep(args.poll * 2)
+        threads_before = threading.active_count()
+        rss_before = current_rss_bytes()
+
+        connected = threading.Semaphore(0)
+        results = {}
+        clients = threading.Thread(
+            target=lambda: results.update(
+                received=asyncio.run(run_clients(hub.port, job_id, args.clients, connected))
+            )
+        )
+        clients.start()
+        for _ in range(args.clients):
+            connected.acquire()
+        time.sleep(args.poll * 2)
+        print(
+            f"{hub.clients} clients connected; hub threads +{threading.active_count() - threads_before - 1}, "
+            f"RSS +{(current_rss_bytes() - rss_before) / 2**20:.1f} MiB (hub and clients)"
+        )
+
+        duration = 3600.0
+        written = {}
+        with ProgressReporter(db_path, job_id, duration=duration, interval=0) as progress:
+            progress.stage("transcribing")
+            for i in range(1, args.updates + 1):
+                position = duration * i / args.updates
+                written[position] = time.perf_counter()
+                progress.update(position, f"segment {i}")
+                time.sleep(args.interval)
+        conn.execute(
+            "UPDATE transcriptions SET status = 'completed', completed_at = ? WHERE id = ?",
+            (time.time(), job_id),
+        )
+        conn.commit()
+        clients.join(timeout=30)
+        hub.stop()
+
+    latencies = []
+    events = 0
+    incomplete = 0
+    for received in results.get("received", []):
+        seen = dict(received)
+        events += len(seen)
+        if "completed" not in seen:
+            incomplete += 1
+        latencies.extend((at - written[key]) * 1000 for key, at in seen.items() if key in written)
+    if not latencies:
+        sys.exit("No progress events were received.")
+    latencies.sort()
+    print(
+        f"{args.updates} updates to {args.clients} clients: {events / args.clients:.1f} events per "
+        f"client, {incomplete} without the final state; fan-out latency "
+        f"p50 {statistics.median(latencies):.0f} ms, p95 {latencies[int(len(latencies) * 0.95)]:.0f} ms, "
+        f"max {latencies[-1]:.0f} ms (poll interval {args.poll * 1000:.0f} ms)"
+    )
+    if incomplete:
+        sys.exit("Some clients did not see the job finish.")
+
+
+if __name__ == "__main__":
+    main()
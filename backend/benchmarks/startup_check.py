@@ -0,0 +1,148 @@
+# backend/benchmarks/startup_check.py
+"""
+Measures how long the backend takes to start and fails if startup regresses:
+importing transcriber.py must not pull in torch or load a model, and the status
+server must answer /health well before any model could be loaded:
+
+    python benchmarks/startup_check.py --runs 5 --max-import-seconds 3
+
+The backend runs from a temporary copy so its import folder and database are
+throwaway. The model preload is off, so no model is downloaded.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+here = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(here, "..")
+
+# Run in the child: times the import and reports what it left in memory
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import transcriber
+print(json.dumps({
+    "import_seconds": time.perf_counter() - started,
+    "torch": "torch" in sys.modules,
+    "models_loaded": transcriber.model_registry.loads,
+    "device": transcriber.device,
+    "model_cache_dir": transcriber.MODEL_CACHE_DIR,
+}))
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def time_import(backend, env):
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=backend, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_health(backend, env, port, timeout):
+    """
+    Starts the service and returns the seconds until /health answers, with the
+    /ready response seen at that point.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "transcriber.py"],
+        cwd=backend,
+        env=dict(env, STATUS_PORT=str(port)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                sys.exit(f"The backend exited with code {process.returncode} during startup.")
+            try:
+                status, _ = get(f"http://127.0.0.1:{port}/health")
+            except OSError:
+                time.sleep(0.02)
+                continue
+            if status == 200:
+                elapsed = time.perf_counter() - started
+                return elapsed, get(f"http://127.0.0.1:{port}/ready")
+        sys.exit(f"/health did not answer within {timeout:.0f}s.")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-import-seconds", type=float, default=3.0)
+    parser.add_argument("--max-health-seconds", type=float, default=5.0)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = os.path.join(tmp, "backend")
+        shutil.copytree(BACKEND, backend, ignore=shutil.ignore_patterns("import", "__pycache__", "benchmarks"))
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="startup-check",
+            MODEL_CACHE_DIR=os.path.join(tmp, "model_cache"),
+            PRELOAD_MODEL="0",
+        )
+
+        imports = [time_import(backend, env) for _ in range(args.runs)]
+        import_seconds = statistics.median(run["import_seconds"] for run in imports)
+        health = [time_health(backend, env, free_port(), args.max_health_seconds * 4) for _ in range(args.runs)]
+        health_seconds = statistics.median(elapsed for elapsed, _ in health)
+        ready_status, ready = health[-1][1]
+
+    print(f"import transcriber: {import_seconds:.2f}s (median of {args.runs}), device {imports[0]['device']}")
+    print(f"/health answered:   {health_seconds:.2f}s after launch")
+    print(f"/ready:             {ready_status} {json.dumps(ready, sort_keys=True)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"imports": imports, "health_seconds": [elapsed for elapsed, _ in health], "ready": ready},
+                f,
+                indent=2,
+            )
+
+    if any(run["torch"] for run in imports):
+        sys.exit("Importing transcriber.py imported torch.")
+    if any(run["models_loaded"] for run in imports):
+        sys.exit("Importing transcriber.py loaded a model.")
+    if imports[0]["model_cache_dir"] != env["MODEL_CACHE_DIR"]:
+        sys.exit("MODEL_CACHE_DIR was not used for the model cache.")
+    if ready["model_loaded"]:
+        sys.exit("A model was loaded with PRELOAD_MODEL=0 and no jobs.")
+    if import_seconds > args.max_import_seconds:
+        sys.exit(f"Import took {import_seconds:.2f}s, over the {args.max_import_seconds:.2f}s limit.")
+    if health_seconds > args.max_health_seconds:
+        sys.exit(f"/health took {health_seconds:.2f}s, over the {args.max_health_seconds:.2f}s limit.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# backend/benchmarks/upload_check.py
+"""
+Uploads a large synthetic file through the resumable upload API and checks that
+the server's memory stays flat, that an interrupted chunk resumes at the offset
+the server reports, and that the job is queued with the right content hash:
+
+    python benchmarks/upload_check.py --size-mb 2048 --chunk-mb 64
+
+The frontend runs in-process from a temporary copy so its import folder and
+database are throwaway.
+"""
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+FRONTEND = os.path.join(here, "..", "..", "frontend")
+
+BLOCK_BYTES = 1024 * 1024
+
+
+def current_rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def block(index):
+    """
+    Deterministic 1 MiB block, different for every index.
+    """
+    return hashlib.sha256(index.to_bytes(8, "little")).digest() * (BLOCK_BYTES // 32)
+
+
+def body(start, length):
+    """
+    Yields the bytes [start, start + length) of the synthetic file.
+    """
+    position = start
+    end = start + length
+    while position < end:
+        index, skip = divmod(position, BLOCK_BYTES)
+        data = block(index)[skip : skip + end - position]
+        yield data
+        position += len(data)
+
+
+def request(port, method, path, payload=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    connection.request(method, path, body=payload, headers=headers or {})
+    response = connection.getresponse()
+    data = json.loads(response.read() or b"null")
+    connection.close()
+    return response.status, data
+
+
+def send_partial(port, upload_id, offset, length, sent):
+    """
+    Starts a chunk of `length` bytes but drops the connection after `sent`.
+    """
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(
+        f"PATCH /uploads/{upload_id} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Upload-Offset: {offset}\r\nContent-Length: {length}\r\n\r\n".encode("ascii")
+    )
+    for data in body(offset, sent):
+        sock.sendall(data)
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--chunk-mb", type=int, default=64)
+    parser.add_argument("--max-growth-mb", type=int, default=64)
+    args = parser.parse_args()
+    size = args.size_mb * BLOCK_BYTES
+    chunk = args.chunk_mb * BLOCK_BYTES
+
+    expected = hashlib.sha256()
+    for data in body(0, size):
+        expected.update(data)
+    expected = expected.hexdigest()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frontend = os.path.join(tmp, "frontend")
+        shutil.copytree(FRONTEND, frontend, ignore=shutil.ignore_patterns("import", "__pycache__"))
+        sys.path.insert(0, frontend)
+        import app as frontend_app
+        from werkzeug.serving import make_server
+
+        server = make_server("127.0.0.1", 0, frontend_app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+
+        baseline = current_rss_bytes()
+        sampler = RSSSampler()
+        sampler.start()
+        start = time.perf_counter()
+
+        status, upload = request(
+            port,
+            "POST",
+            "/uploads",
+            json.dumps({"filename": "synthetic.mp4", "size": size, "sha256": expected}),
+            {"Content-Type": "application/json"},
+        )
+        assert status == 201, upload
+        upload_id = upload["upload_id"]
+
+        # Drop the connection halfway through the first chunk, then resume
+        send_partial(port, upload_id, 0, min(chunk, size), min(chunk, size) // 2)
+        time.sleep(0.5)
+        _, upload = request(port, "GET", f"/uploads/{upload_id}")
+        resumed_at = upload["offset"]
+        assert 0 < resumed_at < size, upload
+
+        offset = resumed_at
+        while offset < size:
+            length = min(chunk, size - offset)
+            status, upload = request(
+                port,
+                "PATCH",
+                f"/uploads/{upload_id}",
+                body(offset, length),
+                {"Upload-Offset": str(offset), "Content-Length": str(length)},
+            )
+            assert status == 200, upload
+            offset = upload["offset"]
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        server.shutdown()
+
+        assert upload.get("completed"), upload
+        db = sqlite3.connect(frontend_app.DB_PATH)
+        filename, content_hash = db.execute(
+            "SELECT filename, content_hash FROM transcriptions"
+        ).fetchone()
+        assert content_hash == expected, (content_hash, expected)
+        assert os.path.getsize(os.path.join(frontend_app.UPLOAD_FOLDER, filename)) == size
+        assert db.execute("SELECT COUNT(*) FROM uploads").fetchone()[0] == 0
+
+    growth = (sampler.peak - baseline) / 2**20
+    print(
+        f"Uploaded {args.size_mb} MiB in {args.chunk_mb} MiB chunks in {elapsed:.1f}s "
+        f"({args.size_mb / elapsed:.0f} MiB/s), resumed at {resumed_at / 2**20:.1f} MiB after a "
+        f"dropped connection; RSS grew {growth:.1f} MiB (limit {args.max_growth_mb} MiB)"
+    )
+    if growth > args.max_growth_mb:
+        sys.exit("Memory grew with the upload size.")
+
+
+if __name__ == "__main__":
+    main()
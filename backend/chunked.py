@@ -0,0 +1,234 @@
+# backend/chunked.py
+
+import collections
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import re
+
+import numpy as np
+
+from audio_stream import SAMPLE_RATE, TimedSegment, pcm_stream, quiet_cut
+from vad import transcribe_speech
+
+# A slice of the recording sent to one pool worker. Segments whose midpoint falls in
+# [keep_from, keep_until) belong to this window; the rest is overlap with a neighbour.
+Window = collections.namedtuple("Window", ["index", "offset", "audio", "keep_from", "keep_until"])
+
+# Model used by each pool worker process, loaded once by _init_worker
+_worker_model = None
+
+
+def find_silence_cut(audio, target, search_seconds, vad_options):
+    """
+    Returns a sample index near `target` in the middle of the longest non-speech gap
+    that Silero VAD finds in the preceding `search_seconds`. Falls back to the
+    quietest frame when the region contains no usable gap.
+    """
+    from faster_whisper.vad import get_speech_timestamps
+
+    start = max(0, target - int(search_seconds * SAMPLE_RATE))
+    region = audio[start:target]
+    speech = get_speech_timestamps(region, vad_options)
+    if not speech:
+        return target
+
+    gaps = [(0, speech[0]["start"])]
+    gaps += [(a["end"], b["start"]) for a, b in zip(speech, speech[1:])]
+    gaps.append((speech[-1]["end"], len(region)))
+    gap_start, gap_end = max(gaps, key=lambda gap: gap[1] - gap[0])
+    if gap_end - gap_start < SAMPLE_RATE // 10:
+        return quiet_cut(audio, target, search_seconds)
+    return start + (gap_start + gap_end) // 2
+
+
+def iter_overlapping_windows(blocks, window_seconds, overlap_seconds, search_seconds=10.0, start=0.0):
+    """
+    Splits a stream of PCM blocks into windows cut at silences. Each window extends
+    `overlap_seconds` past its cut on both sides so words at the boundary are seen
+    by both neighbours; merge_segments() removes the duplicates afterwards. The
+    blocks begin `start` seconds into the recording.
+    """
+    from faster_whisper.vad import VadOptions
+
+    window = int(window_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    search_seconds = min(search_seconds, window_seconds / 2)
+    vad_options = VadOptions(min_silence_duration_ms=300, speech_pad_ms=100)
+
+    buffer = np.empty(0, dtype=np.float32)
+    buffer_start = int(round(start * SAMPLE_RATE))
+    keep_from = start
+    index = 0
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= window + overlap:
+            cut = find_silence_cut(buffer, window, search_seconds, vad_options)
+            end = min(len(buffer), cut + overlap)
+            cut_seconds = (buffer_start + cut) / SAMPLE_RATE
+            yield Window(index, buffer_start / SAMPLE_RATE, buffer[:end].copy(), keep_from, cut_seconds)
+
+            index += 1
+            keep_from = cut_seconds
+            next_start = max(0, cut - overlap)
+            buffer = buffer[next_start:]
+            buffer_start += next_start
+
+    if len(buffer):
+        yield Window(index, buffer_start / SAMPLE_RATE, buffer, keep_from, float("inf"))
+
+
+def _normalise(text):
+    return re.sub(r"\W+", " ", text).strip().lower()
+
+
+def merge_segments(results):
+    """
+    Merges (window, segments) pairs, given in window order, into one ordered list of
+    segments. Segments in the overlap are kept only by the window that owns their
+    midpoint, and a repeated sentence straddling the cut is dropped.
+    """
+    previous = None
+    for window, segments in results:
+        for segment in segments:
+            midpoint = (segment.start + segment.end) / 2
+            if not window.keep_from <= midpoint < window.keep_until:
+                continue
+            if (
+                previous is not None
+                and segment.start < previous.end
+                and _normalise(segment.text) == _normalise(previous.text)
+            ):
+                continue
+            yield segment
+            previous = segment
+
+
+def _init_worker(model_name, device, compute_type, cpu_threads, download_root):
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    _worker_model = WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        download_root=download_root,
+    )
+
+
+def _detect_language(audio):
+    language, _, _ = _worker_model.detect_language(audio)
+    return language
+
+
+def _transcribe_window(window, options, speech_filter=None):
+    segments, info, speech_seconds = transcribe_speech(
+        _worker_model, window.audio, speech_filter, **options
+    )
+    timed = [
+        TimedSegment(
+            start=window.offset + segment.start,
+            end=window.offset + segment.end,
+            text=segment.text,
+            avg_logprob=segment.avg_logprob,
+            no_speech_prob=segment.no_speech_prob,
+        )
+        for segment in segments
+    ]
+    return (info.language if info else None), timed, speech_seconds
+
+
+class ChunkedTranscriber:
+    """
+    Transcribes long recordings by splitting them at VAD-detected silences into
+    overlapping windows and running the windows in parallel on a process pool.
+    Every worker process loads its own model with `cpu_threads` threads, so
+    workers * cpu_threads should not exceed the number of cores.
+    """
+
+    def __init__(
+        self,
+        model_name,
+        device="cpu",
+        compute_type="float32",
+        workers=None,
+        cpu_threads=None,
+        download_root=None,
+        window_seconds=120,
+        overlap_seconds=2,
+        speech_filter=None,
+    ):
+        cores = os.cpu_count() or 1
+        self.workers = workers or cores
+        self.cpu_threads = cpu_threads or max(1, cores // self.workers)
+        self.model_args = (model_name, device, compute_type, self.cpu_threads, download_root)
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.speech_filter = speech_filter
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            logging.info(
+                f"Starting chunked transcription pool with {self.workers} worker(s) "
+                f"x {self.cpu_threads} thread(s)."
+            )
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self.model_args,
+            )
+        return self._executor
+
+    def _windows(self, source, stats, options, start):
+        executor = self._get_executor()
+        in_flight = collections.deque()
+
+        def collect():
+            window, future = in_flight.popleft()
+            language, segments, speech_seconds = future.result()
+            if language:
+                stats.setdefault("language", language)
+            # Overlaps are counted twice, so this slightly overstates the speech
+            stats["speech_seconds"] += speech_seconds
+            return window, segments
+
+        with pcm_stream(source, block_seconds=30, max_blocks=self.workers * 2, start=start) as stream:
+            windows = iter_overlapping_windows(stream, self.window_seconds, self.overlap_seconds, start=start)
+            for window in windows:
+                if not options.get("language"):
+                    # Detected once on the first window and pinned for the others,
+                    # so windows of one recording cannot disagree on the language
+                    language = executor.submit(_detect_language, window.audio).result()
+                    if language:
+                        options = {**options, "language": language}
+                        stats.setdefault("language", language)
+                stats["duration"] = window.offset + len(window.audio) / SAMPLE_RATE
+                future = executor.submit(_transcribe_window, window, options, self.speech_filter)
+                # Keep only the window bounds in the parent; the worker owns the samples
+                in_flight.append((window._replace(audio=None), future))
+                while len(in_flight) >= self.workers * 2:
+                    yield collect()
+            while in_flight:
+                yield collect()
+
+    def transcribe(self, source, stats=None, start=0.0, **options):
+        """
+        Yields TimedSegment objects for the whole file, or decoded int16 samples, in
+        order, from `start` seconds on. Without a `language` option it is detected
+        on the first window and used for all of them. If a `stats` dict is given it
+        is filled with 'language', 'duration' and 'speech_seconds'.
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("duration", start)
+        stats.setdefault("speech_seconds", 0.0)
+        yield from merge_segments(self._windows(source, stats, options, start))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
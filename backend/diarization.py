@@ -0,0 +1,388 @@
+# backend/diarization.py
+
+import itertools
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from audio_stream import SAMPLE_RATE, pcm_stream
+from media_cache import params_key
+
+# Kaldi-style filterbank: 25 ms frames every 10 ms, 80 mel bands
+FRAME_LENGTH = 400
+FRAME_SHIFT = 160
+FFT_SIZE = 512
+N_MELS = 80
+
+# Above this many windows, clustering runs on an even subsample and the other
+# windows join the nearest centroid; the linkage matrix grows with its square
+MAX_CLUSTER_WINDOWS = 3000
+
+
+def _mel(frequencies):
+    return 1127.0 * np.log1p(np.asarray(frequencies) / 700.0)
+
+
+def mel_filterbank(n_mels=N_MELS, low=20.0, high=SAMPLE_RATE / 2):
+    """
+    Returns the (n_mels, FFT_SIZE // 2 + 1) matrix of triangular mel filters.
+    """
+    bins = _mel(np.arange(FFT_SIZE // 2 + 1) * SAMPLE_RATE / FFT_SIZE)
+    edges = np.linspace(_mel(low), _mel(high), n_mels + 2)
+    left, center, right = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - left) / (center - left)
+    falling = (right - bins) / (right - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+_FILTERBANK = mel_filterbank()
+_WINDOW = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(FRAME_LENGTH) / (FRAME_LENGTH - 1))) ** 0.85
+
+
+def log_mel_features(audio):
+    """
+    Returns the (frames, 80) log mel filterbank of float32 PCM the way Kaldi and
+    WeSpeaker compute it: int16 scale, DC removal, pre-emphasis, Povey window.
+    """
+    audio = np.asarray(audio, dtype=np.float32) * 32768.0
+    count = 1 + (len(audio) - FRAME_LENGTH) // FRAME_SHIFT
+    if count <= 0:
+        return np.zeros((0, N_MELS), dtype=np.float32)
+    frames = np.lib.stride_tricks.as_strided(
+        audio, shape=(count, FRAME_LENGTH), strides=(audio.strides[0] * FRAME_SHIFT, audio.strides[0])
+    )
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    frames = np.concatenate((frames[:, :1] * 0.03, frames[:, 1:] - 0.97 * frames[:, :-1]), axis=1)
+    power = np.square(np.abs(np.fft.rfft(frames * _WINDOW, FFT_SIZE)))
+    return np.log(np.maximum(power @ _FILTERBANK.T, np.finfo(np.float32).eps)).astype(np.float32)
+
+
+class OnnxEmbedder:
+    """
+    Speaker embeddings from an ONNX model that takes (batch, frames, 80) log mel
+    features with the mean over time removed, such as the WeSpeaker ResNet
+    exports. onnxruntime is installed with faster-whisper.
+    """
+
+    def __init__(self, model_path, threads=1):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.name = f"onnx:{os.path.basename(model_path)}"
+
+    def embed(self, features):
+        features = features - features.mean(axis=1, keepdims=True)
+        return self.session.run(None, {self.input_name: features})[0].reshape(len(features), -1)
+
+
+class SpectralEmbedder:
+    """
+    Model-free fallback: the mean and standard deviation of each mel band over
+    the window. It tells clearly different voices apart, not similar ones.
+    """
+
+    name = "spectral"
+
+    def embed(self, features):
+        return np.concatenate((features.mean(axis=1), features.std(axis=1)), axis=1)
+
+
+def speech_windows(regions, length, window, step):
+    """
+    Returns the (start, end) sample ranges of fixed-length windows every `step`
+    samples over the speech regions. A region shorter than a window gets one
+    window centred on it.
+    """
+    windows = []
+    for start, end in regions:
+        if end - start < window:
+            start = min(max(0, (start + end - window) // 2), max(0, length - window))
+            windows.append((start, min(length, start + window)))
+            continue
+        for offset in range(start, end - window + 1, step):
+            windows.append((offset, offset + window))
+    return windows
+
+
+def cluster_embeddings(embeddings, threshold=0.6, max_speakers=0, min_share=0.02):
+    """
+    Clusters embeddings by average-linkage agglomeration on cosine distance and
+    returns a label per embedding, speakers numbered by first appearance.
+    Clusters holding less than `min_share` of the windows join the nearest
+    larger one.
+    """
+    from scipy.cluster.hierarchy import fcluster, linkage
+
+    count = len(embeddings)
+    if count < 2:
+        return np.zeros(count, dtype=np.int64)
+    vectors = embeddings - embeddings.mean(axis=0)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    sample = np.arange(count)
+    if count > MAX_CLUSTER_WINDOWS:
+        sample = np.linspace(0, count - 1, MAX_CLUSTER_WINDOWS).astype(np.int64)
+    tree = linkage(vectors[sample], method="average", metric="cosine")
+    labels = fcluster(tree, threshold, criterion="distance")
+    if max_speakers and labels.max() > max_speakers:
+        labels = fcluster(tree, max_speakers, criterion="maxclust")
+
+    # Centroids of the clusters large enough to be a speaker; every window,
+    # including the ones left out of the subsample, joins the nearest
+    names, sizes = np.unique(labels, return_counts=True)
+    keep = names[sizes >= max(1, min_share * len(sample))]
+    if not len(keep):
+        keep = names[[np.argmax(sizes)]]
+    centroids = np.stack([vectors[sample][labels == name].mean(axis=0) for name in keep])
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-9)
+    labels = np.argmax(vectors @ centroids.T, axis=1)
+
+    _, first = np.unique(labels, return_index=True)
+    order = np.empty(len(first), dtype=np.int64)
+    order[np.argsort(first)] = np.arange(len(first))
+    return order[labels]
+
+
+def speaker_turns(windows, labels, step):
+    """
+    Returns (starts, ends, labels) arrays of speaker turns in seconds. Each
+    window owns the `step` around its centre, and neighbours with the same
+    label are joined.
+    """
+    if not len(windows):
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+    centers = windows.mean(axis=1)
+    starts = np.maximum(windows[:, 0], centers - step / 2)
+    ends = np.minimum(windows[:, 1], centers + step / 2)
+    # A new turn starts where the speaker changes or a pause separates windows
+    new = np.ones(len(labels), dtype=bool)
+    new[1:] = (labels[1:] != labels[:-1]) | (starts[1:] > ends[:-1] + step)
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(labels)) - 1
+    return starts[first], ends[last], labels[first]
+
+
+def assign_speakers(segment_starts, segment_ends, turns):
+    """
+    Returns the speaker of each segment: the turn it overlaps most or, within
+    a pause, the nearest turn. -1 if there are no turns.
+    """
+    turn_starts, turn_ends, turn_labels = turns
+    speakers = np.full(len(segment_starts), -1, dtype=np.int64)
+    if not len(turn_starts):
+        return speakers
+    first = np.searchsorted(turn_ends, segment_starts, side="right")
+    last = np.searchsorted(turn_starts, segment_ends, side="left")
+    for i in range(len(segment_starts)):
+        if last[i] > first[i]:
+            span = slice(first[i], last[i])
+            overlap = np.minimum(turn_ends[span], segment_ends[i]) - np.maximum(turn_starts[span], segment_starts[i])
+            weights = np.bincount(turn_labels[span], weights=overlap)
+            speakers[i] = int(np.argmax(weights))
+        else:
+            nearest = min(first[i], len(turn_starts) - 1)
+            if nearest > 0 and segment_starts[i] - turn_ends[nearest - 1] < turn_starts[nearest] - segment_ends[i]:
+                nearest -= 1
+            speakers[i] = int(turn_labels[nearest])
+    return speakers
+
+
+class EmbeddingCache:
+    """
+    Speaker embeddings of earlier runs keyed by audio content hash and embedding
+    settings, one .npz file each, so re-running a file only clusters again. The
+    least recently used files go once the folder exceeds `max_bytes`.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.npz")
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            os.utime(path)
+            with np.load(path) as data:
+                windows, embeddings = data["windows"], data["embeddings"]
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return windows, embeddings
+
+    def store(self, key, windows, embeddings):
+        path = self._path(key)
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            with open(partial, "wb") as f:
+                np.savez(f, windows=windows, embeddings=embeddings)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class Diarizer:
+    """
+    Finds who speaks when on the CPU. Speech regions found by `speech_filter`
+    are cut into overlapping windows, embedded in batches while the audio is
+    decoded block by block, and the embeddings are clustered into speakers.
+    Embeddings are cached by content hash, so a re-run only clusters again.
+    A run is given up between blocks and batches once its `stop` event is set.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        speech_filter,
+        window_seconds=1.5,
+        step_seconds=0.75,
+        batch_size=64,
+        threshold=0.6,
+        max_speakers=0,
+        cache=None,
+    ):
+        self.embedder = embedder
+        self.speech_filter = speech_filter
+        self.window = int(window_seconds * SAMPLE_RATE)
+        self.step = int(step_seconds * SAMPLE_RATE)
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.cache = cache
+
+    def _embedding_params(self):
+        return {
+            "diarization": self.embedder.name,
+            "diarization_window": [self.window, self.step],
+            **{f"diarization_{name}": value for name, value in self.speech_filter.params().items()},
+        }
+
+    def params(self):
+        """
+        Settings that change the speaker labels, for the media cache key.
+        """
+        return {
+            **self._embedding_params(),
+            "diarization_threshold": self.threshold,
+            "diarization_max_speakers": self.max_speakers,
+        }
+
+    def _cache_key(self, content_hash):
+        # Clustering settings are left out; changing them reuses the embeddings
+        return f"{content_hash}-{params_key(**self._embedding_params())}"
+
+    def embed(self, source, stop=None):
+        """
+        Returns the (start, end) seconds of the speech windows of a media file
+        path or decoded int16 samples and their embeddings, or None if `stop`
+        was set first.
+        """
+        windows, embeddings = [], []
+        batch = []
+
+        def run_batch():
+            if batch:
+                embeddings.append(self.embedder.embed(np.stack(batch)))
+                batch.clear()
+
+        # Speech ending this close to the end of the decoded audio may go on in the
+        # next block, where the VAD could merge it with what follows
+        hold = int((self.speech_filter.min_silence_seconds + self.speech_filter.pad_seconds) * SAMPLE_RATE)
+        pending = None  # Samples from `offset` on that are not windowed yet
+        offset = 0
+        with pcm_stream(source, block_seconds=120, max_blocks=2) as stream:
+            for block in itertools.chain(stream, [None]):
+                if stop is not None and stop.is_set():
+                    return None
+                if block is not None:
+                    pending = block if pending is None else np.concatenate([pending, block])
+                if pending is None:
+                    break
+                regions = self.speech_filter.regions(pending)
+                settled = len(pending)
+                held = []
+                if block is not None and regions and regions[-1][1] >= len(pending) - hold:
+                    # Window the open region only as far as it is known and carry the
+                    # rest, so speech across a block boundary is not cut in two
+                    start, _ = regions.pop()
+                    fitting = max(0, (len(pending) - hold - self.window - start) // self.step + 1)
+                    held = [(start + i * self.step, start + i * self.step + self.window) for i in range(fitting)]
+                    settled = start + fitting * self.step
+                for start, end in speech_windows(regions, len(pending), self.window, self.step) + held:
+                    if end - start < FRAME_LENGTH:
+                        continue
+                    audio = pending[start:end]
+                    if len(audio) < self.window:
+                        audio = np.pad(audio, (0, self.window - len(audio)))
+                    batch.append(log_mel_features(audio))
+                    windows.append(((offset + start) / SAMPLE_RATE, (offset + end) / SAMPLE_RATE))
+                    if len(batch) >= self.batch_size:
+                        if stop is not None and stop.is_set():
+                            return None
+                        run_batch()
+                pending = pending[settled:]
+                offset += settled
+        run_batch()
+        if not windows:
+            return np.zeros((0, 2)), np.zeros((0, 0), dtype=np.float32)
+        return np.array(windows), np.concatenate(embeddings)
+
+    def run(self, source, content_hash=None, stop=None):
+        """
+        Returns the speaker turns of a recording as (starts, ends, labels)
+        arrays, see speaker_turns(), or None if `stop` was set first.
+        """
+        cached = self.cache.load(self._cache_key(content_hash)) if self.cache and content_hash else None
+        if cached is not None:
+            windows, embeddings = cached
+            logging.info(f"[Diarization] Reusing {len(windows)} cached speaker embeddings.")
+        else:
+            embedded = self.embed(source, stop)
+            if embedded is None:
+                return None
+            windows, embeddings = embedded
+            if self.cache and content_hash:
+                self.cache.store(self._cache_key(content_hash), windows, embeddings)
+        labels = cluster_embeddings(embeddings, self.threshold, self.max_speakers)
+        return speaker_turns(windows, labels, self.step / SAMPLE_RATE)
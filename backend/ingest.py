@@ -0,0 +1,278 @@
+# backend/ingest.py
+
+import ctypes
+import ctypes.util
+import fcntl
+import logging
+import os
+import select
+import shutil
+import time
+import uuid
+
+from media_cache import hash_file
+from storage import connect, transaction
+
+# ioctl that clones a file's extents on copy-on-write filesystems (btrfs, XFS)
+FICLONE = 0x40049409
+
+# Source files already queued, by path, so restarts and reruns skip them
+INGEST_LEDGER_TABLE = """
+CREATE TABLE IF NOT EXISTS ingest_ledger (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT,
+    transcription_id TEXT,
+    ingested_at REAL NOT NULL
+)
+"""
+
+
+class Inotify:
+    """
+    Minimal inotify binding through libc. Only reports that something changed in
+    the watched directory; the caller rescans to find out what.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout):
+        """
+        Returns True if events arrived within `timeout` seconds, draining them.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def link_or_copy(src, dst):
+    """
+    Places `src` at `dst` as cheaply as the filesystems allow: a hardlink, then a
+    reflink, then a full copy. Returns the method used.
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        return "reflink"
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+class FolderIngester:
+    """
+    Watches a folder and queues new media files for transcription.
+
+    Changes are noticed through inotify when available, with a periodic
+    mtime/size scan as fallback (inotify does not work on every bind mount).
+    A file is picked up only after its size and mtime stayed unchanged for
+    `stable_seconds`. Files already handled are remembered in the ingest_ledger
+    table across restarts, and each scan's new jobs are inserted in one transaction.
+    If `admit` returns a reason for the bytes of the settled files (e.g. the disk
+    is nearly full), they are left in the folder and picked up once it returns None.
+    Jobs are queued with `profile`; content already queued with it is skipped.
+    """
+
+    def __init__(
+        self,
+        watch_folder,
+        upload_folder,
+        db_path,
+        is_supported,
+        priority=0,
+        profile=None,
+        scan_interval=60,
+        stable_seconds=5,
+        on_ingested=None,
+        admit=None,
+    ):
+        self.watch_folder = watch_folder
+        self.upload_folder = upload_folder
+        self.db_path = db_path
+        self.is_supported = is_supported
+        self.priority = priority
+        self.profile = profile
+        self.scan_interval = scan_interval
+        self.stable_seconds = stable_seconds
+        self.on_ingested = on_ingested
+        self.admit = admit
+        self._deferred = None
+        self._candidates = {}
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.db_path)
+        return self._conn
+
+    def ensure_schema(self):
+        self._connection().execute(INGEST_LEDGER_TABLE)
+
+    def _stable_files(self):
+        """
+        Scans the folder and returns (path, size, mtime) for files that are not in
+        the ledger and have stopped changing.
+        """
+        conn = self._connection()
+        ledger = {
+            path: (size, mtime)
+            for path, size, mtime in conn.execute("SELECT path, size, mtime FROM ingest_ledger")
+        }
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        with os.scandir(self.watch_folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not self.is_supported(entry.name):
+                    continue
+                stat = entry.stat()
+                state = (stat.st_size, stat.st_mtime)
+                seen.add(entry.path)
+                if ledger.get(entry.path) == state:
+                    continue
+                previous = self._candidates.get(entry.path)
+                if previous is None or previous[0] != state:
+                    self._candidates[entry.path] = (state, now)
+                elif now - previous[1] >= self.stable_seconds:
+                    ready.append((entry.path,) + state)
+        # Forget candidates that disappeared before they settled
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+        return ready
+
+    def _ingest(self, files):
+        """
+        Links the files into the upload folder and records the jobs and ledger
+        entries in a single transaction. Returns the number of jobs queued.
+        """
+        conn = self._connection()
+        jobs = []
+        ledger = []
+        now = time.time()
+        for path, size, mtime in files:
+            del self._candidates[path]
+            try:
+                content_hash = hash_file(path)
+                known = conn.execute(
+                    """
+                    SELECT id FROM transcriptions
+                    WHERE content_hash = ? AND profile IS ? AND status != 'failed'
+                    """,
+                    (content_hash, self.profile),
+                ).fetchone()
+                if known:
+                    logging.info(f"Skipping already known file: {os.path.basename(path)}")
+                    ledger.append((path, size, mtime, content_hash, known[0], now))
+                    continue
+
+                name, extension = os.path.splitext(os.path.basename(path))
+                unique_id = uuid.uuid4().hex
+                filename = f"{name}_{unique_id}{extension}"
+                method = link_or_copy(path, os.path.join(self.upload_folder, filename))
+                logging.info(f"New file detected: {os.path.basename(path)} ({method} into uploads)")
+                jobs.append((unique_id, filename, "pending", self.priority, content_hash, self.profile))
+                ledger.append((path, size, mtime, content_hash, unique_id, now))
+            except OSError as e:
+                logging.error(f"Error ingesting {path}: {e}")
+
+        with transaction(conn):
+            conn.executemany(
+                """
+                INSERT INTO transcriptions (id, filename, status, priority, content_hash, profile)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                jobs,
+            )
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO ingest_ledger
+                    (path, size, mtime, content_hash, transcription_id, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                ledger,
+            )
+        if jobs:
+            logging.info(f"Added {len(jobs)} new transcription record(s) from the watch folder.")
+        return len(jobs)
+
+    def _admitted(self, files):
+        reason = self.admit(sum(size for _, size, _ in files)) if self.admit else None
+        if reason != self._deferred:
+            if reason:
+                logging.warning(f"Deferring {len(files)} watch-folder file(s): {reason}")
+            else:
+                logging.info("Disk space available again, resuming watch-folder ingest.")
+            self._deferred = reason
+        return reason is None
+
+    def scan_once(self):
+        ready = self._stable_files()
+        if ready and self._admitted(ready) and self._ingest(ready) and self.on_ingested:
+            self.on_ingested()
+
+    def run(self, stop_event):
+        """
+        Scans until `stop_event` is set, waking early on inotify events and while
+        candidates are waiting to settle.
+        """
+        while not os.path.isdir(self.watch_folder):
+            logging.warning(f"Watch folder {self.watch_folder} does not exist, retrying.")
+            if stop_event.wait(self.scan_interval):
+                return
+
+        self.ensure_schema()
+        try:
+            notifier = Inotify(self.watch_folder)
+            logging.info(f"Watching {self.watch_folder} with inotify.")
+        except OSError as e:
+            notifier = None
+            logging.info(f"inotify unavailable ({e}), scanning {self.watch_folder} every {self.scan_interval}s.")
+
+        try:
+            while not stop_event.is_set():
+                try:
+                    self.scan_once()
+                except Exception as e:
+                    logging.error(f"Error while scanning watch folder: {e}")
+
+                timeout = self.stable_seconds if self._candidates else self.scan_interval
+                if notifier is not None:
+                    notifier.wait(timeout)
+                else:
+                    stop_event.wait(timeout)
+        finally:
+            if notifier is not None:
+                notifier.close()
@@ -0,0 +1,302 @@
+# backend/janitor.py
+
+import collections
+import logging
+import os
+import shutil
+import threading
+import time
+
+from storage import connect
+
+# A folder of rebuildable files: those older than max_age_seconds go, then the
+# oldest until the folder fits in max_bytes; 0 disables either limit
+FolderQuota = collections.namedtuple("FolderQuota", ["name", "path", "max_bytes", "max_age_seconds"])
+
+
+def folder_files(path, linked=False):
+    """
+    Returns (mtime, size, path) of the regular files directly in `path`, oldest
+    first. With `linked` the ctime counts too where it is later, since a
+    hardlinked upload keeps the mtime of its source but gets a new ctime.
+    """
+    files = []
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        touched = max(stat.st_mtime, stat.st_ctime) if linked else stat.st_mtime
+        files.append((touched, stat.st_size, entry.path))
+    return sorted(files)
+
+
+def folder_bytes(path):
+    return sum(size for _, size, _ in folder_files(path))
+
+
+def admission_error(folder, incoming_bytes, min_free_bytes, max_folder_bytes=0):
+    """
+    Returns why `incoming_bytes` more should not be written to `folder` now, or
+    None: the disk would keep less than `min_free_bytes` free, or the folder
+    would grow beyond `max_folder_bytes` (0 for no limit).
+    """
+    free = shutil.disk_usage(folder).free
+    if free - incoming_bytes < min_free_bytes:
+        return (
+            f"{incoming_bytes / 2**20:.0f} MiB would leave less than {min_free_bytes / 2**30:.1f} GiB "
+            f"free ({free / 2**30:.1f} GiB free now)"
+        )
+    if max_folder_bytes:
+        used = folder_bytes(folder)
+        if used + incoming_bytes > max_folder_bytes:
+            return (
+                f"{used / 2**30:.1f} GiB already waiting in {os.path.basename(folder)}, "
+                f"the quota is {max_folder_bytes / 2**30:.1f} GiB"
+            )
+    return None
+
+
+class Janitor:
+    """
+    Reconciles the import folders against the transcriptions table and keeps
+    them within their quotas, on a background thread every `interval` seconds.
+
+    Uploads that no pending or processing job or resumable upload refers to,
+    and extracted audio of jobs that are not processing, were left by crashed,
+    failed or removed jobs. They are deleted once untouched for
+    `grace_seconds`, which covers the moment between a file landing and its row
+    being inserted. Resumable uploads idle for `upload_session_seconds` are
+    dropped with their .part file. The `quotas` folders only hold files that
+    can be rebuilt, so they are trimmed to their limits and, while the disk has
+    less than `min_free_bytes` free, emptied oldest first until it has.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        upload_folder,
+        audio_folder,
+        quotas=(),
+        interval=600,
+        grace_seconds=3600,
+        upload_session_seconds=86400,
+        min_free_bytes=0,
+    ):
+        self.db_path = db_path
+        self.upload_folder = upload_folder
+        self.audio_folder = audio_folder
+        self.quotas = list(quotas)
+        self.interval = interval
+        self.grace_seconds = grace_seconds
+        self.upload_session_seconds = upload_session_seconds
+        self.min_free_bytes = min_free_bytes
+        self.runs = 0
+        self.reclaimed_bytes = collections.Counter()  # (folder, reason) -> bytes
+        self.removed_files = collections.Counter()  # (folder, reason) -> files
+        self.last_run = None
+        self._low_disk = False
+        self._run_bytes = collections.Counter()
+        self._run_files = collections.Counter()
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.db_path)
+        return self._conn
+
+    def _remove(self, folder, reason, path, size):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logging.warning(f"[Janitor] Could not remove {path}: {e}")
+            return False
+        self._run_bytes[(folder, reason)] += size
+        self._run_files[(folder, reason)] += 1
+        return True
+
+    def _has_uploads_table(self, conn):
+        # Created by the frontend, which may not have started yet
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'uploads'").fetchone()
+
+    def expire_upload_sessions(self, now):
+        """
+        Drops resumable uploads that received no bytes for upload_session_seconds.
+        """
+        conn = self._connection()
+        if not self._has_uploads_table(conn):
+            return
+        expired = conn.execute(
+            "SELECT upload_id, filename FROM uploads WHERE updated_at < ?", (now - self.upload_session_seconds,)
+        ).fetchall()
+        for upload_id, filename in expired:
+            conn.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+            path = os.path.join(self.upload_folder, f"{filename}.part")
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            self._remove("uploads", "expired", path, size)
+        if expired:
+            logging.info(f"[Janitor] Dropped {len(expired)} resumable upload(s) idle since before the cutoff.")
+
+    def reconcile(self, now):
+        """
+        Deletes uploads and extracted audio that no live job refers to.
+        """
+        cutoff = now - self.grace_seconds
+        uploads = folder_files(self.upload_folder, linked=True)
+        audio = folder_files(self.audio_folder, linked=True)
+        # Listed before the rows are read, so a file queued in between is kept
+        conn = self._connection()
+        referenced = {
+            filename
+            for (filename,) in conn.execute(
+                "SELECT filename FROM transcriptions WHERE status IN ('pending', 'processing')"
+            )
+        }
+        if self._has_uploads_table(conn):
+            referenced.update(f"{filename}.part" for (filename,) in conn.execute("SELECT filename FROM uploads"))
+        processing = {
+            f"audio_{transcription_id}.wav"
+            for (transcription_id,) in conn.execute("SELECT id FROM transcriptions WHERE status = 'processing'")
+        }
+
+        for folder, files, live in (("uploads", uploads, referenced), ("audio", audio, processing)):
+            for touched, size, path in files:
+                if touched < cutoff and os.path.basename(path) not in live:
+                    self._remove(folder, "orphan", path, size)
+
+    def enforce_quota(self, quota, now):
+        """
+        Trims a quota folder by age, then by size. Partial files of writes that
+        may still be in progress are left alone; older ones are orphans.
+        """
+        kept = []
+        for mtime, size, path in folder_files(quota.path):
+            if path.endswith(".part"):
+                if mtime < now - self.grace_seconds:
+                    self._remove(quota.name, "orphan", path, size)
+            elif quota.max_age_seconds and mtime < now - quota.max_age_seconds:
+                self._remove(quota.name, "age", path, size)
+            else:
+                kept.append((mtime, size, path))
+        total = sum(size for _, size, _ in kept)
+        for _, size, path in kept:
+            if not quota.max_bytes or total <= quota.max_bytes:
+                break
+            if self._remove(quota.name, "size", path, size):
+                total -= size
+
+    def make_room(self):
+        """
+        Deletes the oldest files of the quota folders while the disk has less than
+        min_free_bytes free. Returns the free bytes.
+        """
+        free = shutil.disk_usage(self.upload_folder).free
+        if free >= self.min_free_bytes:
+            if self._low_disk:
+                logging.info(f"[Janitor] {free / 2**30:.1f} GiB free again.")
+                self._low_disk = False
+            return free
+        files = sorted(
+            (mtime, size, path, quota.name)
+            for quota in self.quotas
+            for mtime, size, path in folder_files(quota.path)
+            if not path.endswith(".part")
+        )
+        for _, size, path, name in files:
+            if free >= self.min_free_bytes:
+                break
+            if self._remove(name, "disk", path, size):
+                free += size
+        if free < self.min_free_bytes and not self._low_disk:
+            logging.warning(
+                f"[Janitor] Only {free / 2**30:.1f} GiB free with nothing left to remove, "
+                f"new files are deferred until {self.min_free_bytes / 2**30:.1f} GiB are free."
+            )
+        self._low_disk = free < self.min_free_bytes
+        return free
+
+    def run_once(self):
+        """
+        Runs every pass once and returns the bytes reclaimed.
+        """
+        started = time.monotonic()
+        now = time.time()
+        self._run_bytes.clear()
+        self._run_files.clear()
+        self.expire_upload_sessions(now)
+        self.reconcile(now)
+        for quota in self.quotas:
+            self.enforce_quota(quota, now)
+        free = self.make_room()
+
+        folders = {"uploads": self.upload_folder, "audio": self.audio_folder}
+        folders.update((quota.name, quota.path) for quota in self.quotas)
+        reclaimed = sum(self._run_bytes.values())
+        files = sum(self._run_files.values())
+        with self._lock:
+            self.runs += 1
+            self.reclaimed_bytes.update(self._run_bytes)
+            self.removed_files.update(self._run_files)
+            self.last_run = {
+                "finished_at": time.time(),
+                "seconds": round(time.monotonic() - started, 3),
+                "removed_files": files,
+                "reclaimed_bytes": reclaimed,
+                "free_bytes": free,
+                "folder_bytes": {name: folder_bytes(path) for name, path in folders.items()},
+            }
+        if files:
+            by_folder = collections.Counter()
+            for (folder, _), size in self._run_bytes.items():
+                by_folder[folder] += size
+            details = ", ".join(f"{folder} {size / 2**20:.1f} MiB" for folder, size in sorted(by_folder.items()))
+            logging.info(
+                f"[Janitor] Removed {files} file(s), reclaimed {reclaimed / 2**20:.1f} MiB ({details}); "
+                f"{free / 2**30:.1f} GiB free."
+            )
+        return reclaimed
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logging.error(f"[Janitor] Storage pass failed: {e}")
+                self._stopping.wait(self.interval)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="janitor", daemon=True)
+        self._thread.start()
+        logging.info(f"[Janitor] Storage janitor started, running every {self.interval:.0f}s.")
+
+    def shutdown(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "free_bytes": shutil.disk_usage(self.upload_folder).free,
+                "min_free_bytes": self.min_free_bytes,
+                "reclaimed_bytes": {f"{folder}/{reason}": n for (folder, reason), n in self.reclaimed_bytes.items()},
+                "removed_files": {f"{folder}/{reason}": n for (folder, reason), n in self.removed_files.items()},
+                "last_run": self.last_run,
+            }
@@ -0,0 +1,172 @@
+# backend/job_metrics.py
+
+import bisect
+import contextlib
+import logging
+import sqlite3
+import threading
+import time
+
+from storage import connect
+
+# Upper bounds of the Prometheus histogram buckets
+STAGE_SECONDS_BUCKETS = (0.05, 0.25, 1, 5, 15, 60, 300, 900, 3600)
+REALTIME_FACTOR_BUCKETS = (0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2)
+
+
+class StageTimer:
+    """
+    Adds up the wall time a job spends in each named stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label value, as Prometheus expects.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # label value -> [bucket counts..., sum, count]
+
+    def observe(self, label, value):
+        series = self.series.setdefault(label, [0] * len(self.buckets) + [0.0, 0])
+        index = bisect.bisect_left(self.buckets, value)
+        # Values above the last bound are only in the +Inf bucket, i.e. the count
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self, name, label_name):
+        for label, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}'
+            yield f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {series[-1]}'
+            yield f'{name}_sum{{{label_name}="{label}"}} {series[-2]:.6f}'
+            yield f'{name}_count{{{label_name}="{label}"}} {series[-1]}'
+
+
+class JobMetrics:
+    """
+    Records how long each job spent per stage (hash, decode, model load,
+    inference, DB write, cleanup, summarise) in the job_metrics table and keeps
+    in-process histograms and counters for the Prometheus /metrics endpoint.
+    Recording is one executemany per job, so it stays on in production.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.stage_seconds = Histogram(STAGE_SECONDS_BUCKETS)
+        self.realtime_factor = Histogram(REALTIME_FACTOR_BUCKETS)
+        self.outcomes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_metrics (
+                transcription_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                seconds REAL NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_job_metrics_transcription ON job_metrics (transcription_id)"
+        )
+
+    def record(self, transcription_id, stages, outcome, profile=None, audio_seconds=None):
+        """
+        Stores the stage timings of one job run and counts its outcome. The
+        inference time over `audio_seconds` is the job's real-time factor.
+        """
+        with self._lock:
+            for stage, seconds in stages.items():
+                self.stage_seconds.observe(stage, seconds)
+            if audio_seconds and "inference" in stages:
+                self.realtime_factor.observe(profile or "default", stages["inference"] / audio_seconds)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if not stages:
+            return
+        now = time.time()
+        try:
+            self._connection().executemany(
+                "INSERT INTO job_metrics (transcription_id, stage, seconds, recorded_at) VALUES (?, ?, ?, ?)",
+                [(transcription_id, stage, seconds, now) for stage, seconds in stages.items()],
+            )
+        except sqlite3.Error as e:
+            logging.warning(f"[Worker] Could not store stage timings for {transcription_id}: {e}")
+
+    def queue_depth(self):
+        """
+        Returns the number of jobs per status.
+        """
+        return dict(
+            self._connection().execute("SELECT status, COUNT(*) FROM transcriptions GROUP BY status").fetchall()
+        )
+
+    def render(self, gauges=(), counters=()):
+        """
+        Returns the metrics in the Prometheus text format. `gauges` and
+        `counters` are extra (name, help, {label_text: value}) triples sampled
+        by the caller, with label_text like 'kind="prompt"' or '' for none.
+        """
+        lines = []
+
+        def family(name, kind, help_text, values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values.items():
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+        family(
+            "transcriber_queue_jobs",
+            "gauge",
+            "Jobs in the transcriptions table by status.",
+            {f'status="{status}"': count for status, count in self.queue_depth().items()},
+        )
+        for name, help_text, values in gauges:
+            family(name, "gauge", help_text, values)
+        with self._lock:
+            family(
+                "transcriber_jobs_total",
+                "counter",
+                "Job runs finished by this process, by outcome.",
+                {f'outcome="{outcome}"': count for outcome, count in sorted(self.outcomes.items())},
+            )
+            lines.append("# HELP transcriber_stage_seconds Wall time spent per pipeline stage of a job.")
+            lines.append("# TYPE transcriber_stage_seconds histogram")
+            lines.extend(self.stage_seconds.samples("transcriber_stage_seconds", "stage"))
+            lines.append("# HELP transcriber_realtime_factor Inference time over audio duration per job.")
+            lines.append("# TYPE transcriber_realtime_factor histogram")
+            lines.extend(self.realtime_factor.samples("transcriber_realtime_factor", "profile"))
+        for name, help_text, values in counters:
+            family(name, "counter", help_text, values)
+        return "\n".join(lines) + "\n"
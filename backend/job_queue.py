@@ -0,0 +1,246 @@
+# backend/job_queue.py
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from storage import connect
+
+
+class JobQueue:
+    """
+    Job queue on top of the transcriptions table that several backend processes
+    or containers can share. Each pipeline stage has its own queue: jobs in
+    `claim_status` are claimed and moved to `active_status` while being worked on.
+
+    Jobs are claimed atomically with a single UPDATE ... RETURNING, highest priority
+    first and FIFO within a priority. A claimed job holds a lease that a heartbeat
+    thread renews; when a worker dies its lease runs out and the job is requeued.
+    A job whose lease ran out on `max_attempts` claims in a row, e.g. media that
+    crashes the worker every time, is moved to 'failed' instead (0 for no limit).
+    """
+
+    def __init__(
+        self,
+        db_path,
+        lease_seconds=120,
+        poll_interval=0.25,
+        worker_id=None,
+        claim_status="pending",
+        active_status="processing",
+        max_attempts=0,
+    ):
+        self.db_path = db_path
+        self.claim_status = claim_status
+        self.active_status = active_status
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{active_status}"
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._notified = False
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._stop = threading.Event()
+
+    def _connection(self):
+        """
+        Returns this thread's autocommit connection, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def claim(self):
+        """
+        Atomically moves the next job in claim_status to active_status under this
+        worker's lease and returns (id, filename), or None if the queue is empty.
+        """
+        now = time.time()
+        rows = self._connection().execute(
+            """
+            UPDATE transcriptions
+            SET status = ?, lease_owner = ?, lease_expires_at = ?,
+                heartbeat_at = ?, attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM transcriptions
+                WHERE status = ?
+                ORDER BY priority DESC, created_at, rowid
+                LIMIT 1
+            )
+            RETURNING id, filename
+            """,
+            (self.active_status, self.worker_id, now + self.lease_seconds, now, self.claim_status),
+        ).fetchall()
+        if not rows:
+            return None
+        with self._held_lock:
+            self._held.add(rows[0][0])
+        return rows[0]
+
+    def release(self, transcription_id):
+        """
+        Drops this worker's lease on a job once its final status has been written.
+        """
+        with self._held_lock:
+            self._held.discard(transcription_id)
+        self._connection().execute(
+            """
+            UPDATE transcriptions
+            SET lease_owner = NULL, lease_expires_at = NULL
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (transcription_id, self.worker_id),
+        )
+
+    def abandon(self, transcription_id):
+        """
+        Stops renewing the lease on a job without touching its row, e.g. when its
+        final status could not be written: it is requeued once the lease runs out.
+        """
+        with self._held_lock:
+            self._held.discard(transcription_id)
+
+    def heartbeat(self):
+        """
+        Extends the leases of all jobs held by this worker. Jobs whose lease was
+        taken over by another worker are logged and forgotten.
+        """
+        with self._held_lock:
+            held = list(self._held)
+        now = time.time()
+        conn = self._connection()
+        for transcription_id in held:
+            updated = conn.execute(
+                """
+                UPDATE transcriptions
+                SET heartbeat_at = ?, lease_expires_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = ?
+                """,
+                (now, now + self.lease_seconds, transcription_id, self.worker_id, self.active_status),
+            ).rowcount
+            if not updated:
+                logging.warning(f"Lost lease on transcription ID: {transcription_id}")
+                with self._held_lock:
+                    self._held.discard(transcription_id)
+
+    def _heartbeat_loop(self):
+        # Also requeues jobs of workers in other processes that stopped heartbeating
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.heartbeat()
+                self.requeue_expired()
+            except sqlite3.Error as e:
+                logging.error(f"Error renewing job leases: {e}")
+
+    def start_heartbeat(self):
+        if self._heartbeat_thread is None:
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+            self._heartbeat_thread.start()
+
+    def requeue_expired(self):
+        """
+        Returns jobs whose lease has run out (or that were claimed before leases
+        existed) to claim_status and returns their (id, filename) rows. Those that
+        used up max_attempts are failed instead.
+        """
+        conn = self._connection()
+        now = time.time()
+        if self.max_attempts:
+            failed = conn.execute(
+                """
+                UPDATE transcriptions
+                SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL
+                WHERE status = ?
+                  AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                  AND attempts >= ?
+                RETURNING id, filename, attempts
+                """,
+                (self.active_status, now, self.max_attempts),
+            ).fetchall()
+            for transcription_id, filename, attempts in failed:
+                logging.warning(
+                    f"Failed transcription ID: {transcription_id} ({filename}), its lease ran out "
+                    f"on {attempts} attempt(s) in a row."
+                )
+        rows = conn.execute(
+            """
+            UPDATE transcriptions
+            SET status = ?, lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = ?
+              AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+            RETURNING id, filename
+            """,
+            (self.claim_status, self.active_status, now),
+        ).fetchall()
+        if rows:
+            self.notify()
+        return rows
+
+    def requeue_held(self):
+        """
+        Hands every job still leased by this worker back to claim_status, e.g. when
+        a shutdown cannot wait for them to finish. The interrupted claim does not
+        count as an attempt.
+        """
+        rows = self._connection().execute(
+            """
+            UPDATE transcriptions
+            SET status = ?, lease_owner = NULL, lease_expires_at = NULL,
+                attempts = MAX(attempts - 1, 0)
+            WHERE status = ? AND lease_owner = ?
+            RETURNING id, filename
+            """,
+            (self.claim_status, self.active_status, self.worker_id),
+        ).fetchall()
+        with self._held_lock:
+            self._held.clear()
+        return rows
+
+    def change_token(self):
+        """
+        Returns a value that changes whenever another connection commits to the
+        database. Take it before claim() and pass it to wait_for_work().
+        """
+        return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def notify(self):
+        """
+        Wakes up wait_for_work() in this process, e.g. after inserting a job.
+        """
+        with self._wakeup:
+            self._notified = True
+            self._wakeup.notify_all()
+
+    def wait_for_work(self, token, timeout=30, cancel=None):
+        """
+        Blocks until a job may be available: notify() was called in this process,
+        another process committed a change, or `timeout` seconds passed. A set
+        `cancel` event ends the wait early.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._wakeup:
+                if self._notified:
+                    self._notified = False
+                    return True
+            if cancel is not None and cancel.is_set():
+                return False
+            if self.change_token() != token:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._wakeup:
+                if not self._notified:
+                    self._wakeup.wait(min(self.poll_interval, remaining))
+
+    def stop(self):
+        self._stop.set()
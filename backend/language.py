@@ -0,0 +1,92 @@
+# backend/language.py
+
+import logging
+import threading
+
+from audio_stream import SAMPLE_RATE, pcm_stream
+
+
+def parse_language_models(value):
+    """
+    Parses a 'language=model' list such as 'en=distil-large-v3,de=large-v3'
+    into a dict. Blank entries are ignored.
+    """
+    models = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        language, sep, model = entry.partition("=")
+        if not sep or not language.strip() or not model.strip():
+            raise ValueError(f"Expected 'language=model', got {entry!r}")
+        models[language.strip().lower()] = model.strip()
+    return models
+
+
+def read_sample(source, seconds=30, offset=0.0):
+    """
+    Returns up to `seconds` of float32 PCM from a media file path or decoded
+    int16 samples, starting `offset` seconds in to skip intros, or from the
+    beginning if the audio is too short for that. Only the sample is decoded.
+    """
+    sample = None
+    for start in (offset, 0.0) if offset else (0.0,):
+        with pcm_stream(source, block_seconds=seconds, max_blocks=1, start=start) as stream:
+            sample = next(iter(stream), None)
+        if sample is not None and len(sample) >= seconds * SAMPLE_RATE:
+            break
+    return sample
+
+
+class LanguageDetector:
+    """
+    Detects the spoken language of a job on a short sample with a small model,
+    so the heavy model can be chosen for the language and skip its own
+    detection. `load` builds the detection model; it is loaded on first use
+    and shared by all workers. Samples longer than 30 seconds are detected per
+    30-second segment and the votes combined.
+    """
+
+    def __init__(self, load, sample_seconds=30, offset_seconds=30):
+        self.load = load
+        self.sample_seconds = sample_seconds
+        self.offset_seconds = offset_seconds
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self.load()
+            return self._model
+
+    def preload(self):
+        self._get_model()
+
+    def detect(self, source):
+        """
+        Returns (language, probability), or (None, 0.0) if there is no audio.
+        """
+        sample = read_sample(source, self.sample_seconds, self.offset_seconds)
+        if sample is None or not len(sample):
+            return None, 0.0
+        segments = max(1, int(len(sample) / SAMPLE_RATE // 30))
+        language, probability, _ = self._get_model().detect_language(
+            sample, language_detection_segments=segments
+        )
+        return language, probability
+
+
+def route_profile(profile, language, probability, models, min_probability=0.5):
+    """
+    Returns the profile to transcribe with once the language is known: pinned
+    to that language and, if `models` names one for it, running that model.
+    Below `min_probability`, or if the profile already pins a language, the
+    profile is returned unchanged and the model detects the language itself.
+    """
+    if not language or probability < min_probability or profile.options.get("language"):
+        return profile
+    model = models.get(language, profile.model)
+    if model != profile.model:
+        logging.info(f"[Language] Routing '{language}' to {model} instead of {profile.model}.")
+    return profile._replace(model=model, options={**profile.options, "language": language})
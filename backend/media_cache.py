@@ -0,0 +1,165 @@
+# backend/media_cache.py
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import ffmpeg
+
+from storage import connect
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hex digest of a file, read in 1 MiB chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_fingerprint(path):
+    """
+    Returns a SHA-256 of the first audio stream's encoded packets. ffmpeg only
+    demuxes, so this is cheap, and it matches the same recording remuxed into a
+    different container.
+    """
+    out, _ = (
+        ffmpeg.input(path)
+        .output("pipe:", map="0:a:0", c="copy", f="hash", hash="sha256")
+        .global_args("-nostdin", "-loglevel", "error")
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return out.decode("ascii").strip().split("=", 1)[-1].lower()
+
+
+def params_key(**params):
+    """
+    Returns a short stable key for the model and decoding parameters of a job.
+    """
+    encoded = json.dumps(params, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class MediaCache:
+    """
+    Content-addressed cache of finished transcriptions. Entries map a media hash
+    plus a parameters key to the transcriptions row that produced the result, so
+    the text is not stored twice. An entry is only served once that row has been
+    summarised. Least recently used entries beyond `max_entries` are evicted.
+    """
+
+    def __init__(self, db_path, max_entries=10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS media_cache (
+                cache_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                params TEXT NOT NULL,
+                transcription_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_media_cache_last_used ON media_cache (last_used_at)"
+        )
+
+    def lookup(self, keys):
+        """
+        Returns (transcription_id, title, summary) for the first key whose
+        transcription is completed with a summary, or None. Entries whose
+        transcription was removed are dropped. The transcript itself is copied
+        with storage.copy_transcript() rather than read here.
+        """
+        conn = self._connection()
+        for cache_key in keys:
+            row = conn.execute(
+                """
+                SELECT c.transcription_id, t.id, t.status, t.summary, t.title
+                FROM media_cache c
+                LEFT JOIN transcriptions t ON t.id = c.transcription_id
+                WHERE c.cache_key = ?
+                """,
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                continue
+            if row[1] is None:
+                conn.execute("DELETE FROM media_cache WHERE cache_key = ?", (cache_key,))
+                continue
+            status, summary, title = row[2:]
+            if status == "completed" and summary and summary != "No Summary":
+                conn.execute(
+                    "UPDATE media_cache SET hits = hits + 1, last_used_at = ? WHERE cache_key = ?",
+                    (time.time(), cache_key),
+                )
+                self.hits += 1
+                return row[0], title, summary
+        self.misses += 1
+        return None
+
+    def store(self, keys, content_hash, params, transcription_id):
+        """
+        Records a finished transcription under every key and evicts the least
+        recently used entries beyond max_entries.
+        """
+        now = time.time()
+        conn = self._connection()
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO media_cache
+                (cache_key, content_hash, params, transcription_id, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [(cache_key, content_hash, params, transcription_id, now, now) for cache_key in keys],
+        )
+        evicted = conn.execute(
+            """
+            DELETE FROM media_cache WHERE cache_key IN (
+                SELECT cache_key FROM media_cache
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        ).rowcount
+        if evicted:
+            self.evictions += evicted
+            logging.info(f"Evicted {evicted} media cache entries.")
+
+    def metrics(self):
+        entries = self._connection().execute("SELECT COUNT(*) FROM media_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,147 @@
+# backend/model_registry.py
+
+import collections
+import contextlib
+import gc
+import logging
+import threading
+import time
+
+from resources import estimate_model_bytes
+
+# A named trade-off between speed and accuracy that an upload can ask for. The
+# compute type is picked by device; options are passed to model.transcribe.
+Profile = collections.namedtuple(
+    "Profile", ["name", "model", "cpu_compute_type", "cuda_compute_type", "options"]
+)
+
+
+def default_profiles(fast_model="small", accurate_model="large-v3-turbo"):
+    """
+    'fast' runs a smaller model with int8 weights and greedy decoding; 'accurate'
+    int8 weights with float32 activations and beam search (float16 on CUDA).
+    """
+    return {
+        "fast": Profile("fast", fast_model, "int8", "int8_float16", {"beam_size": 1}),
+        "accurate": Profile("accurate", accurate_model, "int8_float32", "float16", {"beam_size": 5}),
+    }
+
+
+def compute_type_for(profile, device):
+    return profile.cuda_compute_type if device == "cuda" else profile.cpu_compute_type
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps them for later jobs, least recently used
+    first out once the estimated size of the loaded models would exceed
+    `budget_bytes`. `load(key)` builds a model and `size_of(key)` estimates its
+    memory; keys default to (model_name, compute_type) pairs. A model is only
+    evicted while no job holds it through use(); if everything loaded is busy
+    the new model is loaded over budget rather than failing the job.
+    """
+
+    def __init__(self, load, budget_bytes, size_of=None):
+        self.load = load
+        self.budget_bytes = budget_bytes
+        self.size_of = size_of or (lambda key: estimate_model_bytes(*key))
+        self._entries = collections.OrderedDict()  # key -> [model, size, users]
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def _loaded_bytes(self):
+        return sum(size for _, size, _ in self._entries.values())
+
+    def _evict_for(self, size):
+        """
+        Drops idle models, oldest use first, until `size` more bytes fit.
+        Called with the lock held.
+        """
+        for key in list(self._entries):
+            if self._loaded_bytes() + size <= self.budget_bytes:
+                break
+            model, model_size, users = self._entries[key]
+            if users:
+                continue
+            del self._entries[key]
+            self.evictions += 1
+            logging.info(f"[Models] Evicted {key} ({model_size / 2**30:.1f} GiB) to stay under the budget.")
+            close = getattr(model, "close", None)
+            if close:
+                close()
+        return self._loaded_bytes() + size <= self.budget_bytes
+
+    def _acquire(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry[2] += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+        # Loads are serialised so two jobs never load the same model twice
+        with self._load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry:
+                    entry[2] += 1
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                size = self.size_of(key)
+                if not self._evict_for(size):
+                    logging.warning(
+                        f"[Models] Loading {key} exceeds the {self.budget_bytes / 2**30:.1f} GiB "
+                        "model budget; every loaded model is in use."
+                    )
+            gc.collect()
+            started = time.perf_counter()
+            model = self.load(key)
+            self.loads += 1
+            logging.info(f"[Models] Loaded {key} in {time.perf_counter() - started:.1f}s.")
+            with self._lock:
+                self._entries[key] = [model, size, 1]
+            return model
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry[2] -= 1
+
+    @contextlib.contextmanager
+    def use(self, key):
+        """
+        Yields the model for `key`, loading it if needed, and keeps it from
+        being evicted until the block exits.
+        """
+        model = self._acquire(key)
+        try:
+            yield model
+        finally:
+            self._release(key)
+
+    def is_loaded(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def close(self):
+        with self._lock:
+            entries, self._entries = self._entries, collections.OrderedDict()
+        for model, _, _ in entries.values():
+            close = getattr(model, "close", None)
+            if close:
+                close()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "loaded": [
+                    {"model": list(key), "bytes": size, "in_use": users}
+                    for key, (_, size, users) in self._entries.items()
+                ],
+                "loaded_bytes": self._loaded_bytes(),
+                "budget_bytes": self.budget_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
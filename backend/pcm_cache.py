@@ -0,0 +1,223 @@
+# backend/pcm_cache.py
+
+import logging
+import os
+import threading
+import time
+import uuid
+import wave
+
+import ffmpeg
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def read_pcm_wav(path):
+    """
+    Returns the samples of a 16 kHz mono 16-bit PCM WAV as a memory-mapped int16
+    array, or None if the file is anything else. Only the header is read, so
+    this is cheap enough to try on every input before falling back to ffmpeg.
+    """
+    try:
+        with open(path, "rb") as f:
+            with wave.open(f) as w:
+                if (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getcomptype()) != (
+                    1,
+                    2,
+                    SAMPLE_RATE,
+                    "NONE",
+                ):
+                    return None
+                frames = w.getnframes()
+                # The header has been read up to the start of the sample data
+                offset = f.tell()
+    except (wave.Error, EOFError, OSError):
+        return None
+    frames = min(frames, (os.path.getsize(path) - offset) // 2)
+    if frames <= 0:
+        return None
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames,))
+
+
+class CacheFill:
+    """
+    Writes s16le PCM decoded elsewhere, e.g. by a PCMStream while the file is
+    transcribed, into a temporary file of the cache and moves it into place
+    once the whole file is decoded. A failed write, such as on a full disk,
+    drops the file and leaves the decode running.
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        self.partial = f"{path}.{uuid.uuid4().hex}.part"
+        self.written_bytes = 0
+        self._file = None
+        self._done = False
+
+    def write(self, data):
+        if self._done:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.partial, "wb")
+            self._file.write(data)
+        except OSError as e:
+            logging.warning(f"[Worker] Not caching the decoded audio: {e}")
+            self.discard()
+            return
+        self.written_bytes += len(data)
+
+    def commit(self):
+        if self._done:
+            return
+        if not self.written_bytes:
+            self.discard()
+            return
+        self._done = True
+        try:
+            self._file.close()
+            self._file = None
+            os.replace(self.partial, self.path)
+        except OSError as e:
+            logging.warning(f"[Worker] Not caching the decoded audio: {e}")
+            self.discard()
+            return
+        logging.info(
+            f"[Worker] Stored the decoded audio in the PCM cache ({self.written_bytes / 2**20:.1f} MiB)."
+        )
+        self.cache.evict(keep=self.path)
+
+    def discard(self):
+        self._done = True
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.partial)
+        except FileNotFoundError:
+            pass
+
+
+class PCMCache:
+    """
+    On-disk cache of decoded audio: 16 kHz mono s16le PCM keyed by the content
+    hash of the source file, so a retried job or the same upload run with
+    another profile skips ffmpeg. A file is filled either by store() or, while
+    the decode feeds the model, through fill(). Files are memory-mapped on
+    reuse, and the least recently used ones are deleted once the folder exceeds
+    `max_bytes`.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.decode_seconds = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, content_hash):
+        return os.path.join(self.folder, f"{content_hash}.pcm")
+
+    def open(self, content_hash):
+        """
+        Returns the cached samples as a memory-mapped int16 array, or None.
+        """
+        path = self._path(content_hash)
+        try:
+            # The modification time orders the LRU; atime is often not updated
+            os.utime(path)
+            samples = np.memmap(path, dtype="<i2", mode="r")
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return samples
+
+    def store(self, content_hash, source_path):
+        """
+        Decodes `source_path` with ffmpeg into the cache and returns the samples
+        as open() would. Concurrent decodes of the same file each write their
+        own temporary file and the last rename wins.
+        """
+        path = self._path(content_hash)
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        started = time.perf_counter()
+        try:
+            (
+                ffmpeg.input(source_path)
+                .output(partial, format="s16le", acodec="pcm_s16le", ac=1, ar="16k")
+                .global_args("-nostdin", "-loglevel", "error")
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.decode_seconds += elapsed
+        logging.info(
+            f"[Worker] Decoded audio into the PCM cache in {elapsed:.1f}s "
+            f"({os.path.getsize(path) / 2**20:.1f} MiB)."
+        )
+        self.evict(keep=path)
+        return np.memmap(path, dtype="<i2", mode="r")
+
+    def fill(self, content_hash):
+        """
+        Returns a CacheFill for the decoded audio of `content_hash`.
+        """
+        return CacheFill(self, self._path(content_hash))
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".pcm"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Deletes the least recently used files until the cache fits in max_bytes.
+        Jobs that still have a deleted file mapped keep reading it.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+        return total
+
+    def metrics(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "decode_seconds": round(self.decode_seconds, 3),
+        }
@@ -0,0 +1,114 @@
+# backend/progress.py
+
+import collections
+import logging
+import sqlite3
+import time
+
+import ffmpeg
+
+from storage import connect
+
+
+def probe_duration(path):
+    """
+    Returns the duration of a media file in seconds, or None if ffprobe cannot tell.
+    """
+    try:
+        return float(ffmpeg.probe(path)["format"]["duration"])
+    except (ffmpeg.Error, KeyError, TypeError, ValueError) as e:
+        logging.warning(f"[Worker] Could not probe the duration of {path}: {e}")
+        return None
+
+
+class ProgressReporter:
+    """
+    Records how far a job has got in its transcriptions row: the stage, the end
+    of the latest segment against the media duration, an ETA from the rate so
+    far and the tail of the transcript. Stage changes are written at once;
+    segment updates at most every `interval` seconds, so reporting every
+    segment of a multi-hour job costs one small UPDATE per interval. A resumed
+    job starts at `start` seconds, which does not count towards the rate.
+    """
+
+    def __init__(self, db_path, transcription_id, duration=None, interval=2.0, text_chars=400, start=0.0):
+        self.transcription_id = transcription_id
+        self.duration = duration
+        self.interval = interval
+        self.text_chars = text_chars
+        self.stage_name = None
+        self.start = start
+        self.position = start
+        self._conn = connect(db_path)
+        self._tail = collections.deque()
+        self._tail_chars = 0
+        self._started_at = None
+        self._written_at = 0.0
+
+    def stage(self, name):
+        self.stage_name = name
+        self._write()
+
+    def update(self, position, text=None):
+        """
+        Notes that the transcript has reached `position` seconds, optionally with
+        the text that got it there.
+        """
+        now = time.monotonic()
+        if self._started_at is None:
+            self._started_at = now
+        self.position = max(self.position, position)
+        if text:
+            self._tail.append(text.strip())
+            self._tail_chars += len(text)
+            while len(self._tail) > 1 and self._tail_chars - len(self._tail[0]) >= self.text_chars:
+                self._tail_chars -= len(self._tail.popleft())
+        if now - self._written_at >= self.interval:
+            self._write()
+
+    def eta(self):
+        """
+        Seconds left at the rate seen so far, or None before there is a rate.
+        """
+        if not self.duration or self.position <= self.start or self._started_at is None:
+            return None
+        rate = (self.position - self.start) / max(time.monotonic() - self._started_at, 1e-6)
+        return max(0.0, (self.duration - self.position) / rate)
+
+    def _write(self):
+        self._written_at = time.monotonic()
+        text = " ".join(self._tail)
+        if len(text) > self.text_chars:
+            # Start the tail at a word boundary
+            text = text[-self.text_chars :].split(" ", 1)[-1]
+        try:
+            self._conn.execute(
+                """
+                UPDATE transcriptions
+                SET progress_stage = ?, progress_position = ?, progress_duration = ?,
+                    progress_eta = ?, progress_text = ?, progress_updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    self.stage_name,
+                    self.position,
+                    self.duration,
+                    self.eta(),
+                    text,
+                    time.time(),
+                    self.transcription_id,
+                ),
+            )
+        except sqlite3.OperationalError as e:
+            # Progress is advisory; a locked database must not fail the job
+            logging.warning(f"[Worker] Could not record progress: {e}")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,146 @@
+# backend/resources.py
+
+import os
+import resource
+import threading
+
+
+def current_rss_bytes():
+    """
+    Returns the resident set size of this process in bytes.
+    Falls back to the lifetime peak from getrusage when /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ResourceMonitor:
+    """
+    Samples process RSS in a background thread while a job runs and keeps the peak.
+    RSS is process-wide, so with several workers the peak includes the other jobs;
+    rss_growth_bytes, the peak over the RSS at the start, is closer to what the job
+    itself added. Intermediate files written by the job are reported through
+    add_disk_usage() and, once removed, release_disk_usage().
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.start_rss_bytes = current_rss_bytes()
+        self.peak_rss_bytes = self.start_rss_bytes
+        self.disk_bytes = 0
+        self.peak_disk_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes())
+
+    @property
+    def rss_growth_bytes(self):
+        return max(0, self.peak_rss_bytes - self.start_rss_bytes)
+
+    def add_disk_usage(self, nbytes):
+        self.disk_bytes += nbytes
+        self.peak_disk_bytes = max(self.peak_disk_bytes, self.disk_bytes)
+
+    def release_disk_usage(self, nbytes):
+        self.disk_bytes = max(0, self.disk_bytes - nbytes)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes())
+        return False
+
+
+def available_cores():
+    """
+    Returns the number of cores this process may use, honouring CPU affinity and a
+    cgroup v2 CPU quota (e.g. docker --cpus).
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def available_memory_bytes():
+    """
+    Returns the memory that can still be allocated: MemAvailable from /proc/meminfo,
+    capped by the remaining headroom under a cgroup v2 memory limit.
+    """
+    available = None
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/memory.max", "r") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            with open("/sys/fs/cgroup/memory.current", "r") as f:
+                headroom = int(limit) - int(f.read().strip())
+            available = headroom if available is None else min(available, headroom)
+    except (OSError, ValueError):
+        pass
+    if available is None:
+        available = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    return available
+
+
+# Approximate parameter counts of the Whisper checkpoints and bytes per weight
+MODEL_PARAMETERS = {
+    "tiny": 39e6,
+    "base": 74e6,
+    "small": 244e6,
+    "medium": 769e6,
+    "large-v1": 1550e6,
+    "large-v2": 1550e6,
+    "large-v3": 1550e6,
+    "large-v3-turbo": 809e6,
+    "turbo": 809e6,
+    "distil-large-v2": 756e6,
+    "distil-large-v3": 756e6,
+    "distil-medium": 394e6,
+    "distil-small": 166e6,
+}
+BYTES_PER_WEIGHT = {
+    "float32": 4,
+    "float16": 2,
+    "bfloat16": 2,
+    "int8_float32": 1,
+    "int8_float16": 1,
+    "int8": 1,
+}
+
+
+def estimate_model_bytes(model_name, compute_type):
+    """
+    Estimates the resident size of a loaded model from its parameter count.
+    Unknown models are assumed to be as large as large-v3.
+    """
+    name = model_name.split("/")[-1].replace("faster-whisper-", "").replace(".en", "")
+    parameters = MODEL_PARAMETERS.get(name, MODEL_PARAMETERS["large-v3"])
+    return int(parameters * BYTES_PER_WEIGHT.get(compute_type, 4))
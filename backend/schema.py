@@ -0,0 +1,104 @@
+# backend/schema.py
+
+import logging
+
+from search_index import make_contentless, replace_update_trigger
+from storage import (
+    TRANSCRIPT_BODIES_CLEANUP,
+    TRANSCRIPT_BODIES_TABLE,
+    add_columns,
+    move_transcripts_to_bodies,
+)
+
+# Columns added to the transcriptions table after the initial schema
+SCHEMA_COLUMNS = [
+    # Peak RSS of the whole process while the job ran, other jobs included
+    ("peak_rss_bytes", "INTEGER"),
+    ("peak_disk_bytes", "INTEGER"),
+    # Job queue: higher priority first, then FIFO by created_at
+    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+    ("lease_owner", "TEXT"),
+    ("lease_expires_at", "REAL"),
+    ("heartbeat_at", "REAL"),
+    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+    # SHA-256 of the uploaded media, used for deduplication
+    ("content_hash", "TEXT"),
+    # Summary stage token and latency accounting
+    ("summary_prompt_tokens", "INTEGER"),
+    ("summary_completion_tokens", "INTEGER"),
+    ("summary_requests", "INTEGER"),
+    ("summary_chunks", "INTEGER"),
+    ("summary_cached_chunks", "INTEGER"),
+    ("summary_seconds", "REAL"),
+    # Unix time the job reached 'completed', served as Last-Modified by exports
+    ("completed_at", "REAL"),
+    # Live progress of the running stage, pushed to the browser by the frontend
+    ("progress_stage", "TEXT"),
+    ("progress_position", "REAL"),
+    ("progress_duration", "REAL"),
+    ("progress_eta", "REAL"),
+    ("progress_text", "TEXT"),
+    ("progress_updated_at", "REAL"),
+    # Audio length and the share of it left after the VAD pre-pass
+    ("audio_seconds", "REAL"),
+    ("speech_ratio", "REAL"),
+    # Transcription profile requested at upload, 'fast' or 'accurate'
+    ("profile", "TEXT"),
+    # Transcription parameters of the checkpointed segments a restarted job resumes from
+    ("checkpoint_params", "TEXT"),
+    # Language found by the detection pass, or by the model if the pass is off
+    ("language", "TEXT"),
+    ("language_probability", "REAL"),
+    # Speakers found by the diarization stage, NULL if it did not run
+    ("speaker_count", "INTEGER"),
+    # How far the process RSS grew over its value when the job started
+    ("rss_growth_bytes", "INTEGER"),
+]
+
+SCHEMA_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_transcriptions_queue
+    ON transcriptions (status, priority DESC, created_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transcriptions_created_at
+    ON transcriptions (created_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transcriptions_content_hash
+    ON transcriptions (content_hash)
+    """,
+]
+
+
+# Changes that rewrite data or replace schema objects, applied once per database by
+# storage.migrate() after the tables and the search index exist
+MIGRATIONS = [
+    ("search_update_skips_transcript", replace_update_trigger),
+    ("transcript_bodies", move_transcripts_to_bodies),
+    ("contentless_search_index", make_contentless),
+]
+
+
+def ensure_schema(conn):
+    """
+    Creates the transcriptions table if the frontend has not done so yet and adds
+    any columns and indexes introduced after the initial schema.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS transcriptions (
+            id TEXT PRIMARY KEY,
+            filename TEXT UNIQUE,
+            title TEXT,
+            transcription TEXT,
+            summary TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    for column in add_columns(conn, "transcriptions", SCHEMA_COLUMNS):
+        logging.info(f"Added column '{column}' to transcriptions table.")
+    for statement in SCHEMA_INDEXES + [TRANSCRIPT_BODIES_TABLE, TRANSCRIPT_BODIES_CLEANUP]:
+        conn.execute(statement)
@@ -0,0 +1,181 @@
+# backend/search_index.py
+
+import logging
+
+from storage import load_transcript, transaction
+
+# The FTS table is contentless: it holds only the index, not a second, plain copy
+# of every transcript next to the compressed one in transcript_bodies. search_docs
+# gives every transcription a stable integer rowid for it; AUTOINCREMENT keeps the
+# rowid of a removed transcription from being handed to a new one.
+SEARCH_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS search_docs (
+        doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transcription_id TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transcriptions_fts USING fts5(
+        title, summary, transcription,
+        content = '',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+]
+
+# A contentless row can only be removed given the text it was indexed from, and
+# SQL cannot read compressed transcripts, so changes of the title, summary or
+# transcript go through index_document(). New rows are indexed as inserted. The
+# frontend unindexes a transcription before deleting it (search.remove_document);
+# a row deleted otherwise only loses its search_docs entry, and its terms stay in
+# the index without matching a transcription again.
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS search_insert AFTER INSERT ON transcriptions
+    BEGIN
+        INSERT INTO search_docs (transcription_id) VALUES (NEW.id);
+        INSERT INTO transcriptions_fts (rowid, title, summary, transcription)
+        SELECT doc_id, NEW.title, NEW.summary, NEW.transcription
+        FROM search_docs WHERE transcription_id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_delete AFTER DELETE ON transcriptions
+    BEGIN
+        DELETE FROM search_docs WHERE transcription_id = OLD.id;
+    END
+    """,
+]
+
+# Rows indexed per query when transcriptions are indexed in bulk
+INDEX_BATCH = 200
+
+
+def _index_missing(conn):
+    """
+    Indexes the transcriptions that have no search_docs row and returns how many.
+    """
+    added = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT id, title, summary FROM transcriptions
+            WHERE id NOT IN (SELECT transcription_id FROM search_docs)
+            LIMIT ?
+            """,
+            (INDEX_BATCH,),
+        ).fetchall()
+        if not rows:
+            return added
+        for transcription_id, title, summary in rows:
+            conn.execute("INSERT INTO search_docs (transcription_id) VALUES (?)", (transcription_id,))
+            conn.execute(
+                """
+                INSERT INTO transcriptions_fts (rowid, title, summary, transcription)
+                SELECT doc_id, ?, ?, ? FROM search_docs WHERE transcription_id = ?
+                """,
+                (title, summary, load_transcript(conn, transcription_id), transcription_id),
+            )
+        added += len(rows)
+
+
+def ensure_schema(conn):
+    """
+    Creates the FTS5 index and its triggers, and indexes transcriptions written
+    before they existed.
+    """
+    for statement in SEARCH_TABLES + SEARCH_TRIGGERS:
+        conn.execute(statement)
+    with transaction(conn):
+        added = _index_missing(conn)
+    if added:
+        logging.info(f"Indexed {added} existing transcription(s) for search.")
+
+
+def replace_update_trigger(conn):
+    """
+    Migration: the first search_update trigger rebuilt the whole row from
+    transcriptions.transcription, which is empty once transcripts are compressed.
+    The contentless index has no update trigger at all.
+    """
+    conn.execute("DROP TRIGGER IF EXISTS search_update")
+
+
+def make_contentless(conn):
+    """
+    Migration: the first index stored a plain copy of every title, summary and
+    transcript. Rebuilds it contentless from the transcriptions table.
+    """
+    for trigger in ("search_insert", "search_update", "search_delete"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS transcriptions_fts")
+    conn.execute("DROP TABLE IF EXISTS search_docs")
+    for statement in SEARCH_TABLES + SEARCH_TRIGGERS:
+        conn.execute(statement)
+    added = _index_missing(conn)
+    if added:
+        logging.info(f"Rebuilt the search index over {added} transcription(s).")
+
+
+def _unindex(conn, transcription_id):
+    """
+    Removes the indexed row of a transcription, given the values it was indexed
+    from, and returns its doc_id, or None if it has none.
+    """
+    row = conn.execute(
+        """
+        SELECT d.doc_id, t.title, t.summary FROM search_docs d
+        JOIN transcriptions t ON t.id = d.transcription_id
+        WHERE d.transcription_id = ?
+        """,
+        (transcription_id,),
+    ).fetchone()
+    if not row:
+        return None
+    doc_id, title, summary = row
+    conn.execute(
+        """
+        INSERT INTO transcriptions_fts (transcriptions_fts, rowid, title, summary, transcription)
+        VALUES ('delete', ?, ?, ?, ?)
+        """,
+        (doc_id, title, summary, load_transcript(conn, transcription_id)),
+    )
+    return doc_id
+
+
+def index_document(conn, transcription_id, title, summary, text):
+    """
+    Sets the indexed title, summary and transcript of a transcription. Runs in
+    the transaction that writes them, before they are written: the old row is
+    removed using the values the transcriptions row and transcript_bodies still
+    hold.
+    """
+    doc_id = _unindex(conn, transcription_id)
+    if doc_id is None:
+        conn.execute("INSERT OR IGNORE INTO search_docs (transcription_id) VALUES (?)", (transcription_id,))
+        doc_id = conn.execute(
+            "SELECT doc_id FROM search_docs WHERE transcription_id = ?", (transcription_id,)
+        ).fetchone()[0]
+    conn.execute(
+        "INSERT INTO transcriptions_fts (rowid, title, summary, transcription) VALUES (?, ?, ?, ?)",
+        (doc_id, title, summary, text),
+    )
+
+
+def index_transcript(conn, transcription_id, text):
+    """
+    Sets the indexed transcript of a transcription, before it is stored.
+    """
+    title, summary = conn.execute(
+        "SELECT title, summary FROM transcriptions WHERE id = ?", (transcription_id,)
+    ).fetchone()
+    index_document(conn, transcription_id, title, summary, text)
+
+
+def index_summary(conn, transcription_id, title, summary):
+    """
+    Sets the indexed title and summary of a transcription, before they are stored.
+    """
+    index_document(conn, transcription_id, title, summary, load_transcript(conn, transcription_id))
+
@@ -0,0 +1,323 @@
+# backend/segments.py
+
+import array
+import itertools
+import sys
+import threading
+import time
+
+from audio_stream import TimedSegment
+from storage import add_columns, connect, transaction
+
+# Segments per stored block; a block is written as soon as it fills up
+BLOCK_SEGMENTS = 64
+
+# A block that is still filling up is written at most this often
+CHECKPOINT_SECONDS = 15.0
+
+# Stored in the speakers array of segments no speaker was found for
+NO_SPEAKER = 0xFFFF
+
+SEGMENT_COLUMNS = (
+    "transcription_id, block_index, start, end, count, starts, ends, "
+    "avg_logprobs, no_speech_probs, text_offsets, text, speakers"
+)
+
+
+def speaker_label(speaker):
+    return f"Speaker {speaker + 1}"
+
+
+def _pack(values, typecode):
+    packed = array.array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(blob, typecode):
+    values = array.array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class SegmentWriter:
+    """
+    Buffers segments of one transcription as columns (float32 start, end,
+    avg_logprob and no_speech_prob arrays, uint32 text offsets and one UTF-8 text
+    blob) and writes a block every `block_segments` segments. The block being
+    filled is also checkpointed every `checkpoint_seconds`, so a crash loses at
+    most that much of the transcript and the partial text can be read while the
+    job runs.
+    """
+
+    def __init__(
+        self,
+        store,
+        transcription_id,
+        block_segments=BLOCK_SEGMENTS,
+        first_block=0,
+        checkpoint_seconds=CHECKPOINT_SECONDS,
+        count=0,
+    ):
+        self.store = store
+        self.transcription_id = transcription_id
+        self.block_segments = block_segments
+        self.block_index = first_block
+        self.checkpoint_seconds = checkpoint_seconds
+        self.count = count
+        self._written_at = time.monotonic()
+        self._reset()
+
+    def _reset(self):
+        self._starts = array.array("f")
+        self._ends = array.array("f")
+        self._avg_logprobs = array.array("f")
+        self._no_speech_probs = array.array("f")
+        self._offsets = array.array("I", [0])
+        self._text = bytearray()
+
+    def add(self, segment):
+        self._starts.append(segment.start)
+        self._ends.append(segment.end)
+        self._avg_logprobs.append(segment.avg_logprob)
+        self._no_speech_probs.append(segment.no_speech_prob)
+        self._text += segment.text.strip().encode("utf-8")
+        self._offsets.append(len(self._text))
+        self.count += 1
+        if len(self._starts) >= self.block_segments:
+            self.flush()
+        elif time.monotonic() - self._written_at >= self.checkpoint_seconds:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Writes the segments of the current block so far; the block is replaced
+        as it grows until flush() completes it.
+        """
+        if not self._starts:
+            return
+        self._written_at = time.monotonic()
+        self.store.write_block(
+            self.transcription_id,
+            self.block_index,
+            self._starts[0],
+            self._ends[-1],
+            len(self._starts),
+            _pack(self._starts, "f"),
+            _pack(self._ends, "f"),
+            _pack(self._avg_logprobs, "f"),
+            _pack(self._no_speech_probs, "f"),
+            _pack(self._offsets, "I"),
+            bytes(self._text),
+        )
+
+    def flush(self):
+        if not self._starts:
+            return
+        self.checkpoint()
+        self.block_index += 1
+        self._reset()
+
+
+class SegmentStore:
+    """
+    Timestamped segments of each transcription, stored in the `segments` table as
+    blocks of column arrays rather than one row per segment. Blocks are ordered
+    by (transcription_id, block_index) and carry their time range, so exports and
+    seeks read only the blocks they need.
+    """
+
+    def __init__(self, db_path, block_segments=BLOCK_SEGMENTS, checkpoint_seconds=CHECKPOINT_SECONDS):
+        self.db_path = db_path
+        self.block_segments = block_segments
+        self.checkpoint_seconds = checkpoint_seconds
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                transcription_id TEXT NOT NULL,
+                block_index INTEGER NOT NULL,
+                start REAL NOT NULL,
+                end REAL NOT NULL,
+                count INTEGER NOT NULL,
+                starts BLOB NOT NULL,
+                ends BLOB NOT NULL,
+                avg_logprobs BLOB NOT NULL,
+                no_speech_probs BLOB NOT NULL,
+                text_offsets BLOB NOT NULL,
+                text BLOB NOT NULL,
+                speakers BLOB,
+                PRIMARY KEY (transcription_id, block_index)
+            ) WITHOUT ROWID
+            """
+        )
+        # uint16 speaker per segment, NULL until the block has been diarized
+        add_columns(conn, "segments", [("speakers", "BLOB")])
+        # The frontend deletes transcriptions without knowing about segments
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS segments_cleanup AFTER DELETE ON transcriptions
+            BEGIN
+                DELETE FROM segments WHERE transcription_id = OLD.id;
+            END
+            """
+        )
+
+    def writer(self, transcription_id, resume=False):
+        """
+        Returns a SegmentWriter for a transcription. Segments left by an earlier
+        attempt are dropped, or kept and appended to if `resume` is set.
+        """
+        first_block, count = 0, 0
+        if resume:
+            checkpoint = self.checkpoint(transcription_id)
+            if checkpoint:
+                first_block, count = checkpoint[0] + 1, checkpoint[2]
+        else:
+            self.delete(transcription_id)
+        return SegmentWriter(
+            self, transcription_id, self.block_segments, first_block, self.checkpoint_seconds, count
+        )
+
+    def checkpoint(self, transcription_id):
+        """
+        Returns (last block index, end in seconds, segment count) of the segments
+        stored for a transcription, or None if there are none.
+        """
+        row = self._connection().execute(
+            "SELECT MAX(block_index), MAX(end), SUM(count) FROM segments WHERE transcription_id = ?",
+            (transcription_id,),
+        ).fetchone()
+        return row if row[0] is not None else None
+
+    def write_block(self, transcription_id, block_index, start, end, count, *columns):
+        self._connection().execute(
+            """
+            INSERT OR REPLACE INTO segments
+                (transcription_id, block_index, start, end, count, starts, ends,
+                 avg_logprobs, no_speech_probs, text_offsets, text)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (transcription_id, block_index, start, end, count) + columns,
+        )
+
+    def iter_segments(self, transcription_id, start=0.0):
+        """
+        Yields the TimedSegments of a transcription in order, beginning with the
+        block that contains `start` seconds. One block is decoded at a time.
+        """
+        conn = self._connection()
+        rows = conn.execute(
+            """
+            SELECT starts, ends, avg_logprobs, no_speech_probs, text_offsets, text, speakers
+            FROM segments
+            WHERE transcription_id = ? AND end >= ?
+            ORDER BY block_index
+            """,
+            (transcription_id, start),
+        )
+        for starts, ends, avg_logprobs, no_speech_probs, offsets, text, speakers in rows:
+            starts = _unpack(starts, "f")
+            ends = _unpack(ends, "f")
+            avg_logprobs = _unpack(avg_logprobs, "f")
+            no_speech_probs = _unpack(no_speech_probs, "f")
+            offsets = _unpack(offsets, "I")
+            speakers = _unpack(speakers, "H") if speakers else None
+            for i in range(len(starts)):
+                speaker = speakers[i] if speakers and speakers[i] != NO_SPEAKER else None
+                yield TimedSegment(
+                    round(starts[i], 3),
+                    round(ends[i], 3),
+                    text[offsets[i] : offsets[i + 1]].decode("utf-8"),
+                    avg_logprobs[i],
+                    no_speech_probs[i],
+                    speaker,
+                )
+
+    def set_speakers(self, transcription_id, assign):
+        """
+        Labels the stored segments of a transcription with speakers in one
+        transaction. `assign(starts, ends)` gets each block's segment times as
+        arrays and returns a speaker index per segment, or -1 for none.
+        """
+        conn = self._connection()
+        with transaction(conn):
+            rows = conn.execute(
+                "SELECT block_index, starts, ends FROM segments WHERE transcription_id = ?",
+                (transcription_id,),
+            ).fetchall()
+            for block_index, starts, ends in rows:
+                speakers = [
+                    NO_SPEAKER if speaker < 0 else int(speaker)
+                    for speaker in assign(_unpack(starts, "f"), _unpack(ends, "f"))
+                ]
+                conn.execute(
+                    "UPDATE segments SET speakers = ? WHERE transcription_id = ? AND block_index = ?",
+                    (_pack(speakers, "H"), transcription_id, block_index),
+                )
+
+    def iter_texts(self, transcription_id):
+        """
+        Yields the segment texts in order; once segments carry speakers, the
+        first text of every speaker turn starts with the speaker's label.
+        """
+        speaker = None
+        for segment in self.iter_segments(transcription_id):
+            if not segment.text:
+                continue
+            if segment.speaker is not None and segment.speaker != speaker:
+                speaker = segment.speaker
+                yield f"{speaker_label(speaker)}: {segment.text}"
+            else:
+                yield segment.text
+
+    def text(self, transcription_id):
+        """
+        Returns the transcript as the segment texts joined with spaces, with one
+        labelled paragraph per speaker turn once segments carry speakers.
+        """
+        turns = []
+        segments = self.iter_segments(transcription_id)
+        for speaker, turn in itertools.groupby(segments, key=lambda segment: segment.speaker):
+            line = " ".join(segment.text for segment in turn if segment.text)
+            if line:
+                turns.append(line if speaker is None else f"{speaker_label(speaker)}: {line}")
+        return "\n\n".join(turns)
+
+    def copy(self, source_id, transcription_id, conn=None):
+        """
+        Copies the segments of one transcription to another, e.g. on a cache hit.
+        Runs on `conn` inside the caller's transaction if given, so the copy
+        commits together with the row update that completes the job.
+        """
+        if conn is None:
+            with transaction(self._connection()) as conn:
+                return self.copy(source_id, transcription_id, conn)
+        conn.execute("DELETE FROM segments WHERE transcription_id = ?", (transcription_id,))
+        conn.execute(
+            f"""
+            INSERT INTO segments ({SEGMENT_COLUMNS})
+            SELECT ?, block_index, start, end, count, starts, ends,
+                   avg_logprobs, no_speech_probs, text_offsets, text, speakers
+            FROM segments WHERE transcription_id = ?
+            """,
+            (transcription_id, source_id),
+        )
+
+    def delete(self, transcription_id):
+        self._connection().execute(
+            "DELETE FROM segments WHERE transcription_id = ?", (transcription_id,)
+        )
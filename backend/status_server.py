@@ -0,0 +1,62 @@
+# backend/status_server.py
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StatusServer:
+    """
+    Small HTTP server for the backend's operational endpoints (metrics, health).
+    Handlers are registered per path and return (status, content_type, body);
+    dicts and lists are served as JSON.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8000):
+        self.host = host
+        self.port = port
+        self.routes = {}
+        self._server = None
+
+    def route(self, path, handler):
+        self.routes[path] = handler
+
+    def _make_handler(self):
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                handler = routes.get(self.path.split("?", 1)[0])
+                if handler is None:
+                    self.send_error(404)
+                    return
+                try:
+                    status, content_type, body = handler()
+                except Exception as e:
+                    logging.exception(f"Error serving {self.path}:")
+                    status, content_type, body = 500, "text/plain", str(e)
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body, indent=2)
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"Status server listening on port {self.port}.")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
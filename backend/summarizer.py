@@ -0,0 +1,516 @@
+# backend/summarizer.py
+
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+
+import openai
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+from job_metrics import StageTimer
+from search_index import index_summary
+from segments import SegmentStore
+from storage import connect, load_transcript, transaction
+
+SYSTEM_PROMPT = "I would like for you to assume the role of a court clerk."
+
+SUMMARY_PROMPT = """Generate a concise summary of the text below.
+                    Text: {transcription}
+
+                    Add a title to the summary.
+
+                    Make sure your summary has useful and true information about the main points of the topic. Begin with a short introduction explaining the topic. If you can, use bullet points to list important details, and finish your summary with a concluding sentence. Return the summary in an html article format.Remove all markdown or unrelated to the summary content."""
+
+# Map step: one part of a long transcript
+CHUNK_PROMPT = """Summarize part {index} of {count} of a transcript.
+                    Text: {transcription}
+
+                    List the main points, names, decisions and figures mentioned in this part as short plain-text bullet points. Do not add a title or an introduction."""
+
+# Reduce step: partial summaries into the final article
+REDUCE_PROMPT = """Below are summaries of consecutive parts of one transcript, in order.
+                    Summaries: {summaries}
+
+                    Combine them into one concise summary of the whole transcript.
+
+                    Add a title to the summary.
+
+                    Make sure your summary has useful and true information about the main points of the topic. Begin with a short introduction explaining the topic. If you can, use bullet points to list important details, and finish your summary with a concluding sentence. Return the summary in an html article format.Remove all markdown or unrelated to the summary content."""
+
+# Bump when the chunk prompt changes so cached chunk summaries are not reused
+CHUNK_PROMPT_VERSION = 1
+
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Counts tokens with tiktoken when it is installed, otherwise estimates them
+    at four characters per token.
+    """
+    global _encoding
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def split_sentences(text):
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", text) if sentence]
+
+
+def split_into_chunks(pieces, max_tokens):
+    """
+    Groups consecutive pieces (segments or sentences) into chunks of at most
+    `max_tokens` tokens without splitting a piece. A single piece longer than the
+    budget is split on word boundaries.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        tokens = count_tokens(piece)
+        if tokens > max_tokens:
+            words = piece.split()
+            step = max(1, len(words) * max_tokens // tokens)
+            for start in range(0, len(words), step):
+                chunks.append(" ".join(words[start : start + step]))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class SummaryUsage:
+    """
+    Token and latency accounting for the summary of one job.
+    """
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self.chunks = 0
+        self.cached_chunks = 0
+        self.started_at = time.monotonic()
+        self.seconds = 0.0
+
+    def add(self, usage):
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+        self.requests += 1
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started_at
+        return self
+
+
+class ChunkSummaryCache:
+    """
+    Stores map-step summaries keyed by a hash of the model, prompt version and
+    chunk text, so retries and re-summaries only pay for chunks that changed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS summary_chunks (
+                chunk_hash TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    @staticmethod
+    def key(model, text):
+        payload = f"{model}\n{CHUNK_PROMPT_VERSION}\n{text}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, chunk_hash):
+        row = self._connection().execute(
+            "SELECT summary FROM summary_chunks WHERE chunk_hash = ?", (chunk_hash,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, chunk_hash, summary, prompt_tokens, completion_tokens):
+        self._connection().execute(
+            """
+            INSERT OR REPLACE INTO summary_chunks
+                (chunk_hash, summary, prompt_tokens, completion_tokens, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (chunk_hash, summary, prompt_tokens, completion_tokens, time.time()),
+        )
+
+
+class Summarizer:
+    """
+    Generates summaries with an OpenAI-compatible chat completions API.
+
+    Transcripts that fit in `chunk_tokens` are summarised with a single request.
+    Longer ones are split along segment (or sentence) boundaries into
+    token-budgeted chunks that are summarised concurrently (map), and the partial
+    summaries are combined into the final HTML article (reduce), recursively if
+    they do not fit in one request either.
+
+    Rate limits and transient errors are retried with exponential backoff and
+    jitter; a Retry-After header from the server takes precedence.
+    """
+
+    def __init__(
+        self,
+        client,
+        model="gpt-4o-mini",
+        max_tokens=400,
+        chunk_tokens=8000,
+        chunk_summary_tokens=300,
+        request_concurrency=8,
+        cache=None,
+        max_retries=5,
+        base_delay=1.0,
+        max_delay=60.0,
+    ):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.chunk_summary_tokens = chunk_summary_tokens
+        self.cache = cache
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = asyncio.Semaphore(request_concurrency)
+
+    def _retry_delay(self, error, attempt):
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        delay = min(self.base_delay * 2**attempt, self.max_delay)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def complete(self, messages, max_tokens=None, usage=None):
+        """
+        Sends one chat completion request with retries and returns the response.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._requests:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens or self.max_tokens,
+                        temperature=0.3,  # Adjust for variability in responses
+                    )
+                if usage is not None:
+                    usage.add(response.usage)
+                return response
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logging.warning(f"[Summary] {type(e).__name__}, retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    async def _ask(self, prompt, max_tokens, usage):
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        response = await self.complete(messages, max_tokens=max_tokens, usage=usage)
+        return response.choices[0].message.content.strip()
+
+    async def _summarize_chunk(self, index, count, text, usage):
+        chunk_hash = ChunkSummaryCache.key(self.model, text) if self.cache else None
+        if chunk_hash:
+            cached = await asyncio.to_thread(self.cache.get, chunk_hash)
+            if cached is not None:
+                usage.cached_chunks += 1
+                return cached
+
+        before = (usage.prompt_tokens, usage.completion_tokens)
+        prompt = CHUNK_PROMPT.format(index=index + 1, count=count, transcription=text)
+        summary = await self._ask(prompt, self.chunk_summary_tokens, usage)
+        if chunk_hash:
+            await asyncio.to_thread(
+                self.cache.put,
+                chunk_hash,
+                summary,
+                usage.prompt_tokens - before[0],
+                usage.completion_tokens - before[1],
+            )
+        return summary
+
+    async def _reduce(self, partials, usage):
+        combined = "\n\n".join(partials)
+        if count_tokens(combined) <= self.chunk_tokens or len(partials) == 1:
+            return await self._ask(REDUCE_PROMPT.format(summaries=combined), self.max_tokens, usage)
+        # Still too long for one request: summarise groups of partial summaries first
+        groups = split_into_chunks(partials, self.chunk_tokens)
+        merged = await asyncio.gather(
+            *(self._summarize_chunk(i, len(groups), group, usage) for i, group in enumerate(groups))
+        )
+        return await self._reduce(list(merged), usage)
+
+    async def summarize(self, transcription, pieces=None):
+        """
+        Returns (summary, usage) for a transcription. `pieces` are the units the
+        transcript may be split at, e.g. segment texts; sentences are used when
+        omitted. The summary is "No Summary" if the transcript is empty or the
+        requests keep failing.
+        """
+        usage = SummaryUsage()
+        if not transcription:
+            logging.warning("Empty transcription received for summarization.")
+            return "No Summary", usage.finish()
+
+        try:
+            if count_tokens(transcription) <= self.chunk_tokens:
+                usage.chunks = 1
+                summary = await self._ask(
+                    SUMMARY_PROMPT.format(transcription=transcription), self.max_tokens, usage
+                )
+                return summary, usage.finish()
+
+            chunks = split_into_chunks(pieces or split_sentences(transcription), self.chunk_tokens)
+            usage.chunks = len(chunks)
+            logging.info(f"[Summary] Transcript split into {len(chunks)} chunks.")
+            partials = await asyncio.gather(
+                *(self._summarize_chunk(i, len(chunks), chunk, usage) for i, chunk in enumerate(chunks))
+            )
+            summary = await self._reduce(list(partials), usage)
+            return summary, usage.finish()
+        except Exception:
+            logging.exception("Error during summarization:")
+            return "No Summary", usage.finish()
+
+
+class SummaryStage:
+    """
+    Pipeline stage that summarises transcribed jobs independently of the
+    transcription workers. It claims 'transcribed' rows from its own JobQueue
+    (moving them to 'summarizing'), runs up to `concurrency` requests at once on
+    an asyncio loop in a background thread, and marks each row 'completed' once
+    its summary is stored. Stage timings go to `job_metrics` if one is given.
+    """
+
+    def __init__(
+        self,
+        job_queue,
+        db_path,
+        client_factory,
+        concurrency=4,
+        idle_seconds=30,
+        job_metrics=None,
+        **summarizer_options
+    ):
+        self.job_queue = job_queue
+        self.db_path = db_path
+        self.client_factory = client_factory
+        self.concurrency = concurrency
+        self.idle_seconds = idle_seconds
+        self.summarizer_options = summarizer_options
+        self.job_metrics = job_metrics
+        self.in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.chunk_cache = ChunkSummaryCache(db_path)
+        self.segment_store = SegmentStore(db_path)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._local = threading.local()
+
+    def _connection(self):
+        # Called from asyncio.to_thread, so each executor thread gets its own connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def _load_transcription(self, transcription_id):
+        """
+        Returns the transcript and its segment texts, which long transcripts are
+        split at, labelled with the speaker at every change of speaker.
+        """
+        transcription = load_transcript(self._connection(), transcription_id)
+        pieces = list(self.segment_store.iter_texts(transcription_id))
+        return transcription, pieces
+
+    def _save_summary(self, transcription_id, summary, usage):
+        # Extract title from summary
+        title = summary.split("\n")[0] if summary else "No Title"
+        conn = self._connection()
+        with transaction(conn):
+            if not conn.execute(
+                "SELECT 1 FROM transcriptions WHERE id = ? AND status = 'summarizing'", (transcription_id,)
+            ).fetchone():
+                return
+            index_summary(conn, transcription_id, title, summary)
+            conn.execute(
+                """
+                UPDATE transcriptions
+                SET title = ?, summary = ?, status = 'completed',
+                    summary_prompt_tokens = ?, summary_completion_tokens = ?,
+                    summary_requests = ?, summary_chunks = ?, summary_cached_chunks = ?,
+                    summary_seconds = ?, completed_at = ?
+                WHERE id = ? AND status = 'summarizing'
+                """,
+                (
+                    title,
+                    summary,
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    usage.requests,
+                    usage.chunks,
+                    usage.cached_chunks,
+                    usage.seconds,
+                    time.time(),
+                    transcription_id,
+                ),
+            )
+
+    async def _process(self, summarizer, job, slots):
+        transcription_id, filename = job
+        timer = StageTimer()
+        outcome = "summary_failed"
+        finished = False
+        try:
+            logging.info(f"[Summary] Summarizing transcription of {filename}...")
+            with timer.stage("summary_load"):
+                transcription, pieces = await asyncio.to_thread(self._load_transcription, transcription_id)
+            with timer.stage("summarize"):
+                summary, usage = await summarizer.summarize(transcription, pieces)
+            with timer.stage("summary_db_write"):
+                await asyncio.to_thread(self._save_summary, transcription_id, summary, usage)
+            finished = True
+            if summary != "No Summary" or not transcription:
+                outcome = "completed"
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+            logging.info(
+                f"[Summary] Summary created for {filename}: {usage.requests} request(s), "
+                f"{usage.prompt_tokens}+{usage.completion_tokens} tokens, "
+                f"{usage.cached_chunks}/{usage.chunks} chunk(s) cached, {usage.seconds:.1f}s."
+            )
+        except Exception:
+            logging.exception(f"[Summary] Error summarizing {filename}:")
+            if not finished:
+                # Completed without a summary, as when the requests keep failing, so the
+                # job is not claimed and sent to the API again and again
+                try:
+                    await asyncio.to_thread(
+                        self._save_summary, transcription_id, "No Summary", SummaryUsage().finish()
+                    )
+                    finished = True
+                except Exception as e:
+                    logging.error(f"[Summary] Could not complete {filename} without a summary: {e}")
+        finally:
+            # A job whose final status was not written is retried once its lease runs out
+            if finished:
+                await asyncio.to_thread(self.job_queue.release, transcription_id)
+            else:
+                self.job_queue.abandon(transcription_id)
+            if self.job_metrics:
+                await asyncio.to_thread(self.job_metrics.record, transcription_id, timer.stages, outcome)
+            self.in_flight -= 1
+            slots.release()
+
+    def _claim_or_wait(self):
+        # The change token is per connection, so it must be taken and checked on
+        # the same thread as the claim
+        token = self.job_queue.change_token()
+        job = self.job_queue.claim()
+        if job is None:
+            self.job_queue.wait_for_work(token, self.idle_seconds, self._stopping)
+        return job
+
+    async def _run(self):
+        await asyncio.to_thread(self.chunk_cache.ensure_schema)
+        await asyncio.to_thread(self.segment_store.ensure_schema)
+        summarizer = Summarizer(self.client_factory(), cache=self.chunk_cache, **self.summarizer_options)
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        while not self._stopping.is_set():
+            await slots.acquire()
+            job = await asyncio.to_thread(self._claim_or_wait)
+            if job is None:
+                slots.release()
+                continue
+            self.in_flight += 1
+            task = asyncio.create_task(self._process(summarizer, job, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def start(self):
+        self.job_queue.start_heartbeat()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="summary-stage", daemon=True)
+        self._thread.start()
+        logging.info(f"[Summary] Summary stage started with concurrency {self.concurrency}.")
+
+    def shutdown(self, timeout=None):
+        """
+        Stops claiming and waits up to `timeout` seconds for in-flight summaries.
+        Unfinished ones are handed back to the queue.
+        """
+        self._stopping.set()
+        self.job_queue.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                requeued = self.job_queue.requeue_held()
+                logging.warning(f"[Summary] Returned {len(requeued)} summary job(s) to the queue.")
+        self.job_queue.stop()
+
+    def metrics(self):
+        return {
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
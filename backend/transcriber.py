@@ -1,19 +1,45 @@
 # backend/transcriber.py
 
+import argparse
+import concurrent.futures
 import logging
 import os
-import shutil
+import signal
 import sqlite3
 import sys
 import threading
 import time
 import uuid
 
+import ctranslate2
 import ffmpeg
-import torch
+import numpy as np
 from dotenv import load_dotenv
-from faster_whisper import WhisperModel
-from openai import OpenAI
+
+from audio_stream import SAMPLE_RATE, DecodeTee, transcribe_stream
+from batch import BatchImporter, BatchProgress, BatchRefused, collect_inputs
+from chunked import ChunkedTranscriber
+from diarization import Diarizer, EmbeddingCache, OnnxEmbedder, SpectralEmbedder, assign_speakers
+from ingest import FolderIngester
+from janitor import FolderQuota, Janitor, admission_error
+from job_metrics import JobMetrics, StageTimer
+from job_queue import JobQueue
+from language import LanguageDetector, parse_language_models, route_profile
+from media_cache import MediaCache, audio_fingerprint, hash_file, params_key
+from model_registry import ModelRegistry, compute_type_for, default_profiles
+from pcm_cache import PCMCache, read_pcm_wav
+from progress import ProgressReporter, probe_duration
+from resources import available_cores, available_memory_bytes, estimate_model_bytes
+from status_server import StatusServer
+from summarizer import SummaryStage
+from vad import SpeechFilter, retime, transcribe_speech
+from worker_pool import WorkerPool, plan_workers
+from schema import MIGRATIONS, ensure_schema
+from search_index import ensure_schema as ensure_search_index
+from search_index import index_document, index_transcript
+from segments import SegmentStore
+from storage import ConnectionPool, copy_transcript, enable_wal, load_transcript, migrate, save_transcript
+from resources import ResourceMonitor
 
 # Determine the script's directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -29,11 +55,137 @@ AUDIO_FOLDER = os.path.join(IMPORT_FOLDER, "audio")
 TRANSCRIPTIONS_FOLDER = os.path.join(IMPORT_FOLDER, "transcriptions")
 SUMMARIES_FOLDER = os.path.join(IMPORT_FOLDER, "summaries")
 DB_PATH = os.path.join(IMPORT_FOLDER, "transcriptions.db")
-MODEL_CACHE_DIR = os.getenv(IMPORT_FOLDER, "model_cache")  # Corrected getenv usage
+PCM_CACHE_FOLDER = os.path.join(IMPORT_FOLDER, "pcm_cache")
+EMBEDDING_CACHE_FOLDER = os.path.join(IMPORT_FOLDER, "embedding_cache")
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(script_dir, "model_cache"))
 LOGS_FOLDER = os.path.join(IMPORT_FOLDER, "logs")
 LOG_FILE = os.path.join(LOGS_FOLDER, "transcriber.log")
 POLLING_FOLDER = os.path.join(script_dir, "import", "external")
 
+# 'stream' pipes ffmpeg's PCM output straight into the model, 'file' writes a WAV first,
+# 'chunked' splits the audio at silences and transcribes the pieces on a process pool
+TRANSCRIBE_MODE = os.getenv("TRANSCRIBE_MODE", "stream")
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", "300"))
+STREAM_BUFFER_SECONDS = float(os.getenv("STREAM_BUFFER_SECONDS", "240"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "0")) or None  # Defaults to one per core
+CHUNK_WINDOW_SECONDS = float(os.getenv("CHUNK_WINDOW_SECONDS", "120"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", "2"))
+
+# Voice activity detection before inference: 'off', 'silero' (faster-whisper's bundled
+# model) or 'energy' (frame RMS above VAD_ENERGY_THRESHOLD_DB dBFS). Pauses shorter
+# than VAD_MIN_SILENCE_SECONDS are kept and speech is padded by VAD_PAD_SECONDS.
+VAD_MODE = os.getenv("VAD_MODE", "off")
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "2"))
+VAD_PAD_SECONDS = float(os.getenv("VAD_PAD_SECONDS", "0.4"))
+VAD_ENERGY_THRESHOLD_DB = float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45"))
+
+# Job queue: lease length, idle wait and priority of files picked up from the watch folder.
+# A job whose lease ran out on QUEUE_MAX_ATTEMPTS claims in a row fails (0 for no limit)
+QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", "120"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+QUEUE_IDLE_SECONDS = float(os.getenv("QUEUE_IDLE_SECONDS", "30"))
+WATCH_FOLDER_PRIORITY = int(os.getenv("WATCH_FOLDER_PRIORITY", "-10"))
+
+# Batch imports (`transcriber.py batch`): default queue priority, below uploads and the
+# watch folder so a backfill does not hold up interactive jobs, and progress log interval
+BATCH_PRIORITY = int(os.getenv("BATCH_PRIORITY", "-20"))
+BATCH_PROGRESS_SECONDS = float(os.getenv("BATCH_PROGRESS_SECONDS", "30"))
+
+# Watch folder: fallback scan interval and how long a file must stay unchanged
+WATCH_SCAN_SECONDS = float(os.getenv("WATCH_SCAN_SECONDS", "60"))
+WATCH_STABLE_SECONDS = float(os.getenv("WATCH_STABLE_SECONDS", "5"))
+
+# Transcription profiles chosen per upload: 'fast' runs a smaller model with int8
+# weights and greedy decoding, 'accurate' int8 weights with float32 activations and
+# beam search. Jobs that name no profile use DEFAULT_PROFILE.
+DEFAULT_PROFILE = os.getenv("DEFAULT_PROFILE", "accurate")
+FAST_PROFILE_MODEL = os.getenv("FAST_PROFILE_MODEL", "small")
+ACCURATE_PROFILE_MODEL = os.getenv("ACCURATE_PROFILE_MODEL", "large-v3-turbo")
+
+# Optional language detection pass with a small model on a sample of each job.
+# Confident detections pin the language and switch the profile to the model its
+# *_LANGUAGE_MODELS list names for that language, e.g. 'en=distil-large-v3'. Off
+# by default, since routing changes which model transcribes existing workloads
+LANGUAGE_DETECTION = os.getenv("LANGUAGE_DETECTION", "0") == "1"
+LANGUAGE_DETECT_MODEL = os.getenv("LANGUAGE_DETECT_MODEL", "tiny")
+LANGUAGE_SAMPLE_SECONDS = float(os.getenv("LANGUAGE_SAMPLE_SECONDS", "30"))
+LANGUAGE_SAMPLE_OFFSET_SECONDS = float(os.getenv("LANGUAGE_SAMPLE_OFFSET_SECONDS", "30"))
+LANGUAGE_MIN_PROBABILITY = float(os.getenv("LANGUAGE_MIN_PROBABILITY", "0.7"))
+FAST_LANGUAGE_MODELS = os.getenv("FAST_LANGUAGE_MODELS", "en=distil-small.en")
+ACCURATE_LANGUAGE_MODELS = os.getenv("ACCURATE_LANGUAGE_MODELS", "en=distil-large-v3")
+
+# Load the default profile's model in the background at startup so the first job
+# does not wait for it; 0 loads it when the first job needs it
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "1") == "1"
+
+# Loaded models are kept until their estimated size exceeds this budget, then the
+# least recently used idle one is unloaded; 0 uses half the memory free at startup
+MODEL_MEMORY_BUDGET_BYTES = int(float(os.getenv("MODEL_MEMORY_BUDGET_GB", "0")) * 2**30)
+
+# Summary stage: model, concurrent OpenAI requests and retries per request
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+SUMMARY_MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "5"))
+
+# Map-reduce summaries: token budget per chunk, concurrent requests across jobs
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "400"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "8000"))
+SUMMARY_REQUEST_CONCURRENCY = int(os.getenv("SUMMARY_REQUEST_CONCURRENCY", "8"))
+
+# Worker pool: WORKERS=0 sizes the pool from cores, memory and model size
+WORKERS = int(os.getenv("WORKERS", "0"))
+MEMORY_PER_JOB_BYTES = int(float(os.getenv("MEMORY_PER_JOB_GB", "1.5")) * 2**30)
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "600"))
+STATUS_PORT = int(os.getenv("STATUS_PORT", "8000"))
+
+# Progress is written to the job's row at most this often
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("PROGRESS_INTERVAL_SECONDS", "2"))
+
+# Segments are checkpointed to the database at least this often; a job restarted
+# after a crash continues after its last checkpoint unless RESUME_JOBS is 0
+SEGMENT_CHECKPOINT_SECONDS = float(os.getenv("SEGMENT_CHECKPOINT_SECONDS", "15"))
+RESUME_JOBS = os.getenv("RESUME_JOBS", "1") == "1"
+
+# Content-addressed result cache; the audio fingerprint also matches remuxed copies
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "10000"))
+MEDIA_CACHE_AUDIO_FINGERPRINT = os.getenv("MEDIA_CACHE_AUDIO_FINGERPRINT", "0") == "1"
+
+# Decoded 16 kHz PCM kept by content hash for retries and re-runs with another
+# profile; the least recently used files go beyond this size, 0 disables the cache
+PCM_CACHE_MAX_BYTES = int(float(os.getenv("PCM_CACHE_MAX_GB", "10")) * 2**30)
+
+# Optional speaker diarization, run on its own thread while the job is transcribed.
+# DIARIZATION_MODEL is an ONNX speaker embedding model taking 80-band log mel
+# features, e.g. a WeSpeaker ResNet export; without one, spectral statistics are
+# clustered, which only separates clearly different voices. Speaker windows are
+# clustered at DIARIZATION_THRESHOLD cosine distance, into at most
+# DIARIZATION_MAX_SPEAKERS speakers unless it is 0
+DIARIZATION = os.getenv("DIARIZATION", "0") == "1"
+DIARIZATION_MODEL = os.getenv("DIARIZATION_MODEL", "")
+DIARIZATION_THREADS = int(os.getenv("DIARIZATION_THREADS", "1"))
+DIARIZATION_THRESHOLD = float(os.getenv("DIARIZATION_THRESHOLD", "0.6"))
+DIARIZATION_MAX_SPEAKERS = int(os.getenv("DIARIZATION_MAX_SPEAKERS", "0"))
+DIARIZATION_CACHE_MAX_BYTES = int(float(os.getenv("DIARIZATION_CACHE_MAX_MB", "500")) * 2**20)
+
+# Storage janitor, run every JANITOR_INTERVAL_SECONDS (0 disables it). Uploads and
+# extracted audio no live job refers to are deleted once untouched for
+# ORPHAN_GRACE_MINUTES, resumable uploads idle for UPLOAD_SESSION_HOURS are
+# dropped, and the caches and the old transcription_*.txt/summary_*.txt exports
+# are trimmed to their age limits (0 keeps them) and size limits above
+JANITOR_INTERVAL_SECONDS = float(os.getenv("JANITOR_INTERVAL_SECONDS", "600"))
+ORPHAN_GRACE_SECONDS = float(os.getenv("ORPHAN_GRACE_MINUTES", "60")) * 60
+UPLOAD_SESSION_SECONDS = float(os.getenv("UPLOAD_SESSION_HOURS", "24")) * 3600
+PCM_CACHE_MAX_AGE_SECONDS = float(os.getenv("PCM_CACHE_MAX_AGE_DAYS", "14")) * 86400
+DIARIZATION_CACHE_MAX_AGE_SECONDS = float(os.getenv("DIARIZATION_CACHE_MAX_AGE_DAYS", "30")) * 86400
+TEXT_EXPORTS_MAX_AGE_SECONDS = float(os.getenv("TEXT_EXPORTS_MAX_AGE_DAYS", "30")) * 86400
+TEXT_EXPORTS_MAX_BYTES = int(float(os.getenv("TEXT_EXPORTS_MAX_MB", "100")) * 2**20)
+
+# New files are deferred (watch folder) or refused (batch, frontend uploads) while
+# they would leave less than MIN_FREE_DISK_GB free or grow the upload folder beyond
+# UPLOADS_MAX_GB (0 for no limit); the janitor empties the caches below the minimum
+MIN_FREE_DISK_BYTES = int(float(os.getenv("MIN_FREE_DISK_GB", "2")) * 2**30)
+UPLOADS_MAX_BYTES = int(float(os.getenv("UPLOADS_MAX_GB", "0")) * 2**30)
+
 # Create necessary folders if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Ensure 'uploads' directory exists
 os.makedirs(AUDIO_FOLDER, exist_ok=True)
@@ -51,44 +203,273 @@ logging.basicConfig(
     ],
 )
 
-# Initialize SQLite database
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-cursor = conn.cursor()
+# One SQLite connection per worker and request thread
+db = ConnectionPool(DB_PATH)
 
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     logging.error("OPENAI_API_KEY not found in environment variables.")
     sys.exit(1)
 
-client = OpenAI(api_key=openai_api_key)
 
-# Set OpenAI API key from environment variable
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),  # This is the default and can be omitted
+def create_openai_client():
+    """
+    Creates the async OpenAI client used by the summary stage. OPENAI_BASE_URL can
+    point it at any OpenAI-compatible server, e.g. a local mock. Retries are done
+    by the summary stage itself.
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=openai_api_key,
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        max_retries=0,
+    )
+
+
+def detect_device():
+    """
+    Returns 'cuda' if CTranslate2 can see a GPU, else 'cpu'. Asks CTranslate2
+    directly so torch is not needed just to pick the device.
+    """
+    try:
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except RuntimeError:
+        return "cpu"
+
+device = detect_device()
+
+PROFILES = default_profiles(FAST_PROFILE_MODEL, ACCURATE_PROFILE_MODEL)
+if DEFAULT_PROFILE not in PROFILES:
+    logging.error(f"Unknown DEFAULT_PROFILE {DEFAULT_PROFILE!r}, expected one of {', '.join(PROFILES)}.")
+    sys.exit(1)
+default_profile = PROFILES[DEFAULT_PROFILE]
+try:
+    LANGUAGE_MODELS = {
+        "fast": parse_language_models(FAST_LANGUAGE_MODELS),
+        "accurate": parse_language_models(ACCURATE_LANGUAGE_MODELS),
+    }
+except ValueError as e:
+    logging.error(f"Invalid *_LANGUAGE_MODELS setting: {e}")
+    sys.exit(1)
+
+# Non-speech is cut from the audio before inference unless VAD_MODE is 'off'
+speech_filter = None
+if VAD_MODE != "off":
+    speech_filter = SpeechFilter(
+        VAD_MODE,
+        min_silence_seconds=VAD_MIN_SILENCE_SECONDS,
+        pad_seconds=VAD_PAD_SECONDS,
+        threshold_db=VAD_ENERGY_THRESHOLD_DB,
+    )
+
+
+def transcription_params(profile):
+    """
+    Returns the cache key of the model and decoding parameters a profile runs with.
+    """
+    return params_key(
+        model=profile.model,
+        compute_type=compute_type_for(profile, device),
+        **profile.options,
+        **(speech_filter.params() if speech_filter else {}),
+        **(language_routing(profile) if LANGUAGE_DETECTION else {}),
+        **(diarizer.params() if diarizer else {}),
+    )
+
+
+def language_routing(profile):
+    """
+    Returns the language detection settings that decide which model a job of
+    this profile ends up on, for its cache key.
+    """
+    return {
+        "language_detect_model": LANGUAGE_DETECT_MODEL,
+        "language_sample": [LANGUAGE_SAMPLE_SECONDS, LANGUAGE_SAMPLE_OFFSET_SECONDS],
+        "language_min_probability": LANGUAGE_MIN_PROBABILITY,
+        "language_models": LANGUAGE_MODELS.get(profile.name, {}),
+    }
+
+
+def model_key(profile):
+    return (profile.model, compute_type_for(profile, device))
+
+
+# Size the worker pool and split the cores between workers so that
+# workers * cpu_threads does not oversubscribe the CPU
+num_workers, cpu_threads = plan_workers(
+    WORKERS,
+    available_cores(),
+    available_memory_bytes(),
+    estimate_model_bytes(*model_key(default_profile)),
+    MEMORY_PER_JOB_BYTES,
 )
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-compute_type = "float16" if device == "cuda" else "float32"
-model = "large-v3-turbo"
 
-# Initialize Faster Whisper model
-logging.info("Loading Faster Whisper model...")
-model = WhisperModel(
-    model, device=device, compute_type=compute_type, download_root=MODEL_CACHE_DIR
+def model_path(name):
+    """
+    Returns the local directory of a model in MODEL_CACHE_DIR, downloading it
+    only if it is not cached yet so warm starts make no Hugging Face requests.
+    """
+    from faster_whisper.utils import download_model
+
+    try:
+        return download_model(name, local_files_only=True, cache_dir=MODEL_CACHE_DIR)
+    except FileNotFoundError:
+        logging.info(f"Model {name} not found in {MODEL_CACHE_DIR}, downloading...")
+        return download_model(name, cache_dir=MODEL_CACHE_DIR)
+
+
+def load_model(key):
+    """
+    Loads a model for the registry. In chunked mode this is a ChunkedTranscriber
+    whose process pool loads the model once per pool worker.
+    """
+    from faster_whisper import WhisperModel
+
+    name, model_compute_type = key
+    logging.info(f"Loading Faster Whisper model {name} ({model_compute_type})...")
+    path = model_path(name)
+    if TRANSCRIBE_MODE == "chunked":
+        return ChunkedTranscriber(
+            path,
+            device=device,
+            compute_type=model_compute_type,
+            workers=CHUNK_WORKERS,
+            window_seconds=CHUNK_WINDOW_SECONDS,
+            overlap_seconds=CHUNK_OVERLAP_SECONDS,
+            speech_filter=speech_filter,
+        )
+    model = WhisperModel(
+        path,
+        device=device,
+        compute_type=model_compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+    )
+    logging.info(
+        f"Model {name} loaded on {device} with compute_type={model_compute_type}, "
+        f"{num_workers} worker(s) x {cpu_threads} thread(s)."
+    )
+    return model
+
+
+def model_size(key):
+    size = estimate_model_bytes(*key)
+    if TRANSCRIBE_MODE == "chunked":
+        size *= CHUNK_WORKERS or os.cpu_count() or 1
+    return size
+
+
+# Models are loaded by the first job that needs them and shared by later ones
+model_registry = ModelRegistry(
+    load_model,
+    MODEL_MEMORY_BUDGET_BYTES or available_memory_bytes() // 2,
+    size_of=model_size,
+)
+
+
+def load_language_model():
+    from faster_whisper import WhisperModel
+
+    model_compute_type = "float16" if device == "cuda" else "int8"
+    logging.info(f"[Language] Loading detection model {LANGUAGE_DETECT_MODEL} ({model_compute_type})...")
+    return WhisperModel(
+        model_path(LANGUAGE_DETECT_MODEL),
+        device=device,
+        compute_type=model_compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+    )
+
+
+# Small model shared by all workers for the language pass, loaded on first use
+language_detector = None
+if LANGUAGE_DETECTION:
+    language_detector = LanguageDetector(
+        load_language_model,
+        sample_seconds=LANGUAGE_SAMPLE_SECONDS,
+        offset_seconds=LANGUAGE_SAMPLE_OFFSET_SECONDS,
+    )
+
+
+def create_diarizer():
+    """
+    Returns the Diarizer for DIARIZATION=1, or None. Speech is found with the
+    energy VAD without padding, so a pause of 0.2s already splits
+    speech regions and few windows straddle a change of speaker.
+    """
+    if not DIARIZATION:
+        return None
+    try:
+        import scipy.cluster.hierarchy  # noqa: F401
+
+        embedder = OnnxEmbedder(DIARIZATION_MODEL, DIARIZATION_THREADS) if DIARIZATION_MODEL else SpectralEmbedder()
+    except Exception as e:
+        logging.error(f"[Diarization] Cannot enable diarization: {e}")
+        sys.exit(1)
+    logging.info(f"[Diarization] Enabled with {embedder.name} embeddings.")
+    return Diarizer(
+        embedder,
+        SpeechFilter("energy", min_silence_seconds=0.2, pad_seconds=0.0, threshold_db=VAD_ENERGY_THRESHOLD_DB),
+        threshold=DIARIZATION_THRESHOLD,
+        max_speakers=DIARIZATION_MAX_SPEAKERS,
+        cache=EmbeddingCache(EMBEDDING_CACHE_FOLDER, DIARIZATION_CACHE_MAX_BYTES) if DIARIZATION_CACHE_MAX_BYTES else None,
+    )
+
+
+diarizer = create_diarizer()
+# One diarization thread per job worker, next to the job's transcription
+diarization_executor = (
+    concurrent.futures.ThreadPoolExecutor(num_workers, thread_name_prefix="diarization") if diarizer else None
 )
-logging.info(f"Model loaded on {device} with compute_type={compute_type}.")
-logging.info(f"Model {model} loaded.")
 
 # Supported video and audio extensions
 video_extensions = (".mkv", ".mp4", ".avi", ".mov", ".flv", ".wmv")
 audio_extensions = (".mp3", ".wav", ".aac", ".flac", ".ogg", ".wma", ".m4a")
 
-# Semaphore to limit the number of concurrent workers to 2
-max_workers = 2
-worker_semaphore = threading.Semaphore(max_workers)
+# Queue shared with other backend processes through the transcriptions table
+job_queue = JobQueue(DB_PATH, lease_seconds=QUEUE_LEASE_SECONDS, max_attempts=QUEUE_MAX_ATTEMPTS)
+
+# Transcribed jobs wait in their own queue for the summary stage
+summary_queue = JobQueue(
+    DB_PATH,
+    lease_seconds=QUEUE_LEASE_SECONDS,
+    claim_status="transcribed",
+    active_status="summarizing",
+    max_attempts=QUEUE_MAX_ATTEMPTS,
+)
+
+# Finished results keyed by media content hash and transcription parameters
+media_cache = MediaCache(DB_PATH, max_entries=MEDIA_CACHE_MAX_ENTRIES)
+segment_store = SegmentStore(DB_PATH, checkpoint_seconds=SEGMENT_CHECKPOINT_SECONDS)
+job_metrics = JobMetrics(DB_PATH)
+pcm_cache = PCMCache(PCM_CACHE_FOLDER, PCM_CACHE_MAX_BYTES) if PCM_CACHE_MAX_BYTES else None
+
+# Cleans up after crashed and removed jobs and keeps the folders within their quotas
+janitor = Janitor(
+    DB_PATH,
+    UPLOAD_FOLDER,
+    AUDIO_FOLDER,
+    quotas=[
+        FolderQuota("transcriptions", TRANSCRIPTIONS_FOLDER, TEXT_EXPORTS_MAX_BYTES, TEXT_EXPORTS_MAX_AGE_SECONDS),
+        FolderQuota("summaries", SUMMARIES_FOLDER, TEXT_EXPORTS_MAX_BYTES, TEXT_EXPORTS_MAX_AGE_SECONDS),
+        FolderQuota("pcm_cache", PCM_CACHE_FOLDER, PCM_CACHE_MAX_BYTES, PCM_CACHE_MAX_AGE_SECONDS),
+        FolderQuota(
+            "embedding_cache", EMBEDDING_CACHE_FOLDER, DIARIZATION_CACHE_MAX_BYTES, DIARIZATION_CACHE_MAX_AGE_SECONDS
+        ),
+    ],
+    interval=JANITOR_INTERVAL_SECONDS,
+    grace_seconds=ORPHAN_GRACE_SECONDS,
+    upload_session_seconds=UPLOAD_SESSION_SECONDS,
+    min_free_bytes=MIN_FREE_DISK_BYTES,
+)
+
+# Set by SIGTERM/SIGINT to drain the worker pool and exit
+shutdown_event = threading.Event()
 
-# Lock for thread-safe database access
-db_lock = threading.Lock()
+# Reported by /health and /ready; 'model' is idle, loading, loaded or failed
+startup_state = {"started_at": time.time(), "model": "idle", "model_error": None}
 
 def is_supported_file(filename):
     """
@@ -97,300 +478,764 @@ def is_supported_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in video_extensions or ext.lower() in audio_extensions
 
-def transcribe_video(video_path):
+def admit_files(incoming_bytes):
+    """
+    Returns why `incoming_bytes` of new uploads cannot be taken now, or None.
+    """
+    return admission_error(UPLOAD_FOLDER, incoming_bytes, MIN_FREE_DISK_BYTES, UPLOADS_MAX_BYTES)
+
+def job_details(transcription_id):
+    """
+    Returns the profile a job was queued with, or the default profile, and the
+    content hash recorded when it was queued (None for rows queued without one).
+    """
+    row = db.execute(
+        "SELECT profile, content_hash FROM transcriptions WHERE id = ?", (transcription_id,)
+    ).fetchone()
+    name, content_hash = row if row else (None, None)
+    if name and name not in PROFILES:
+        logging.warning(f"[Worker] Unknown profile {name!r}, using '{default_profile.name}'.")
+    return PROFILES.get(name) or default_profile, content_hash
+
+def open_audio(video_path, content_hash):
+    """
+    Returns the 16 kHz mono PCM of a file as memory-mapped int16 samples without
+    running ffmpeg where possible: the file itself if it already is such a WAV,
+    else the PCM cache. Returns None on a miss, so the file is decoded while it
+    is transcribed and transcribe_video() fills the cache.
+    """
+    samples = read_pcm_wav(video_path)
+    if samples is not None:
+        logging.info("[Worker] Input is 16 kHz mono PCM, skipping ffmpeg.")
+        return samples
+    if pcm_cache is None:
+        return None
+    samples = pcm_cache.open(content_hash)
+    if samples is not None:
+        logging.info("[Worker] Reusing decoded audio from the PCM cache.")
+    return samples
+
+
+def transcribe_video(
+    video_path,
+    writer,
+    unique_id=None,
+    progress=None,
+    profile=None,
+    audio=None,
+    timer=None,
+    start=0.0,
+    content_hash=None,
+):
     """
-    Extracts audio from the video, transcribes it using Faster Whisper,
-    and returns the path to the transcription file along with other details.
+    Extracts audio from the video, transcribes it using Faster Whisper and hands
+    each segment to `writer` as it is produced. In 'stream' mode the audio is
+    piped from ffmpeg into the model without an intermediate WAV file; decoded
+    int16 samples given as `audio` are used instead of the file. Peak RSS and
+    intermediate disk usage are returned too, with the 'duration' and
+    'speech_seconds' the VAD pre-pass left for the model. A ProgressReporter
+    given as `progress` is told the stage and the end of every segment, and a
+    StageTimer given as `timer` gets the model load, decode and inference times.
+    A resumed job seeks to `start` seconds; segment times stay on the timeline
+    of the whole file. Without `audio`, a whole file is decoded into the PCM
+    cache under `content_hash` on the way: in 'stream' and 'chunked' mode by
+    the decode the model reads, in 'file' mode instead of the WAV.
     """
-    unique_id = uuid.uuid4().hex
+    unique_id = unique_id or uuid.uuid4().hex
+    source = video_path if audio is None else audio
+    timer = timer or StageTimer()
+    profile = profile or default_profile
+    options = profile.options
+    stats = {}
 
-    # Create unique audio and transcription filenames
+    # Create unique audio filename
     audio_filename = f"audio_{unique_id}.wav"
-    transcript_filename = f"transcription_{unique_id}.txt"
 
-    audio_path = os.path.join(AUDIO_FOLDER, audio_filename)
-    ffmpeg.input(video_path).output(
-        audio_path, format="wav", acodec="pcm_s16le", ac=1, ar="16k"
-    ).run(overwrite_output=True)
+    key = model_key(profile)
+    if progress and not model_registry.is_loaded(key):
+        progress.stage("loading model")
+    started = time.perf_counter()
+    fill_cache = audio is None and pcm_cache is not None and bool(content_hash) and not start
+    cache_fill = None
+    with model_registry.use(key) as model, ResourceMonitor() as usage:
+        timer.add("model_load", time.perf_counter() - started)
+        if progress:
+            progress.stage("transcribing")
+        if fill_cache and TRANSCRIBE_MODE in ("chunked", "stream"):
+            cache_fill = pcm_cache.fill(content_hash)
+            source = DecodeTee(video_path, cache_fill)
+        if TRANSCRIBE_MODE == "chunked":
+            segments = model.transcribe(source, stats=stats, start=start, **options)
+        elif TRANSCRIBE_MODE == "stream":
+            segments = transcribe_stream(
+                model,
+                source,
+                window_seconds=STREAM_WINDOW_SECONDS,
+                buffer_seconds=STREAM_BUFFER_SECONDS,
+                stats=stats,
+                speech_filter=speech_filter,
+                start=start,
+                **options,
+            )
+        else:
+            if fill_cache:
+                if progress:
+                    progress.stage("decoding audio")
+                with timer.stage("decode"):
+                    cached = pcm_cache.store(content_hash, video_path)
+                    usage.add_disk_usage(cached.nbytes)
+                    samples = cached.astype(np.float32) / 32768.0
+            elif audio is None:
+                from faster_whisper import decode_audio
+
+                audio_path = os.path.join(AUDIO_FOLDER, audio_filename)
+                if progress:
+                    progress.stage("extracting audio")
+                with timer.stage("decode"):
+                    ffmpeg.input(video_path, **({"ss": start} if start else {})).output(
+                        audio_path, format="wav", acodec="pcm_s16le", ac=1, ar="16k"
+                    ).run(overwrite_output=True)
+                    audio_bytes = os.path.getsize(audio_path)
+                    usage.add_disk_usage(audio_bytes)
+                    samples = decode_audio(audio_path)
+                    # The samples are in memory; the job's cleanup only catches a failed decode
+                    os.remove(audio_path)
+                    usage.release_disk_usage(audio_bytes)
+            else:
+                samples = audio[int(start * SAMPLE_RATE) :].astype(np.float32) / 32768.0
+
+            # Transcribe using faster-whisper, on the speech only if VAD is enabled
+            if speech_filter:
+                segments, info, stats["speech_seconds"] = transcribe_speech(
+                    model, samples, speech_filter, **options
+                )
+            else:
+                segments, info = model.transcribe(samples, **options)
+                stats["speech_seconds"] = len(samples) / SAMPLE_RATE
+            stats["duration"] = start + len(samples) / SAMPLE_RATE
+            if info:
+                stats["language"] = info.language
+            if start:
+                segments = (retime(segment, segment.start + start, segment.end + start) for segment in segments)
+            if progress:
+                progress.duration = stats["duration"]
+                progress.stage("transcribing")
+
+        # Segments are stored block by block while the model is still running. In
+        # stream and chunked mode without decoded audio this includes ffmpeg's decode.
+        with timer.stage("inference"):
+            for segment in segments:
+                writer.add(segment)
+                if progress:
+                    progress.update(segment.end, segment.text)
+            writer.flush()
+        if cache_fill:
+            usage.add_disk_usage(cache_fill.written_bytes)
 
-    # Transcribe using faster-whisper
-    segments, info = model.transcribe(audio_path, beam_size=5)
+    logging.info(
+        f"[Worker] {writer.count} segments, peak process RSS {usage.peak_rss_bytes / 2**20:.1f} MiB "
+        f"(+{usage.rss_growth_bytes / 2**20:.1f} MiB during the job), "
+        f"peak intermediate disk {usage.peak_disk_bytes / 2**20:.1f} MiB."
+    )
+    if speech_filter and stats.get("duration"):
+        logging.info(
+            f"[Worker] VAD kept {stats['speech_seconds']:.0f}s of speech out of "
+            f"{stats['duration']:.0f}s of audio."
+        )
 
-    # Concatenate all segment texts
-    transcription = " ".join([segment.text for segment in segments]).strip()
+    return unique_id, os.path.basename(video_path), usage, stats
 
-    transcript_path = os.path.join(TRANSCRIPTIONS_FOLDER, transcript_filename)
-    with open(transcript_path, "w", encoding="utf-8") as file:
-        file.write(transcription)
 
-    return transcript_path, unique_id, os.path.basename(video_path)
+def detect_language(transcription_id, source, profile):
+    """
+    Runs the language pass on a media file path or decoded samples, stores the
+    language and its probability on the job's row and returns the profile
+    routed for it. A failed detection leaves the language to the model.
+    """
+    try:
+        language, probability = language_detector.detect(source)
+    except Exception as e:
+        logging.warning(f"[Language] Detection failed, the model will detect the language: {e}")
+        return profile
+    if not language:
+        return profile
+    logging.info(f"[Language] Detected '{language}' with probability {probability:.2f}.")
+    db.execute(
+        "UPDATE transcriptions SET language = ?, language_probability = ? WHERE id = ?",
+        (language, probability, transcription_id),
+    )
+    return route_profile(
+        profile, language, probability, LANGUAGE_MODELS.get(profile.name, {}), LANGUAGE_MIN_PROBABILITY
+    )
 
 
-def summarize_transcription(transcription):
+def diarize(source, content_hash, stop):
     """
-    Generates a summary of the transcription using OpenAI's GPT model.
+    Runs the diarizer on the diarization thread pool; returns the speaker turns
+    and the seconds it took. The turns are None if `stop` was set first.
     """
-    if not transcription:
-        logging.warning("Empty transcription received for summarization.")
-        return "No Summary"
+    started = time.perf_counter()
+    turns = diarizer.run(source, content_hash, stop)
+    return turns, time.perf_counter() - started
 
+
+def finish_diarization(transcription_id, diarization, timer):
+    """
+    Waits for the diarization started next to the transcription and labels the
+    stored segments with its speakers. The wait is the time diarization added
+    to the job. Returns the number of speakers, or None if diarization failed
+    and the segments stay unlabelled.
+    """
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Corrected model name
-            messages=[
-                {
-                    "role": "system",
-                    "content": "I would like for you to assume the role of a court clerk.",
-                },
-                {
-                    "role": "user",
-                    "content": f"""Generate a concise summary of the text below.
-                    Text: {transcription}
-
-                    Add a title to the summary.
-
-                    Make sure your summary has useful and true information about the main points of the topic. Begin with a short introduction explaining the topic. If you can, use bullet points to list important details, and finish your summary with a concluding sentence. Return the summary in an html article format.Remove all markdown or unrelated to the summary content.""",
-                },
-            ],
-            max_tokens=400,  # Adjust as needed
-            temperature=0.3,  # Adjust for variability in responses
-        )
-        summary = response.choices[0].message.content.strip()
-        return summary
+        turns, seconds = diarization.result()
     except Exception as e:
-        logging.exception("Error during summarization:")
-        return "No Summary"
+        logging.warning(f"[Diarization] Failed, keeping the transcript without speakers: {e}")
+        return None
+    finally:
+        waited = time.perf_counter() - started
+        timer.add("diarization_wait", waited)
+    timer.add("diarization", seconds)
+    segment_store.set_speakers(
+        transcription_id, lambda starts, ends: assign_speakers(np.array(starts), np.array(ends), turns)
+    )
+    speakers = len(set(turns[2].tolist()))
+    logging.info(
+        f"[Diarization] {speakers} speaker(s) in {len(turns[0])} turn(s), found in {seconds:.1f}s; "
+        f"added {waited:.1f}s to the job."
+    )
+    return speakers
 
 
-def process_transcription(transcription_id, video_path, unique_id):
+def media_cache_keys(video_path, content_hash, params):
     """
-    Processes the transcription: transcribe the video, summarize the transcription,
-    and update the database accordingly.
+    Returns the media cache keys of a file: its content hash and, if enabled, the
+    fingerprint of its audio stream, each combined with the transcription parameters.
     """
+    keys = [f"sha256:{content_hash}:{params}"]
+    if MEDIA_CACHE_AUDIO_FINGERPRINT:
+        try:
+            keys.append(f"audio:{audio_fingerprint(video_path)}:{params}")
+        except ffmpeg.Error as e:
+            logging.warning(f"[Worker] Could not fingerprint audio of {video_path}: {e}")
+    return keys
+
+
+def resume_segments(transcription_id, filename, params):
+    """
+    Returns a SegmentWriter for a job and the position in seconds to transcribe
+    from. Segments checkpointed by an interrupted attempt with the same
+    transcription parameters are kept and the job continues after the last of
+    them; otherwise it starts over.
+    """
+    if RESUME_JOBS:
+        row = db.execute(
+            "SELECT checkpoint_params FROM transcriptions WHERE id = ?", (transcription_id,)
+        ).fetchone()
+        checkpoint = segment_store.checkpoint(transcription_id) if row and row[0] == params else None
+        if checkpoint:
+            _, resume_at, count = checkpoint
+            logging.info(f"[Worker] Resuming {filename} at {resume_at:.1f}s after {count} checkpointed segments.")
+            return segment_store.writer(transcription_id, resume=True), resume_at
+    writer = segment_store.writer(transcription_id)
+    db.execute("UPDATE transcriptions SET checkpoint_params = ? WHERE id = ?", (params, transcription_id))
+    return writer, 0.0
+
+
+def process_transcription(transcription_id, video_path, unique_id, profile=None, content_hash=None):
+    """
+    Processes the transcription: transcribe the video with the job's profile and
+    store the result as 'transcribed', which hands the job to the summary stage.
+    The time spent in each stage is recorded in job_metrics. The file is hashed
+    only if no `content_hash` was recorded when it was queued.
+    """
+    filename = os.path.basename(video_path)
+    profile = profile or default_profile
+    timer = StageTimer()
+    stats = {}
+    outcome = "failed"
     try:
-        filename = os.path.basename(video_path)
+        params = transcription_params(profile)
 
-        logging.info(f"[Worker] Processing video: {filename}")
+        logging.info(f"[Worker] Processing video: {filename} (profile '{profile.name}')")
 
-        # Transcribe the video
-        transcript_path, unique_id, original_filename = transcribe_video(video_path)
-        with open(transcript_path, "r", encoding="utf-8") as f:
-            transcription = f.read()
+        # Complete instantly if the same media was already transcribed with these parameters
+        with timer.stage("hash"):
+            if not content_hash:
+                content_hash = hash_file(video_path)
+            cache_keys = media_cache_keys(video_path, content_hash, params)
+            cached = media_cache.lookup(cache_keys)
+        if cached:
+            source_id, title, summary = cached
+            with timer.stage("db_write"):
+                with db.transaction() as conn:
+                    index_document(conn, transcription_id, title, summary, load_transcript(conn, source_id))
+                    segment_store.copy(source_id, transcription_id, conn)
+                    copy_transcript(conn, source_id, transcription_id)
+                    conn.execute(
+                        """
+                        UPDATE transcriptions
+                        SET title = ?, summary = ?, status = 'completed',
+                            content_hash = ?, completed_at = ?
+                        WHERE id = ?
+                        """,
+                        (title, summary, content_hash, time.time(), transcription_id),
+                    )
+            outcome = "cached"
+            logging.info(f"[Worker] Reused cached transcription for {filename}.")
+            return
 
-        logging.info("[Worker] Summarizing transcription...")
-        summary = summarize_transcription(transcription)
-        summary_filename = f"summary_{unique_id}.txt"
-        summary_path = os.path.join(SUMMARIES_FOLDER, summary_filename)
-        with open(summary_path, "w", encoding="utf-8") as f:
-            f.write(summary)
-        logging.info("[Worker] Summary created.")
+        # Transcribe the video, recording progress against the media duration
+        writer, resume_at = resume_segments(transcription_id, filename, params)
+        with ProgressReporter(
+            DB_PATH, transcription_id, interval=PROGRESS_INTERVAL_SECONDS, start=resume_at
+        ) as progress:
+            with timer.stage("decode"):
+                audio = open_audio(video_path, content_hash)
+                if audio is not None:
+                    progress.duration = len(audio) / SAMPLE_RATE
+                else:
+                    progress.duration = probe_duration(video_path)
+            # Speakers are found on the whole recording while it is transcribed
+            diarization = None
+            diarization_stop = threading.Event()
+            if diarizer:
+                diarization = diarization_executor.submit(
+                    diarize, video_path if audio is None else audio, content_hash, diarization_stop
+                )
+            try:
+                if language_detector:
+                    progress.stage("detecting language")
+                    with timer.stage("language_detect"):
+                        profile = detect_language(
+                            transcription_id, video_path if audio is None else audio, profile
+                        )
+                unique_id, original_filename, usage, stats = transcribe_video(
+                    video_path,
+                    writer,
+                    unique_id,
+                    progress=progress,
+                    profile=profile,
+                    audio=audio,
+                    timer=timer,
+                    start=resume_at,
+                    content_hash=content_hash,
+                )
+            except BaseException:
+                # Nothing will wait for the speakers: drop the run if it has not started,
+                # else stop it at its next block so it frees its thread and decoder
+                if diarization:
+                    diarization.cancel()
+                    diarization_stop.set()
+                raise
+            speakers = None
+            if diarization:
+                progress.stage("diarizing")
+                speakers = finish_diarization(transcription_id, diarization, timer)
+            progress.stage("saving")
+            with timer.stage("db_write"):
+                transcription = segment_store.text(transcription_id)
 
-        # Extract title from summary
-        title = summary.split("\n")[0] if summary else "No Title"
+        # Share of the audio the model actually saw after the VAD pre-pass, in the
+        # part this attempt transcribed
+        speech_ratio = None
+        if stats.get("duration", 0.0) > resume_at:
+            speech_ratio = min(1.0, stats.get("speech_seconds", 0.0) / (stats["duration"] - resume_at))
 
-        # Update the transcription entry in the database
-        with db_lock:
-            cursor.execute(
+        # Store the compressed transcript, its search text and the job row together; the
+        # summary stage counts its attempts from zero
+        with timer.stage("db_write"), db.transaction() as conn:
+            index_transcript(conn, transcription_id, transcription)
+            save_transcript(conn, transcription_id, transcription)
+            conn.execute(
                 """
                 UPDATE transcriptions
-                SET title = ?, transcription = ?, summary = ?, status = 'completed'
+                SET status = 'transcribed', checkpoint_params = NULL, attempts = 0,
+                    content_hash = ?, peak_rss_bytes = ?, rss_growth_bytes = ?, peak_disk_bytes = ?,
+                    audio_seconds = ?, speech_ratio = ?, profile = ?,
+                    language = COALESCE(language, ?), speaker_count = ?
                 WHERE id = ?
                 """,
-                (title, transcription, summary, transcription_id),
+                (
+                    content_hash,
+                    usage.peak_rss_bytes,
+                    usage.rss_growth_bytes,
+                    usage.peak_disk_bytes,
+                    stats.get("duration"),
+                    speech_ratio,
+                    profile.name,
+                    stats.get("language"),
+                    speakers,
+                    transcription_id,
+                ),
             )
-            conn.commit()
-        logging.info("[Worker] Data saved to database.")
+        summary_queue.notify()
+        outcome = "transcribed"
+        logging.info("[Worker] Data saved to database, queued for summary.")
+
+        # Served from the cache once the summary stage has completed the job
+        with timer.stage("db_write"):
+            media_cache.store(cache_keys, content_hash, params, transcription_id)
 
     except Exception as e:
         logging.error(f"[Worker] Error processing {filename}: {e}")
         # Update status to 'failed'
-        with db_lock:
-            cursor.execute(
-                "UPDATE transcriptions SET status = 'failed' WHERE id = ?",
-                (transcription_id,),
-            )
-            conn.commit()
+        db.execute("UPDATE transcriptions SET status = 'failed' WHERE id = ?", (transcription_id,))
     finally:
-        # Optionally, remove the extracted audio file
-        audio_filename = f"audio_{unique_id}.wav"
-        audio_path = os.path.join(AUDIO_FOLDER, audio_filename)
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-            logging.info("[Worker] Temporary audio file removed.\n")
-        
-        # Optionally, remove the original video file
-        video_filename = os.path.basename(video_path)
-        video_path_full = os.path.join(UPLOAD_FOLDER, video_filename)
-        if os.path.exists(video_path_full):
-            os.remove(video_path_full)
-            logging.info("[Worker] Uploaded video file removed.\n")
-            
-        # Release the semaphore to allow new workers
-        worker_semaphore.release()
+        job_queue.release(transcription_id)
+
+        with timer.stage("cleanup"):
+            # Optionally, remove the extracted audio file
+            audio_filename = f"audio_{unique_id}.wav"
+            audio_path = os.path.join(AUDIO_FOLDER, audio_filename)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+                logging.info("[Worker] Temporary audio file removed.\n")
+
+            # Optionally, remove the original video file
+            video_filename = os.path.basename(video_path)
+            video_path_full = os.path.join(UPLOAD_FOLDER, video_filename)
+            if os.path.exists(video_path_full):
+                os.remove(video_path_full)
+                logging.info("[Worker] Uploaded video file removed.\n")
+
+        job_metrics.record(
+            transcription_id, timer.stages, outcome, profile=profile.name, audio_seconds=stats.get("duration")
+        )
+
+
+def run_job(job):
+    """
+    Runs one job claimed by a pool worker: checks that the upload still exists and
+    processes it on the calling thread.
+    """
+    transcription_id, filename = job
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+
+    if not os.path.exists(filepath):
+        logging.warning(f"File not found: {filepath}")
+        # Update status to 'failed' if file does not exist
+        db.execute("UPDATE transcriptions SET status = 'failed' WHERE id = ?", (transcription_id,))
+        job_queue.release(transcription_id)
+        return
+
+    # Extracted audio is named after the job, so the janitor can tell it from orphans
+    logging.info(f"Claimed from queue: {filename}")
+    profile, content_hash = job_details(transcription_id)
+    process_transcription(transcription_id, filepath, transcription_id, profile, content_hash)
+
+
+def preload_model():
+    """
+    Loads the default profile's model, and the language detection model if
+    the pass is on, so the first job finds them ready. A job claimed while the
+    profile's model loads waits on the registry's load lock; if loading fails
+    the first job tries again.
+    """
+    startup_state["model"] = "loading"
+    try:
+        if language_detector:
+            language_detector.preload()
+        with model_registry.use(model_key(default_profile)):
+            pass
+        startup_state["model"] = "loaded"
+        logging.info(
+            f"[Models] '{default_profile.name}' model ready "
+            f"{time.time() - startup_state['started_at']:.1f}s after startup."
+        )
+    except Exception as e:
+        startup_state["model"] = "failed"
+        startup_state["model_error"] = str(e)
+        logging.error(f"[Models] Could not preload the '{default_profile.name}' model: {e}")
+
+
+def health():
+    """
+    Liveness: answers as soon as the status server is up, whatever the model state.
+    """
+    uptime = time.time() - startup_state["started_at"]
+    return 200, "application/json", {"status": "ok", "uptime_seconds": uptime}
+
+
+def readiness():
+    """
+    Readiness: 200 once the database answers and the default model is loaded (or
+    PRELOAD_MODEL is off and it loads with the first job), 503 until then.
+    """
+    key = model_key(default_profile)
+    model_loaded = model_registry.is_loaded(key)
+    try:
+        db.execute("SELECT 1 FROM transcriptions LIMIT 1").fetchall()
+        database = "ok"
+    except sqlite3.Error as e:
+        database = str(e)
+    ready = database == "ok" and (model_loaded or not PRELOAD_MODEL)
+    body = {
+        "ready": ready,
+        "database": database,
+        "device": device,
+        "profile": default_profile.name,
+        "model": list(key),
+        "model_loaded": model_loaded,
+        "model_state": "loaded" if model_loaded else startup_state["model"],
+        "model_error": startup_state["model_error"],
+        "uptime_seconds": time.time() - startup_state["started_at"],
+    }
+    return (200 if ready else 503), "application/json", body
 
 
+def janitor_labels(values):
+    labels = {}
+    for key, value in sorted(values.items()):
+        folder, reason = key.split("/")
+        labels[f'folder="{folder}",reason="{reason}"'] = value
+    return labels
+
+
+def prometheus_metrics(pool, summary_stage):
+    """
+    Serves /metrics in the Prometheus text format: queue depth, workers, stage
+    timings, real-time factor, token usage, job outcomes and storage.
+    """
+    workers = pool.metrics()
+    summary = summary_stage.metrics()
+    models = model_registry.metrics()
+    storage = janitor.metrics()
+    last_run = storage["last_run"] or {"folder_bytes": {}}
+    gauges = [
+        ("transcriber_workers_busy", "Transcription workers running a job.", {"": workers["busy"]}),
+        ("transcriber_workers_capacity", "Transcription workers in the pool.", {"": workers["capacity"]}),
+        ("transcriber_summary_in_flight", "Summaries being generated.", {"": summary["in_flight"]}),
+        ("transcriber_models_loaded_bytes", "Estimated memory of the loaded models.", {"": models["loaded_bytes"]}),
+        ("transcriber_disk_free_bytes", "Free space on the import volume.", {"": storage["free_bytes"]}),
+        (
+            "transcriber_folder_bytes",
+            "Size of each import folder at the last janitor run.",
+            {f'folder="{folder}"': size for folder, size in sorted(last_run["folder_bytes"].items())},
+        ),
+    ]
+    counters = [
+        (
+            "transcriber_summary_tokens_total",
+            "OpenAI tokens used by the summary stage.",
+            {'kind="prompt"': summary["prompt_tokens"], 'kind="completion"': summary["completion_tokens"]},
+        ),
+        ("transcriber_model_loads_total", "Models loaded by the registry.", {"": models["loads"]}),
+        ("transcriber_model_evictions_total", "Models unloaded to stay under the budget.", {"": models["evictions"]}),
+        ("transcriber_janitor_runs_total", "Storage janitor runs.", {"": storage["runs"]}),
+        (
+            "transcriber_janitor_reclaimed_bytes_total",
+            "Bytes deleted by the storage janitor, by folder and reason.",
+            janitor_labels(storage["reclaimed_bytes"]),
+        ),
+        (
+            "transcriber_janitor_removed_files_total",
+            "Files deleted by the storage janitor, by folder and reason.",
+            janitor_labels(storage["removed_files"]),
+        ),
+    ]
+    return 200, "text/plain; version=0.0.4", job_metrics.render(gauges, counters)
+
+
+def start_pipeline(status=True):
+    """
+    Starts the worker pool, the summary stage, the storage janitor and, with
+    `status`, the status server. Returns them for stop_pipeline().
+    """
+    pool = WorkerPool(
+        job_queue,
+        run_job,
+        workers=num_workers,
+        memory_per_job=MEMORY_PER_JOB_BYTES,
+        idle_seconds=QUEUE_IDLE_SECONDS,
+    )
+    summary_stage = SummaryStage(
+        summary_queue,
+        DB_PATH,
+        create_openai_client,
+        concurrency=SUMMARY_CONCURRENCY,
+        idle_seconds=QUEUE_IDLE_SECONDS,
+        model=SUMMARY_MODEL,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        request_concurrency=SUMMARY_REQUEST_CONCURRENCY,
+        max_retries=SUMMARY_MAX_RETRIES,
+        job_metrics=job_metrics,
+    )
+    status_server = None
+    if status:
+        status_server = StatusServer(port=STATUS_PORT)
+        status_server.route("/metrics", lambda: prometheus_metrics(pool, summary_stage))
+        status_server.route("/health", health)
+        status_server.route("/ready", readiness)
+        status_server.route("/metrics/workers", lambda: (200, "application/json", pool.metrics()))
+        status_server.route("/metrics/summary", lambda: (200, "application/json", summary_stage.metrics()))
+        status_server.route("/metrics/cache", lambda: (200, "application/json", media_cache.metrics()))
+        status_server.route("/metrics/models", lambda: (200, "application/json", model_registry.metrics()))
+        if pcm_cache:
+            status_server.route("/metrics/pcm", lambda: (200, "application/json", pcm_cache.metrics()))
+        status_server.route("/metrics/storage", lambda: (200, "application/json", janitor.metrics()))
+        status_server.start()
+    if PRELOAD_MODEL:
+        threading.Thread(target=preload_model, daemon=True).start()
+    if JANITOR_INTERVAL_SECONDS:
+        janitor.start()
+    summary_stage.start()
+    pool.start()
+    return pool, summary_stage, status_server
+
+def stop_pipeline(pool, summary_stage, status_server):
+    """
+    Stops claiming new jobs and drains the ones in flight.
+    """
+    logging.info("Shutting down transcription service.")
+    janitor.shutdown(timeout=30)
+    pool.shutdown(timeout=DRAIN_TIMEOUT_SECONDS)
+    summary_stage.shutdown(timeout=30)
+    model_registry.close()
+    if status_server:
+        status_server.stop()
+    db.close()
+
 def main():
     """
-    Main loop that continuously checks the database for pending transcriptions
-    and starts a new thread for each pending file, limited to 2 concurrent threads.
+    Runs the worker pool and the status server until SIGTERM or Ctrl+C, then stops
+    claiming new jobs and drains the ones in flight.
     """
-    while True:
-        with db_lock:
-            # Fetch one transcription with 'pending' status
-            cursor.execute(
-                "SELECT id, filename FROM transcriptions WHERE status = 'pending' LIMIT 1"
-            )
-            pending_transcription = cursor.fetchone()
-
-        if pending_transcription:
-            transcription_id, filename = pending_transcription
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-
-            if not os.path.exists(filepath):
-                logging.warning(f"File not found: {filepath}")
-                with db_lock:
-                    # Update status to 'failed' if file does not exist
-                    cursor.execute(
-                        "UPDATE transcriptions SET status = 'failed' WHERE id = ?",
-                        (transcription_id,),
-                    )
-                    conn.commit()
-                continue
+    pipeline = start_pipeline()
+    shutdown_event.wait()
+    stop_pipeline(*pipeline)
 
-            # Acquire semaphore before starting a new worker
-            worker_semaphore.acquire()
+def run_batch(argv):
+    """
+    `transcriber.py batch`: queues directories, globs or a manifest of files and
+    transcribes them with the worker pool, logging progress and an ETA, until
+    every file of the batch is completed or failed. Interrupting and running the
+    same command again continues where it stopped. Returns the exit status.
+    """
+    parser = argparse.ArgumentParser(
+        prog="transcriber.py batch", description="Transcribe a directory, glob or manifest of media files."
+    )
+    parser.add_argument("sources", nargs="*", help="Directories (searched recursively), files or globs")
+    parser.add_argument("--manifest", help="File listing one path or glob per line")
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="Transcription profile of the jobs")
+    parser.add_argument(
+        "--priority", type=int, default=BATCH_PRIORITY, help="Queue priority, below uploads by default"
+    )
+    parser.add_argument("--threads", type=int, help="Threads hashing and probing the inputs")
+    parser.add_argument("--queue-only", action="store_true", help="Only queue the jobs for a running service")
+    parser.add_argument("--progress-seconds", type=float, default=BATCH_PROGRESS_SECONDS)
+    args = parser.parse_args(argv)
+    if not args.sources and not args.manifest:
+        parser.error("give at least one source or --manifest")
 
-            # Retrieve unique_id for cleanup in worker
-            unique_id = uuid.uuid4().hex
+    paths = collect_inputs(args.sources, is_supported_file, manifest=args.manifest)
+    if not paths:
+        logging.error("[Batch] No supported media files found.")
+        return 1
+    importer = BatchImporter(DB_PATH, UPLOAD_FOLDER, args.priority, args.profile, args.threads, admit_files)
+    importer.ensure_schema()
+    try:
+        counts = importer.register(paths, cancel=shutdown_event)
+    except BatchRefused as e:
+        logging.error(f"[Batch] Not queueing new files: {e}.")
+        return 1
+    if counts is None:
+        logging.info("[Batch] Interrupted before any job was queued.")
+        return 1
+    logging.info(
+        f"[Batch] {len(paths)} file(s): {counts['queued']} queued, {counts['requeued']} failed before and "
+        f"queued again, {counts['skipped']} already queued or done, {counts['unreadable']} unreadable."
+    )
+    job_queue.notify()
+    if args.queue_only:
+        return 0
 
-            # Update status to 'processing'
-            with db_lock:
-                cursor.execute(
-                    "UPDATE transcriptions SET status = 'processing' WHERE id = ?",
-                    (transcription_id,),
-                )
-                conn.commit()
-                logging.info(f"Added to queue: {filename}")
-
-            # Start a new worker thread
-            worker_thread = threading.Thread(
-                target=process_transcription,
-                args=(transcription_id, filepath, unique_id),
-                daemon=True,
-            )
-            worker_thread.start()
-        else:
-            # No pending transcriptions found
-            time.sleep(5)  # Wait before checking again
+    initial = importer.progress()
+    if initial["total"] == 0:
+        return 1
+    progress = BatchProgress(initial)
+    pipeline = start_pipeline(status=False)
+    try:
+        while True:
+            current = importer.progress()
+            logging.info(progress.line(current))
+            if current["completed"] + current["failed"] >= current["total"]:
+                break
+            if shutdown_event.wait(args.progress_seconds):
+                logging.info("[Batch] Interrupted, run the same command again to continue.")
+                break
+    finally:
+        stop_pipeline(*pipeline)
+    current = importer.progress()
+    return 1 if current["failed"] or current["completed"] < current["total"] else 0
 
-def reset_processing_transcriptions(cursor, conn):
+def reset_processing_transcriptions():
     """
-    Resets any transcriptions marked as 'processing' to 'pending' to ensure they are reprocessed.
+    Resets transcriptions marked as 'processing' or 'summarizing' whose lease has
+    expired so they are reprocessed. Jobs still leased by another live backend are
+    left alone.
     """
     try:
-        # Fetch all transcriptions with status 'processing'
-        cursor.execute("SELECT id, filename FROM transcriptions WHERE status = 'processing'")
-        processing_transcriptions = cursor.fetchall()
-
-        if processing_transcriptions:
-            logging.info(f"Found {len(processing_transcriptions)} transcription(s) in 'processing' state. Resetting to 'pending'.")
-            for transcription in processing_transcriptions:
-                transcription_id, filename = transcription
-                cursor.execute("UPDATE transcriptions SET status = 'pending' WHERE id = ?", (transcription_id,))
+        requeued = job_queue.requeue_expired() + summary_queue.requeue_expired()
+        if requeued:
+            logging.info(f"Found {len(requeued)} transcription(s) with an expired lease. Resetting to 'pending'.")
+            for transcription_id, filename in requeued:
                 logging.info(f"Resetting transcription ID: {transcription_id}, Filename: {filename} to 'pending'.")
-            conn.commit()
-            logging.info("All 'processing' transcriptions have been reset to 'pending'.")
         else:
-            logging.info("No transcriptions found in 'processing' state.")
+            logging.info("No transcriptions found with an expired lease.")
     except Exception as e:
         logging.error(f"Error resetting 'processing' transcriptions: {e}")
 
 def poll_folder_for_new_files():
     """
-    Polls the specified folder for new files and processes them.
+    Watches the polling folder and queues new files for transcription.
     """
-    processed_files = set()
+    ingester = FolderIngester(
+        POLLING_FOLDER,
+        UPLOAD_FOLDER,
+        DB_PATH,
+        is_supported_file,
+        priority=WATCH_FOLDER_PRIORITY,
+        scan_interval=WATCH_SCAN_SECONDS,
+        stable_seconds=WATCH_STABLE_SECONDS,
+        on_ingested=job_queue.notify,
+        admit=admit_files,
+    )
+    ingester.run(shutdown_event)
 
-    while True:
-        try:
-            # List all files in the polling folder
-            files = set(os.listdir(POLLING_FOLDER))
-            
-            # Determine new files by subtracting already processed files
-            new_files = files - processed_files
-            
-            for filename in new_files:
-                file_path = os.path.join(POLLING_FOLDER, filename)
-                if os.path.isfile(file_path) and is_supported_file(filename):
-                    logging.info(f"New file detected: {filename}")
-                    # Process the new file (e.g., add to transcription queue)
-                    process_new_file(file_path)
-                    # Mark the file as processed
-                    processed_files.add(filename)
-            
-            # Sleep for a specified interval before polling again
-            time.sleep(900)
-        except Exception as e:
-            logging.error(f"Error while polling folder: {e}")
-
-def process_new_file(file_path):
-    """
-    Processes the new file detected in the polling folder.
+def request_shutdown(signum, frame):
+    logging.info(f"Received signal {signum}, shutting down after in-flight jobs.")
+    shutdown_event.set()
+
+def prepare_database():
     """
-    try:
-        filename = os.path.basename(file_path)
-        unique_id = uuid.uuid4().hex
-        status = 'pending'
-        
-        # Define the destination path in the import folder
-        destination_path = os.path.join(UPLOAD_FOLDER, filename)
-        
-        # Copy the file to the import folder
-        shutil.copy2(file_path, destination_path)
-        logging.info(f"Copied file to import folder: {destination_path}")
-        
-        # Insert a new record into the transcriptions table
-        cursor.execute(
-            """
-            INSERT INTO transcriptions (id, filename, status)
-            VALUES (?, ?, ?)
-            """,
-            (unique_id, filename, status)
-        )
-        conn.commit()
-        logging.info(f"Added new transcription record for file: {filename}")
-        
-        # Add additional processing logic here if needed
-    except Exception as e:
-        logging.error(f"Error processing new file {file_path}: {e}")
+    Brings the schema up to date and resets any transcriptions left in 'processing' state.
+    """
+    enable_wal(DB_PATH)
+    conn = db.connection()
+    ensure_schema(conn)
+    ensure_search_index(conn)
+    media_cache.ensure_schema()
+    segment_store.ensure_schema()
+    job_metrics.ensure_schema()
+    migrate(conn, MIGRATIONS)
+    reset_processing_transcriptions()
 
 if __name__ == "__main__":
-    NUM_WORKERS = 2  # Maximum number of concurrent workers
-
-    logging.info(f"Starting transcription service with max {NUM_WORKERS} workers.")
-
-    # Initialize database connection
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    DB_PATH = os.path.join(script_dir, "import", "transcriptions.db")
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    cursor = conn.cursor()
+    prepare_database()
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+    if sys.argv[1:2] == ["batch"]:
+        logging.info(f"Starting batch transcription with {num_workers} workers.")
+        sys.exit(run_batch(sys.argv[2:]))
 
-    # Reset any transcriptions left in 'processing' state
-    reset_processing_transcriptions(cursor, conn)
+    logging.info(f"Starting transcription service with {num_workers} workers.")
 
-    # Start the main loop in a separate thread to keep the main thread free
-    main_thread = threading.Thread(target=main, daemon=True)
-    main_thread.start()
-    logging.info("Main transcription thread started.")    
-    
     # Start the folder polling worker in a separate thread
     polling_thread = threading.Thread(target=poll_folder_for_new_files, daemon=True)
     polling_thread.start()
     logging.info("Folder polling thread started.")
 
-    # Keep the main thread alive
-    try:
-        while True:
-            time.sleep(60)
-    except KeyboardInterrupt:
-        logging.info("Shutting down transcription service.")
\ No newline at end of file
+    # Run the worker pool on the main thread until a shutdown is requested
+    main()
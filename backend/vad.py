@@ -0,0 +1,166 @@
+# backend/vad.py
+
+import bisect
+import dataclasses
+import logging
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# 'silero' uses faster-whisper's bundled Silero model, 'energy' a frame RMS threshold
+VAD_MODES = ("off", "silero", "energy")
+
+
+def energy_speech_regions(audio, threshold_db=-45.0, frame_seconds=0.03, min_speech_seconds=0.25):
+    """
+    Returns (start, end) sample ranges whose 30 ms frames are louder than
+    `threshold_db` dBFS. Cheap enough to run on every window of the stream.
+    """
+    frame = int(frame_seconds * SAMPLE_RATE)
+    frames = len(audio) // frame
+    if frames == 0:
+        return []
+    power = np.square(audio[: frames * frame].reshape(frames, frame), dtype=np.float32).mean(axis=1)
+    loud = 10 * np.log10(power + 1e-10) > threshold_db
+    # Rising and falling edges of the loud frames
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], loud.view(np.int8), [0]))))
+    min_frames = max(1, int(min_speech_seconds / frame_seconds))
+    return [
+        (int(start) * frame, min(len(audio), int(end) * frame))
+        for start, end in zip(edges[::2], edges[1::2])
+        if end - start >= min_frames
+    ]
+
+
+def silero_speech_regions(audio, min_silence_seconds=2.0, pad_seconds=0.4):
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(
+        min_silence_duration_ms=int(min_silence_seconds * 1000),
+        speech_pad_ms=int(pad_seconds * 1000),
+    )
+    return [(region["start"], region["end"]) for region in get_speech_timestamps(audio, options)]
+
+
+def merge_regions(regions, length, min_silence_seconds, pad_seconds):
+    """
+    Pads every region, then joins regions separated by less than
+    `min_silence_seconds` so short pauses stay in the audio Whisper sees.
+    """
+    pad = int(pad_seconds * SAMPLE_RATE)
+    gap = int(min_silence_seconds * SAMPLE_RATE)
+    merged = []
+    for start, end in regions:
+        start, end = max(0, start - pad), min(length, end + pad)
+        if merged and start - merged[-1][1] < gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SpeechMap:
+    """
+    Maps times in the speech-only audio back to the window it was cut from.
+    `regions` are the (start, end) sample ranges that were kept, in order.
+    """
+
+    def __init__(self, regions):
+        self.original_starts = []
+        self.compact_starts = []
+        self.lengths = []
+        compact = 0
+        for start, end in regions:
+            self.original_starts.append(start / SAMPLE_RATE)
+            self.compact_starts.append(compact / SAMPLE_RATE)
+            self.lengths.append((end - start) / SAMPLE_RATE)
+            compact += end - start
+
+    def to_original(self, seconds, is_end=False):
+        index = max(0, bisect.bisect_right(self.compact_starts, seconds) - 1)
+        # An end exactly on a cut belongs to the region before it
+        if is_end and index > 0 and seconds <= self.compact_starts[index]:
+            index -= 1
+        offset = min(seconds - self.compact_starts[index], self.lengths[index])
+        return self.original_starts[index] + offset
+
+
+class SpeechFilter:
+    """
+    Drops non-speech from a PCM window before inference. `apply` returns the
+    speech-only samples and a SpeechMap for the timestamps Whisper gives back.
+    Settings are plain values so the filter can be sent to pool workers.
+    """
+
+    def __init__(self, mode="silero", min_silence_seconds=2.0, pad_seconds=0.4, threshold_db=-45.0):
+        if mode not in VAD_MODES:
+            raise ValueError(f"Unknown VAD mode {mode!r}, expected one of {', '.join(VAD_MODES)}.")
+        self.mode = mode
+        self.min_silence_seconds = min_silence_seconds
+        self.pad_seconds = pad_seconds
+        self.threshold_db = threshold_db
+
+    def params(self):
+        """
+        Settings that change the transcript, for the media cache key.
+        """
+        return {
+            "vad": self.mode,
+            "vad_min_silence": self.min_silence_seconds,
+            "vad_pad": self.pad_seconds,
+            **({"vad_threshold_db": self.threshold_db} if self.mode == "energy" else {}),
+        }
+
+    def regions(self, audio):
+        if self.mode == "silero":
+            regions = silero_speech_regions(audio, self.min_silence_seconds, self.pad_seconds)
+            return merge_regions(regions, len(audio), 0.0, 0.0)
+        regions = energy_speech_regions(audio, self.threshold_db)
+        return merge_regions(regions, len(audio), self.min_silence_seconds, self.pad_seconds)
+
+    def apply(self, audio):
+        regions = self.regions(audio)
+        if len(regions) == 1 and regions[0] == (0, len(audio)):
+            return audio, SpeechMap(regions)
+        speech = np.concatenate([audio[start:end] for start, end in regions]) if regions else audio[:0]
+        return speech, SpeechMap(regions)
+
+
+def retime(segment, start, end):
+    """
+    Returns a copy of a faster-whisper segment with new times; older releases
+    use namedtuples, newer ones dataclasses.
+    """
+    if hasattr(segment, "_replace"):
+        return segment._replace(start=start, end=end)
+    return dataclasses.replace(segment, start=start, end=end)
+
+
+def transcribe_speech(model, audio, speech_filter=None, **options):
+    """
+    Runs model.transcribe on a PCM window, on its speech only if a filter is
+    given. Returns (segments, info, speech_seconds) with segment times on the
+    window's timeline; a window without speech is not sent to the model and
+    has no segments and info None.
+    """
+    if speech_filter is None:
+        segments, info = model.transcribe(audio, **options)
+        return segments, info, len(audio) / SAMPLE_RATE
+
+    speech, speech_map = speech_filter.apply(audio)
+    speech_seconds = len(speech) / SAMPLE_RATE
+    if not len(speech):
+        logging.info(f"[Worker] No speech in {len(audio) / SAMPLE_RATE:.0f}s window, skipped.")
+        return [], None, 0.0
+    segments, info = model.transcribe(speech, **options)
+
+    def remapped():
+        for segment in segments:
+            yield retime(
+                segment,
+                speech_map.to_original(segment.start),
+                speech_map.to_original(segment.end, is_end=True),
+            )
+
+    return remapped(), info, speech_seconds
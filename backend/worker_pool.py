@@ -0,0 +1,150 @@
+# backend/worker_pool.py
+
+import logging
+import threading
+import time
+
+from resources import available_memory_bytes
+
+# Fewest intra-op threads a worker should get when the count is derived from cores
+MIN_THREADS_PER_WORKER = 2
+
+
+def plan_workers(requested, cores, available_memory, model_bytes, memory_per_job):
+    """
+    Returns (workers, cpu_threads). An explicit `requested` count wins; otherwise
+    the count is the smaller of what the cores and the memory left after loading
+    the model allow. cpu_threads splits the cores so workers do not oversubscribe.
+    """
+    if requested:
+        workers = requested
+    else:
+        by_cores = max(1, cores // MIN_THREADS_PER_WORKER)
+        by_memory = max(1, int((available_memory - model_bytes) // memory_per_job))
+        workers = min(by_cores, by_memory)
+    cpu_threads = max(1, cores // workers)
+    return workers, cpu_threads
+
+
+class WorkerStats:
+    """
+    Utilisation bookkeeping for one worker thread.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.current_job = None
+        self.busy_since = None
+        self.busy_seconds = 0.0
+        self.jobs_processed = 0
+        self.started_at = time.monotonic()
+
+    def as_dict(self):
+        now = time.monotonic()
+        busy = self.busy_seconds + (now - self.busy_since if self.busy_since else 0.0)
+        uptime = max(now - self.started_at, 1e-9)
+        return {
+            "worker": self.index,
+            "state": "busy" if self.current_job else "idle",
+            "current_job": self.current_job,
+            "jobs_processed": self.jobs_processed,
+            "busy_seconds": round(busy, 1),
+            "utilisation": round(busy / uptime, 3),
+        }
+
+
+class WorkerPool:
+    """
+    Fixed set of worker threads that claim jobs from a JobQueue and run them with
+    `handler(job)`. A worker only claims a new job while the memory headroom allows
+    another one (one job may always run), and shutdown() stops claiming and drains
+    the jobs that are in flight.
+    """
+
+    def __init__(self, job_queue, handler, workers, memory_per_job, idle_seconds=30):
+        self.job_queue = job_queue
+        self.handler = handler
+        self.workers = workers
+        self.memory_per_job = memory_per_job
+        self.idle_seconds = idle_seconds
+        self.stats = [WorkerStats(index) for index in range(workers)]
+        self._stopping = threading.Event()
+        self._threads = []
+        self._memory_throttled = False
+
+    def _busy_count(self):
+        return sum(1 for stats in self.stats if stats.current_job)
+
+    def _has_headroom(self):
+        if self._busy_count() == 0:
+            return True
+        enough = available_memory_bytes() >= self.memory_per_job
+        if enough == self._memory_throttled:
+            self._memory_throttled = not enough
+            if enough:
+                logging.info("[Pool] Memory headroom recovered, resuming idle workers.")
+            else:
+                logging.warning("[Pool] Memory is tight, idle workers stop claiming jobs.")
+        return enough
+
+    def _run(self, stats):
+        while not self._stopping.is_set():
+            if not self._has_headroom():
+                self._stopping.wait(5)
+                continue
+
+            token = self.job_queue.change_token()
+            job = self.job_queue.claim()
+            if job is None:
+                self.job_queue.wait_for_work(token, timeout=self.idle_seconds, cancel=self._stopping)
+                continue
+
+            stats.current_job = job[0]
+            stats.busy_since = time.monotonic()
+            try:
+                self.handler(job)
+            except Exception:
+                logging.exception(f"[Pool] Worker {stats.index} failed on job {job[0]}:")
+            finally:
+                stats.busy_seconds += time.monotonic() - stats.busy_since
+                stats.busy_since = None
+                stats.current_job = None
+                stats.jobs_processed += 1
+
+    def start(self):
+        self.job_queue.start_heartbeat()
+        for stats in self.stats:
+            thread = threading.Thread(target=self._run, args=(stats,), name=f"worker-{stats.index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"[Pool] Started {self.workers} worker(s).")
+
+    def shutdown(self, timeout=None):
+        """
+        Stops claiming new jobs and waits up to `timeout` seconds for in-flight jobs.
+        Returns True if every worker finished; jobs still running after that are
+        handed back to the queue.
+        """
+        logging.info(f"[Pool] Draining {self._busy_count()} in-flight job(s)...")
+        self._stopping.set()
+        self.job_queue.notify()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        drained = not any(thread.is_alive() for thread in self._threads)
+        if not drained:
+            requeued = self.job_queue.requeue_held()
+            logging.warning(f"[Pool] Drain timed out, returned {len(requeued)} job(s) to the queue.")
+        self.job_queue.stop()
+        return drained
+
+    def metrics(self):
+        workers = [stats.as_dict() for stats in self.stats]
+        return {
+            "workers": workers,
+            "busy": self._busy_count(),
+            "capacity": self.workers,
+            "memory_throttled": self._memory_throttled,
+            "available_memory_bytes": available_memory_bytes(),
+            "draining": self._stopping.is_set(),
+        }
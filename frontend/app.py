@@ -1,3 +1,4 @@
+import hashlib
 import io
 import logging
 import os
@@ -5,13 +6,22 @@ import sqlite3
 import sys
 import uuid
 from datetime import datetime
-from xml.sax.saxutils import escape  # Import for XML escaping
 
 from dotenv import load_dotenv
-from flask import (Flask, Response, flash, redirect, render_template, request,
-                   send_file, send_from_directory, url_for)
+from flask import (Flask, Response, abort, flash, jsonify, redirect,
+                   render_template, request, send_file, send_from_directory,
+                   stream_template, url_for)
+from werkzeug.http import is_resource_modified
 from werkzeug.utils import secure_filename
 
+from events import ProgressHub
+from listing import LISTING_INDEXES, FeedCache, list_page
+from search import remove_document, search
+from storage import (TRANSCRIPT_BODIES_CLEANUP, TRANSCRIPT_BODIES_TABLE,
+                     ConnectionPool, add_columns, enable_wal, load_transcript)
+from subtitles import FORMATS, format_timestamp, iter_segments
+from uploads import ResumableUploads, UploadError, check_disk_space
+
 # Determine the script's directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -30,6 +40,31 @@ SECRET_KEY_FILE = os.path.join(
     IMPORT_FOLDER, "secret.key"
 )  # File to store the secret key
 
+# Transcriptions per index page and items in the RSS feed
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+RSS_ITEMS = int(os.getenv("RSS_ITEMS", "50"))
+
+# Transcription profiles offered per upload, the first is preselected. Jobs without
+# one use the backend's DEFAULT_PROFILE.
+PROFILES = ("accurate", "fast")
+
+# Job progress is pushed over Server-Sent Events from a separate port. EVENTS_URL
+# overrides the address the browser connects to, e.g. behind a reverse proxy.
+EVENTS_PORT = int(os.getenv("EVENTS_PORT", "5002"))
+EVENTS_URL = os.getenv("EVENTS_URL", "")
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1"))
+# Origins whose pages may read the stream, comma-separated; by default only pages
+# served by the same host name, which covers the frontend on its own port
+EVENTS_ALLOWED_ORIGINS = [
+    origin.strip() for origin in os.getenv("EVENTS_ALLOWED_ORIGINS", "").split(",") if origin.strip()
+]
+
+# Uploads are refused with 507 while they would leave less than MIN_FREE_DISK_GB
+# free or grow the upload folder beyond UPLOADS_MAX_GB (0 for no limit); same
+# settings as the backend's watch folder and batch imports
+MIN_FREE_DISK_BYTES = int(float(os.getenv("MIN_FREE_DISK_GB", "2")) * 2**30)
+UPLOADS_MAX_BYTES = int(float(os.getenv("UPLOADS_MAX_GB", "0")) * 2**30)
+
 # Create necessary folders if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(TRANSCRIPTIONS_FOLDER, exist_ok=True)
@@ -45,10 +80,11 @@ logging.basicConfig(
     ],
 )
 
-# Initialize SQLite database
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute(
+# Initialize SQLite database, one connection per request thread
+enable_wal(DB_PATH)
+db = ConnectionPool(DB_PATH)
+conn = db.connection()
+conn.execute(
     """
     CREATE TABLE IF NOT EXISTS transcriptions (
         id TEXT PRIMARY KEY,
@@ -57,11 +93,31 @@ cursor.execute(
         transcription TEXT,
         summary TEXT,
         status TEXT DEFAULT 'pending',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        content_hash TEXT,
+        completed_at REAL
     )
 """
 )
-conn.commit()
+# Databases created before these columns existed lack them
+add_columns(
+    conn,
+    "transcriptions",
+    [
+        ("content_hash", "TEXT"),
+        ("completed_at", "REAL"),
+        ("progress_stage", "TEXT"),
+        ("progress_position", "REAL"),
+        ("progress_duration", "REAL"),
+        ("progress_eta", "REAL"),
+        ("progress_text", "TEXT"),
+        ("progress_updated_at", "REAL"),
+        ("profile", "TEXT"),
+    ],
+)
+# Transcripts are stored compressed by the backend and read on download
+for statement in LISTING_INDEXES + [TRANSCRIPT_BODIES_TABLE, TRANSCRIPT_BODIES_CLEANUP]:
+    conn.execute(statement)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -92,6 +148,92 @@ def get_secret_key():
 
 app.secret_key = get_secret_key()
 
+# Rendered RSS feed, rebuilt when a job completes or is removed
+feed_cache = FeedCache(RSS_ITEMS)
+
+# Chunked uploads written straight into the upload folder
+resumable_uploads = ResumableUploads(db, UPLOAD_FOLDER)
+resumable_uploads.ensure_schema()
+
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hex digest of a file, read in 1 MiB chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def unique_upload_name(filename):
+    original_filename, file_extension = os.path.splitext(filename)
+    return f"{original_filename}_{uuid.uuid4().hex}{file_extension}"
+
+
+def requested_profile(value):
+    if value in (None, ""):
+        return None
+    if value not in PROFILES:
+        raise UploadError(f"Unknown profile, expected one of {', '.join(PROFILES)}.")
+    return value
+
+
+def queue_upload(unique_filename, content_hash, staged_path=None, upload_id=None, profile=None):
+    """
+    Queues an uploaded file with the requested transcription profile unless the
+    same content is already transcribed or in process with that profile, and
+    returns the (message, category) to show. The same content with another
+    profile is a new job; the backend reuses its decoded audio, or its result if
+    the parameters match. The duplicate check, the job row and, for resumable
+    uploads, moving the staged file into place and dropping the upload record
+    happen in one transaction.
+    """
+    filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+    with db.transaction() as conn:
+        # Check if the same content is already in DB with this profile
+        result = conn.execute(
+            """
+            SELECT id, status FROM transcriptions
+            WHERE content_hash = ? AND profile IS ?
+            ORDER BY created_at DESC
+            """,
+            (content_hash, profile),
+        ).fetchone()
+        if result and result[1] != "failed":
+            logging.info(f"File already processed or in process: {unique_filename}")
+            outcome = ("Already transcribed.", "warning")
+        elif result and result[1] == "failed":
+            logging.info(f"Reprocessing failed file: {unique_filename}")
+            conn.execute(
+                "UPDATE transcriptions SET filename = ?, status = 'pending', attempts = 0 WHERE id = ?",
+                (unique_filename, result[0]),
+            )
+            outcome = ("Reprocessing file.", "info")
+        else:
+            # Insert new entry with 'pending' status
+            conn.execute(
+                """
+                INSERT INTO transcriptions (id, filename, status, content_hash, profile)
+                VALUES (?, ?, 'pending', ?, ?)
+                """,
+                (uuid.uuid4().hex, unique_filename, content_hash, profile),
+            )
+            logging.info(f"Added to queue: {unique_filename}")
+            outcome = ("Added to queue.", "success")
+
+        if upload_id:
+            resumable_uploads.finish(upload_id)
+        duplicate = outcome[1] == "warning"
+        if staged_path and not duplicate:
+            os.replace(staged_path, filepath)
+
+    for path in (staged_path, filepath) if duplicate else ():
+        if path and os.path.exists(path):
+            os.remove(path)
+    return outcome
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -102,68 +244,122 @@ def index():
             if not filename.lower().endswith(video_extensions + audio_extensions):
                 flash("Unsupported file type.", "danger")
                 return redirect(url_for("index"))
+            profile = request.form.get("profile")
+            if profile not in PROFILES:
+                profile = None
+            try:
+                check_disk_space(UPLOAD_FOLDER, request.content_length or 0, MIN_FREE_DISK_BYTES, UPLOADS_MAX_BYTES)
+            except UploadError as e:
+                logging.warning(f"Refused upload of {filename}: {e}")
+                flash(str(e), "danger")
+                return redirect(url_for("index"))
 
-            unique_id = uuid.uuid4().hex
-            original_filename = os.path.splitext(filename)[0]
-            file_extension = os.path.splitext(filename)[1]
-            unique_filename = f"{original_filename}_{unique_id}{file_extension}"
+            unique_filename = unique_upload_name(filename)
             filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
             file.save(filepath)
             logging.info(f"Uploaded file: {unique_filename}")
-
-            # Check if file is already in DB
-            cursor.execute(
-                "SELECT status FROM transcriptions WHERE filename = ?",
-                (unique_filename,),
-            )
-            result = cursor.fetchone()
-            if result:
-                status = result[0]
-                if status in ("completed", "processing"):
-                    logging.info(
-                        f"File already processed or in process: {unique_filename}"
-                    )
-                    flash("Already transcribed.", "warning")
-                elif status == "failed":
-                    logging.info(f"Reprocessing failed file: {unique_filename}")
-                    flash("Reprocessing file.", "info")
-            else:
-                # Insert new entry with 'pending' status
-                transcription_id = uuid.uuid4().hex
-                cursor.execute(
-                    """
-                    INSERT INTO transcriptions (id, filename, status)
-                    VALUES (?, ?, 'pending')
-                    """,
-                    (transcription_id, unique_filename),
-                )
-                conn.commit()
-                logging.info(f"Added to queue: {unique_filename}")
-                flash("Added to queue.", "success")
+            message, category = queue_upload(unique_filename, hash_file(filepath), profile=profile)
+            flash(message, category)
 
             return redirect(url_for("index"))
 
-    # Fetch transcription list
-    cursor.execute(
-        "SELECT id, filename, status FROM transcriptions ORDER BY created_at DESC"
+    # Fetch one page of the transcription list
+    transcriptions, newer, older = list_page(
+        db.connection(),
+        PAGE_SIZE,
+        before=request.args.get("before"),
+        after=request.args.get("after"),
+    )
+
+    return render_template(
+        "index.html",
+        transcriptions=transcriptions,
+        newer=newer,
+        older=older,
+        events_url=EVENTS_URL,
+        events_port=EVENTS_PORT,
+        profiles=PROFILES,
     )
-    transcriptions = cursor.fetchall()
 
-    return render_template("index.html", transcriptions=transcriptions)
+
+@app.errorhandler(UploadError)
+def upload_error(e):
+    return jsonify(error=str(e)), e.status
+
+
+@app.route("/uploads", methods=["POST"])
+def create_upload():
+    """
+    Starts a resumable upload. Body: {"filename", "size", optional "sha256" and
+    "profile"}. Returns the upload id and offset to send the first chunk to.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    size = data.get("size")
+    if not filename.lower().endswith(video_extensions + audio_extensions):
+        raise UploadError("Unsupported file type.")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("A positive size is required.")
+    check_disk_space(UPLOAD_FOLDER, size, MIN_FREE_DISK_BYTES, UPLOADS_MAX_BYTES)
+    status = resumable_uploads.create(
+        unique_upload_name(filename),
+        size,
+        data.get("sha256"),
+        requested_profile(data.get("profile")),
+    )
+    return jsonify(status), 201
+
+
+@app.route("/uploads/<upload_id>", methods=["GET"])
+def upload_status(upload_id):
+    return jsonify(resumable_uploads.status(upload_id))
+
+
+@app.route("/uploads/<upload_id>", methods=["PATCH"])
+def upload_chunk(upload_id):
+    """
+    Appends the request body at the offset in the Upload-Offset header. The
+    body is streamed to disk, never buffered. When the last byte lands the job
+    is queued and the response says so.
+    """
+    offset = request.headers.get("Upload-Offset", type=int)
+    if offset is None:
+        raise UploadError("Upload-Offset header is required.")
+    # The folder quota was checked against the declared size when the upload started
+    check_disk_space(UPLOAD_FOLDER, request.content_length or 0, MIN_FREE_DISK_BYTES)
+    status = resumable_uploads.write(upload_id, offset, request.stream, request.content_length)
+    if "sha256" in status:
+        message, _ = queue_upload(
+            status["filename"],
+            status["sha256"],
+            staged_path=resumable_uploads.part_path(status["filename"]),
+            upload_id=upload_id,
+            profile=status["profile"],
+        )
+        status.update(completed=True, message=message)
+    return jsonify(status)
+
+
+@app.route("/uploads/<upload_id>", methods=["DELETE"])
+def cancel_upload(upload_id):
+    resumable_uploads.discard(upload_id)
+    return "", 204
 
 
 @app.route("/transcriptions/<filename>")
 def download_file(filename):
     try:
-        # Query the database for the transcription, summary, and title with the given filename
-        cursor.execute(
-            "SELECT transcription, summary, title FROM transcriptions WHERE filename = ?",
+        # Query the database for the summary and title with the given filename
+        conn = db.connection()
+        result = conn.execute(
+            "SELECT id, summary, title FROM transcriptions WHERE filename = ?",
             (filename,),
-        )
-        result = cursor.fetchone()
+        ).fetchone()
+        # The transcript is stored separately and only read for downloads
+        transcription_content = load_transcript(conn, result[0]) if result else None
 
-        if result and result[0]:
-            transcription_content, summary_content, title = result
+        if transcription_content:
+            _, summary_content, title = result
             # Use 'title' in the download filename if it exists
             download_filename = (
                 f"{title if title else filename}_transcription_summary.html"
@@ -214,12 +410,105 @@ def download_file(filename):
         return redirect(url_for("index"))
 
 
-def get_transcriptions():
-    cursor.execute(
-        "SELECT filename, title, transcription, summary, status FROM transcriptions ORDER BY created_at DESC"
+@app.route("/transcriptions/<transcription_id>.<any(srt, vtt, json):export_format>")
+def export_segments(transcription_id, export_format):
+    """
+    Streams the stored segments as SRT, WebVTT or JSON. The ETag changes whenever
+    segments are added and completed transcripts carry Last-Modified and may be
+    cached, so conditional requests get a 304 without reading the segments.
+    """
+    conn = db.connection()
+    result = conn.execute(
+        "SELECT title, status, completed_at FROM transcriptions WHERE id = ?",
+        (transcription_id,),
+    ).fetchone()
+    if not result:
+        abort(404)
+    title, status, completed_at = result
+
+    try:
+        segment_count, last_block = conn.execute(
+            "SELECT SUM(count), MAX(block_index) FROM segments WHERE transcription_id = ?",
+            (transcription_id,),
+        ).fetchone()
+    except sqlite3.OperationalError:  # The backend has not created the table yet
+        segment_count = last_block = None
+    if not segment_count:
+        abort(404)
+
+    version = f"{transcription_id}:{status}:{segment_count}:{last_block}:{export_format}"
+    etag = hashlib.sha1(version.encode("utf-8")).hexdigest()
+    last_modified = None
+    if status == "completed" and completed_at:
+        last_modified = datetime.utcfromtimestamp(completed_at)
+
+    # Answered before the body exists: make_conditional() would read the whole
+    # generator to set Content-Length
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        formatter, mimetype = FORMATS[export_format]
+        segments = iter_segments(DB_PATH, transcription_id)
+        if export_format == "json":
+            body = formatter(segments, id=transcription_id, title=title, status=status)
+        else:
+            body = formatter(segments)
+        response = Response(body, content_type=f"{mimetype}; charset=utf-8")
+        response.headers["Content-Disposition"] = f'inline; filename="{transcription_id}.{export_format}"'
+    else:
+        response = Response(status=304)
+    response.set_etag(etag)
+    if status == "completed":
+        if last_modified:
+            response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = 3600
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+@app.template_filter("timestamp")
+def timestamp_filter(seconds):
+    return format_timestamp(seconds, ".")[:-4]
+
+
+@app.route("/search")
+def search_transcriptions():
+    query = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    results, has_more = [], False
+    if query:
+        try:
+            results, has_more = search(db.connection(), DB_PATH, query, page=page)
+        except sqlite3.OperationalError as e:  # The backend has not built the index yet
+            logging.error(f"Search failed for {query!r}: {e}")
+            flash("Search is not available yet.", "warning")
+    return render_template(
+        "search.html", query=query, page=page, results=results, has_more=has_more
+    )
+
+
+@app.route("/transcript/<transcription_id>")
+def view_transcript(transcription_id):
+    """
+    Renders the transcript with one anchor per segment (#t<seconds>) so search
+    results can link to the moment a match was said. Streamed like the exports.
+    While the job runs this shows the segments the backend has checkpointed so far.
+    """
+    result = db.execute(
+        "SELECT filename, title, status FROM transcriptions WHERE id = ?", (transcription_id,)
+    ).fetchone()
+    if not result:
+        abort(404)
+    filename, title, status = result
+    return Response(
+        stream_template(
+            "transcript.html",
+            filename=filename,
+            title=title,
+            in_progress=status in ("pending", "processing"),
+            segments=iter_segments(DB_PATH, transcription_id),
+        )
     )
-    rows = cursor.fetchall()
-    return rows
 
 
 @app.route("/remove_transcription", methods=["POST"])
@@ -231,11 +520,10 @@ def remove_transcription():
 
     try:
         # Fetch the transcription details from the database
-        cursor.execute(
+        result = db.execute(
             "SELECT filename, status FROM transcriptions WHERE id = ?",
             (transcription_id,),
-        )
-        result = cursor.fetchone()
+        ).fetchone()
         if not result:
             flash("Transcription not found.", "danger")
             return redirect(url_for("index"))
@@ -243,13 +531,15 @@ def remove_transcription():
         filename, status = result
 
         # Prevent removal if transcription is still processing
-        if status == "processing":
+        if status in ("processing", "summarizing"):
             flash("Cannot remove a transcription that is still processing.", "warning")
             return redirect(url_for("index"))
 
-        # Begin transaction
-        cursor.execute("DELETE FROM transcriptions WHERE id = ?", (transcription_id,))
-        conn.commit()
+        with db.transaction() as conn:
+            remove_document(conn, transcription_id)
+            conn.execute("DELETE FROM transcriptions WHERE id = ?", (transcription_id,))
+        if status == "completed":
+            feed_cache.invalidate()
 
         # Remove the uploaded file from the server
         file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
@@ -257,14 +547,8 @@ def remove_transcription():
             os.remove(file_path)
             logging.info(f"Removed file: {filename}")
 
-        # Optionally, remove associated transcription files if stored separately
-        # For example, if transcription and summary are saved as separate files:
-        # transcription_file = os.path.join(app.config["TRANSCRIPTIONS_FOLDER"], f"{filename}_transcription.txt")
-        # summary_file = os.path.join(app.config["TRANSCRIPTIONS_FOLDER"], f"{filename}_summary.txt")
-        # for path in [transcription_file, summary_file]:
-        #     if os.path.exists(path):
-        #         os.remove(path)
-        #         logging.info(f"Removed transcription file: {path}")
+        # Transcript, segments and summary went with the row; anything the job
+        # left on disk is reclaimed by the backend's storage janitor
 
         flash(f"Transcription '{filename}' has been removed successfully.", "success")
     except Exception as e:
@@ -274,91 +558,28 @@ def remove_transcription():
     return redirect(url_for("index"))
 
 
-def generate_rss(transcriptions):
-    rss_items = ""
-    for transcription in transcriptions:
-        try:
-            filename, transcription, summary, status, created_at = transcription
-            if status == "completed":
-                link = f"https://transcribe.tbelbek.com/transcriptions/{filename}"
-                
-                # Escape XML-sensitive characters
-                safe_summary = escape(summary) if summary else "No Summary Available."
-                safe_transcription = escape(transcription) if transcription else "No Transcription Available."
-                
-                # Convert created_at to datetime object if it's a string
-                if isinstance(created_at, str):
-                    try:
-                        # Adjust the format string based on your actual created_at format
-                        created_at_dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                    except ValueError:
-                        logging.warning(f"Invalid date format for transcription '{filename}'. Using current UTC time.")
-                        created_at_dt = datetime.utcnow()
-                elif isinstance(created_at, datetime):
-                    created_at_dt = created_at
-                else:
-                    logging.warning(f"Unsupported type for created_at in transcription '{filename}'. Using current UTC time.")
-                    created_at_dt = datetime.utcnow()
-                
-                # Format the date to RFC 2822
-                pub_date = created_at_dt.strftime('%a, %d %b %Y %H:%M:%S +0000')
-                
-                # Format the content to include title, summary, and transcription with HTML formatting
-                description_content = f"""
-                <article>
-                    <header>
-                        <h1>{safe_title}</h1>
-                    </header>
-                    <section class="summary">
-                        <h2>Summary</h2>
-                        <p>{safe_summary}</p>
-                    </section>
-                    <section class="transcription">
-                        <h2>Transcription</h2>
-                        <p>{safe_transcription}</p>
-                    </section>
-                </article>
-                """
-                
-                # Append the RSS item with CDATA section for description
-                rss_items += f"""
-                <item>
-                    <title>{safe_title}</title>
-                    <description><![CDATA[
-                    {description_content}
-                    ]]></description>
-                    <link>{link}</link>
-                    <pubDate>{pub_date}</pubDate>
-                </item>
-                """
-        except Exception as e:
-            logging.exception(f"Error processing transcription {transcription}: {e}")
-            continue  # Skip to the next transcription in case of error
-    
-    rss_feed = f"""<?xml version="1.0" encoding="UTF-8" ?>
-    <rss version="2.0">
-        <channel>
-            <title>Video Transcriptions RSS Feed</title>
-            <link>https://transcribe.tbelbek.com/rss</link>
-            <description>RSS feed of video transcriptions and summaries.</description>
-            {rss_items}
-        </channel>
-    </rss>"""
-    return rss_feed
-
-
 @app.route("/rss")
 def rss():
-    transcriptions = get_transcriptions()
-    rss_feed = generate_rss(transcriptions)
-    return Response(rss_feed, mimetype="application/rss+xml")
+    """
+    Serves the latest RSS_ITEMS completed transcriptions. The rendered feed is
+    cached until a job completes or is removed, and conditional requests get 304.
+    """
+    body, etag, last_modified = feed_cache.get(db.connection())
+    response = Response(body, mimetype="application/rss+xml")
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route("/transcriptions")
 def list_transcriptions():
-    transcriptions = get_transcriptions()
-    return render_template("transcriptions.html", transcriptions=transcriptions)
+    return redirect(url_for("index"))
 
 
 if __name__ == "__main__":
+    ProgressHub(
+        DB_PATH, port=EVENTS_PORT, poll_seconds=EVENTS_POLL_SECONDS, allowed_origins=EVENTS_ALLOWED_ORIGINS
+    ).start()
     app.run(host="0.0.0.0", port=5001)
@@ -0,0 +1,219 @@
+# frontend/events.py
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+from storage import connect
+
+# Jobs whose progress is still changing
+ACTIVE_STATUSES = ("pending", "processing", "transcribed", "summarizing")
+
+PROGRESS_FIELDS = ("id", "status", "stage", "position", "duration", "eta", "text")
+
+
+class ProgressHub:
+    """
+    Server-Sent Events stream of job progress at /events, served by one asyncio
+    loop on its own thread and port. A single poller reads the transcriptions
+    table when PRAGMA data_version says another connection wrote to it, and
+    sends the jobs that changed to every client. An idle client costs a socket
+    and a small queue, not a thread, so thousands of open pages are cheap.
+    `/events?id=<id>` limits the stream to one job.
+
+    The stream carries partial transcripts, so cross-origin pages may only read
+    it from `allowed_origins`, or, if none are given, from pages served by the
+    same host name as the stream (the frontend on its own port).
+    """
+
+    def __init__(
+        self,
+        db_path,
+        host="0.0.0.0",
+        port=5002,
+        poll_seconds=1.0,
+        keepalive_seconds=15.0,
+        client_queue=64,
+        allowed_origins=(),
+    ):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.poll_seconds = poll_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.client_queue = client_queue
+        self.allowed_origins = set(allowed_origins)
+        self.jobs = {}  # id -> latest progress event
+        self._clients = set()
+        self._conn = None
+        self._loop = None
+        self._stopping = None
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="progress-hub", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self._stopping = asyncio.Event()
+        self._conn = connect(self.db_path, timeout=5, check_same_thread=False)
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        # Held so the task is not garbage collected while it runs
+        poller = asyncio.ensure_future(self._poll())
+        logging.info(f"Progress events listening on port {self.port}.")
+        self._ready.set()
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            poller.cancel()
+            # Cancel every open stream too before the loop closes
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._conn.close()
+
+    def _read_changes(self, data_version):
+        """
+        Runs on the executor thread. Returns (data_version, events) with one
+        event per job that started, changed or left the active statuses since
+        the previous call; nothing is queried while data_version is unchanged.
+        """
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == data_version:
+            return version, []
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        rows = self._conn.execute(
+            f"""
+            SELECT id, status, progress_stage, progress_position, progress_duration,
+                   progress_eta, progress_text
+            FROM transcriptions WHERE status IN ({placeholders})
+            """,
+            ACTIVE_STATUSES,
+        ).fetchall()
+        current = {row[0]: dict(zip(PROGRESS_FIELDS, row)) for row in rows}
+        finished = [job_id for job_id in self.jobs if job_id not in current]
+        for start in range(0, len(finished), 500):
+            batch = finished[start : start + 500]
+            found = dict(
+                self._conn.execute(
+                    f"SELECT id, status FROM transcriptions WHERE id IN ({', '.join('?' for _ in batch)})",
+                    batch,
+                ).fetchall()
+            )
+            for job_id in batch:
+                current[job_id] = {"id": job_id, "status": found.get(job_id, "removed")}
+        events = [event for job_id, event in current.items() if self.jobs.get(job_id) != event]
+        return version, events
+
+    async def _poll(self):
+        loop = asyncio.get_event_loop()
+        data_version = None
+        while True:
+            try:
+                data_version, events = await loop.run_in_executor(
+                    None, self._read_changes, data_version
+                )
+            except sqlite3.Error as e:
+                logging.warning(f"Could not read job progress: {e}")
+                events = []
+            for event in events:
+                if event["status"] in ACTIVE_STATUSES:
+                    self.jobs[event["id"]] = event
+                else:
+                    self.jobs.pop(event["id"], None)
+                self._broadcast(event)
+            await asyncio.sleep(self.poll_seconds)
+
+    def _broadcast(self, event):
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client that cannot keep up is dropped; EventSource reconnects
+                self._clients.discard(queue)
+
+    def _origin_allowed(self, origin, host):
+        if self.allowed_origins:
+            return origin in self.allowed_origins
+        return urlsplit(origin).hostname == urlsplit(f"//{host}").hostname
+
+    async def _handle(self, reader, writer):
+        queue = None
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 10)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            url = urlsplit(parts[1]) if len(parts) == 3 else None
+            if not url or parts[0] != "GET" or url.path != "/events":
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+            only = parse_qs(url.query).get("id", [None])[0]
+
+            queue = asyncio.Queue(self.client_queue)
+            self._clients.add(queue)
+            cors = b""
+            origin = headers.get("origin")
+            if origin and self._origin_allowed(origin, headers.get("host", "")):
+                cors = f"Access-Control-Allow-Origin: {origin}\r\nVary: Origin\r\n".encode("latin-1")
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\n"
+                + cors
+                + b"Connection: keep-alive\r\n\r\n"
+                b"retry: 5000\n\n"
+            )
+            for event in list(self.jobs.values()):
+                if only in (None, event["id"]):
+                    writer.write(format_event(event))
+            await writer.drain()
+
+            while queue in self._clients:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                else:
+                    if only not in (None, event["id"]):
+                        continue
+                    writer.write(format_event(event))
+                await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(queue)
+            writer.close()
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+
+def format_event(event):
+    return f"event: progress\ndata: {json.dumps(event)}\n\n".encode("utf-8")
@@ -0,0 +1,157 @@
+# frontend/listing.py
+
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+FEED_URL = "https://transcribe.tbelbek.com/rss"
+ITEM_URL = "https://transcribe.tbelbek.com/transcriptions/{filename}"
+
+LISTING_INDEXES = [
+    # Keyset pagination of the index page
+    "CREATE INDEX IF NOT EXISTS idx_transcriptions_listing ON transcriptions (created_at, id)",
+    # Latest completed jobs for the feed, and its cache validator
+    """
+    CREATE INDEX IF NOT EXISTS idx_transcriptions_completed
+    ON transcriptions (status, created_at, id)
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transcriptions_completed_at ON transcriptions (completed_at)",
+]
+
+
+def encode_cursor(row):
+    return f"{row[3]}|{row[0]}"
+
+
+def decode_cursor(value):
+    created_at, _, transcription_id = (value or "").partition("|")
+    return (created_at, transcription_id) if transcription_id else None
+
+
+def list_page(conn, limit, before=None, after=None):
+    """
+    Returns (rows, newer, older) for one page of the index, newest first. Rows
+    are (id, filename, status, created_at). `before`/`after` are cursors from a
+    previous page; `newer` and `older` are the cursors for the adjacent pages,
+    or None at either end. Only the page's rows are read.
+    """
+    before, after = decode_cursor(before), decode_cursor(after)
+    if after:
+        rows = conn.execute(
+            """
+            SELECT id, filename, status, created_at FROM transcriptions
+            WHERE (created_at, id) > (?, ?)
+            ORDER BY created_at, id
+            LIMIT ?
+            """,
+            after + (limit + 1,),
+        ).fetchall()
+        has_newer = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_older = True
+    else:
+        rows = conn.execute(
+            f"""
+            SELECT id, filename, status, created_at FROM transcriptions
+            {"WHERE (created_at, id) < (?, ?)" if before else ""}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+            """,
+            (before or ()) + (limit + 1,),
+        ).fetchall()
+        has_older = len(rows) > limit
+        rows = rows[:limit]
+        has_newer = before is not None
+    newer = encode_cursor(rows[0]) if rows and has_newer else None
+    older = encode_cursor(rows[-1]) if rows and has_older else None
+    return rows, newer, older
+
+
+def latest_completed(conn, limit):
+    """
+    Returns (filename, title, summary, created_at) of the latest completed jobs.
+    The transcript text is not read.
+    """
+    return conn.execute(
+        """
+        SELECT filename, title, summary, created_at FROM transcriptions
+        WHERE status = 'completed'
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+
+
+def pub_date(created_at):
+    try:
+        created = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        logging.warning(f"Invalid created_at {created_at!r} in feed, using current UTC time.")
+        created = datetime.utcnow()
+    return format_datetime(created.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def iter_rss(rows):
+    """
+    Yields the RSS document in pieces, one per item.
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n'
+        '<rss version="2.0">\n<channel>\n'
+        "<title>Video Transcriptions RSS Feed</title>\n"
+        f"<link>{FEED_URL}</link>\n"
+        "<description>RSS feed of video transcriptions and summaries.</description>\n"
+    )
+    for filename, title, summary, created_at in rows:
+        safe_title = escape(title or filename)
+        # The summary is already an HTML article; CDATA must not be closed early
+        description = (summary or "No Summary Available.").replace("]]>", "]]]]><![CDATA[>")
+        yield (
+            "<item>\n"
+            f"<title>{safe_title}</title>\n"
+            f"<description><![CDATA[{description}]]></description>\n"
+            f"<link>{escape(ITEM_URL.format(filename=filename))}</link>\n"
+            f"<guid isPermaLink=\"false\">{escape(filename)}</guid>\n"
+            f"<pubDate>{pub_date(created_at)}</pubDate>\n"
+            "</item>\n"
+        )
+    yield "</channel>\n</rss>\n"
+
+
+class FeedCache:
+    """
+    Keeps the rendered feed until a job completes or is removed. The validator
+    is the latest completed_at plus a local generation bumped on removals, both
+    cheap to read; the feed is rebuilt only when it changes.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._key = None
+        self._feed = None
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+
+    def get(self, conn):
+        """
+        Returns (body, etag, last_modified) for the current feed.
+        """
+        last_completed = conn.execute("SELECT MAX(completed_at) FROM transcriptions").fetchone()[0]
+        with self._lock:
+            key = (last_completed, self.generation)
+            if key != self._key:
+                body = "".join(iter_rss(latest_completed(conn, self.limit))).encode("utf-8")
+                last_modified = (
+                    datetime.fromtimestamp(last_completed, timezone.utc) if last_completed else None
+                )
+                self._feed = (body, hashlib.sha1(body).hexdigest(), last_modified)
+                self._key = key
+            return self._feed
@@ -0,0 +1,170 @@
+# frontend/search.py
+
+import re
+from html import escape
+
+from storage import load_transcript
+from subtitles import iter_segments
+
+# Markers make_snippet() wraps matches in; replaced with <mark> after escaping
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+# Words of context a snippet keeps around its first match
+SNIPPET_WORDS = 16
+
+# bm25 weights of the title, summary and transcription columns
+COLUMN_WEIGHTS = (10.0, 4.0, 1.0)
+
+
+def query_words(query):
+    return [word.lower() for word in re.findall(r"\w+", query)]
+
+
+def match_expression(words):
+    """
+    Turns query words into an FTS5 query: every word must match, the last one
+    as a prefix. Words are quoted so FTS5 operators in the input are taken
+    literally.
+    """
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def word_patterns(words):
+    """
+    Returns a pattern per query word, matching it as a whole word, the last one
+    as a prefix.
+    """
+    patterns = [re.compile(rf"\b{re.escape(word)}\b", re.IGNORECASE) for word in words[:-1]]
+    patterns.append(re.compile(rf"\b{re.escape(words[-1])}", re.IGNORECASE))
+    return patterns
+
+
+def make_snippet(text, patterns, words=SNIPPET_WORDS):
+    """
+    Returns about `words` words of `text` from just before its first match, with
+    the matches wrapped in MATCH_START and MATCH_END. Tags of HTML summaries are
+    dropped first.
+    """
+    tokens = re.sub(r"<[^>]*>", " ", text or "").split()
+    first = next(
+        (i for i, token in enumerate(tokens) if any(pattern.search(token) for pattern in patterns)), 0
+    )
+    start = max(0, first - words // 4)
+    marked = []
+    for token in tokens[start : start + words]:
+        for pattern in patterns:
+            token = pattern.sub(lambda match: f"{MATCH_START}{match.group(0)}{MATCH_END}", token)
+        marked.append(token)
+    prefix = "…" if start else ""
+    suffix = "…" if start + words < len(tokens) else ""
+    return prefix + " ".join(marked) + suffix
+
+
+def highlight(snippet):
+    """
+    Escapes a snippet for HTML and marks the matched terms.
+    """
+    return escape(snippet or "").replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def find_segment(db_path, transcription_id, patterns):
+    """
+    Returns (start, text) of the first segment that contains the most query
+    words, or (None, None) if no segment contains any.
+    """
+    best_start, best_text, best_hits = None, None, 0
+    for start, _, text, _ in iter_segments(db_path, transcription_id):
+        hits = sum(1 for pattern in patterns if pattern.search(text))
+        if hits > best_hits:
+            best_start, best_text, best_hits = start, text, hits
+            if hits == len(patterns):
+                break
+    return best_start, best_text
+
+
+def remove_document(conn, transcription_id):
+    """
+    Removes a transcription from the search index, in the transaction that
+    deletes its row and before it does. The index is contentless, so its row is
+    removed given the values it was indexed from (see backend/search_index.py).
+    """
+    row = conn.execute(
+        """
+        SELECT d.doc_id, t.title, t.summary FROM search_docs d
+        JOIN transcriptions t ON t.id = d.transcription_id
+        WHERE d.transcription_id = ?
+        """,
+        (transcription_id,),
+    ).fetchone()
+    if not row:
+        return
+    doc_id, title, summary = row
+    conn.execute(
+        """
+        INSERT INTO transcriptions_fts (transcriptions_fts, rowid, title, summary, transcription)
+        VALUES ('delete', ?, ?, ?, ?)
+        """,
+        (doc_id, title, summary, load_transcript(conn, transcription_id)),
+    )
+    conn.execute("DELETE FROM search_docs WHERE doc_id = ?", (doc_id,))
+
+
+def search(conn, db_path, query, page=1, per_page=20):
+    """
+    Returns (results, has_more) for one page of transcriptions matching `query`,
+    best first by bm25 over title, summary and transcript. Each result is a dict
+    with id, filename, title, status, snippet (HTML) and start, the time in
+    seconds of the first segment that matches best, or None if only the title or
+    summary matched. Snippets and timestamps are computed only for the page, and
+    transcriptions whose index row outlived them are skipped.
+    """
+    words = query_words(query)
+    if not words:
+        return [], False
+    match = match_expression(words)
+
+    rows = conn.execute(
+        f"""
+        SELECT t.id, t.filename, t.title, t.summary, t.status
+        FROM (
+            SELECT rowid, bm25(transcriptions_fts, {", ".join(map(str, COLUMN_WEIGHTS))}) AS score
+            FROM transcriptions_fts
+            -- Unary + keeps FTS5 from running the match once per search_docs row
+            WHERE transcriptions_fts MATCH ? AND +rowid IN (SELECT doc_id FROM search_docs)
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        ) f
+        JOIN search_docs d ON d.doc_id = f.rowid
+        JOIN transcriptions t ON t.id = d.transcription_id
+        ORDER BY f.score
+        """,
+        (match, per_page + 1, (page - 1) * per_page),
+    ).fetchall()
+
+    patterns = word_patterns(words)
+    results = []
+    for transcription_id, filename, title, summary, status in rows[:per_page]:
+        # The index keeps no text, so the snippet comes from the best segment, or
+        # from the summary or title if only they matched. Transcripts stored before
+        # segments were kept have none.
+        start, text = find_segment(db_path, transcription_id, patterns)
+        if text is None:
+            text = next(
+                (field for field in (summary, title) if any(p.search(field or "") for p in patterns)), None
+            )
+        if text is None:
+            text = load_transcript(conn, transcription_id)
+        results.append(
+            {
+                "id": transcription_id,
+                "filename": filename,
+                "title": title,
+                "status": status,
+                "snippet": highlight(make_snippet(text, patterns)),
+                "start": start,
+            }
+        )
+    return results, len(rows) > per_page
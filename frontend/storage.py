@@ -0,0 +1,254 @@
+# frontend/storage.py
+# Mirrored in backend/storage.py: both services open the same database but their
+# images are built from separate folders, so the two copies must stay identical.
+
+import contextlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+# Prepared statements cached per connection, enough for every query the services run
+CACHED_STATEMENTS = 256
+
+# Transcripts shorter than this are not worth compressing
+COMPRESS_MIN_BYTES = 512
+
+MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name TEXT PRIMARY KEY,
+    applied_at REAL NOT NULL
+)
+"""
+
+# Transcript text lives outside the transcriptions row, so listing, queue and
+# progress queries never page through it; codec is 'zlib' or 'utf-8'
+TRANSCRIPT_BODIES_TABLE = """
+CREATE TABLE IF NOT EXISTS transcript_bodies (
+    transcription_id TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL
+)
+"""
+
+TRANSCRIPT_BODIES_CLEANUP = """
+CREATE TRIGGER IF NOT EXISTS transcript_bodies_cleanup AFTER DELETE ON transcriptions
+BEGIN
+    DELETE FROM transcript_bodies WHERE transcription_id = OLD.id;
+END
+"""
+
+
+def connect(db_path, timeout=30, check_same_thread=True):
+    """
+    Opens an autocommit connection with the settings every connection to the
+    shared database uses: a busy timeout rather than an immediate 'database is
+    locked', a larger prepared-statement cache and, in WAL mode,
+    synchronous=NORMAL. Multi-statement writes go through transaction().
+    """
+    conn = sqlite3.connect(
+        db_path,
+        timeout=timeout,
+        isolation_level=None,
+        check_same_thread=check_same_thread,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        # Commits stay atomic and consistent; only the last ones may be lost on power failure
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def enable_wal(db_path):
+    """
+    Switches the database to write-ahead logging, so readers no longer block the
+    writer or each other. The mode is stored in the file and survives restarts.
+    WAL needs shared memory between the processes, i.e. one host; on a network
+    filesystem SQLite refuses and the rollback journal stays.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    finally:
+        conn.close()
+    if mode != "wal":
+        logging.warning(f"SQLite journal mode is '{mode}', WAL is not available for {db_path}.")
+    return mode
+
+
+@contextlib.contextmanager
+def transaction(conn, mode="IMMEDIATE"):
+    """
+    Runs the block in one transaction on an autocommit connection. IMMEDIATE
+    takes the write lock up front, so the block cannot fail half-way with
+    SQLITE_BUSY when it upgrades from reading to writing.
+    """
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class ConnectionPool:
+    """
+    One connection per thread to a database, opened on first use with
+    connect(). SQLite connections must not be used by two threads at once, so
+    request and worker threads each get their own instead of sharing a cursor.
+    """
+
+    def __init__(self, db_path, timeout=30):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # close() may run on another thread at shutdown
+            conn = connect(self.db_path, self.timeout, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def execute(self, sql, parameters=()):
+        return self.connection().execute(sql, parameters)
+
+    def transaction(self, mode="IMMEDIATE"):
+        return transaction(self.connection(), mode)
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+def add_columns(conn, table, columns):
+    """
+    Adds the (name, definition) columns a table is missing and returns their names.
+    """
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    added = []
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+    return added
+
+
+def migrate(conn, migrations):
+    """
+    Applies the named migrations that are not recorded in schema_migrations yet,
+    in order. Each is a SQL string or a function of the connection and runs in
+    its own IMMEDIATE transaction, so two services starting together apply it
+    once. Names are shared by every service that opens the database.
+    """
+    conn.execute(MIGRATIONS_TABLE)
+    applied = []
+    for name, migration in migrations:
+        with transaction(conn):
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE name = ?", (name,)).fetchone():
+                continue
+            if callable(migration):
+                migration(conn)
+            else:
+                conn.execute(migration)
+            conn.execute(
+                "INSERT INTO schema_migrations (name, applied_at) VALUES (?, ?)", (name, time.time())
+            )
+        applied.append(name)
+        logging.info(f"Applied database migration '{name}'.")
+    return applied
+
+
+def encode_text(text):
+    """
+    Returns (codec, body, size) for storing a transcript.
+    """
+    data = text.encode("utf-8")
+    if len(data) < COMPRESS_MIN_BYTES:
+        return "utf-8", data, len(data)
+    return "zlib", zlib.compress(data, 6), len(data)
+
+
+def decode_text(codec, body):
+    if codec == "zlib":
+        body = zlib.decompress(body)
+    return bytes(body).decode("utf-8")
+
+
+def save_transcript(conn, transcription_id, text):
+    """
+    Stores a transcript compressed in transcript_bodies.
+    """
+    codec, body, size = encode_text(text or "")
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO transcript_bodies (transcription_id, codec, size, body)
+        VALUES (?, ?, ?, ?)
+        """,
+        (transcription_id, codec, size, body),
+    )
+
+
+def load_transcript(conn, transcription_id):
+    """
+    Returns a transcript, or None. Rows written before transcript_bodies existed
+    still have the text in transcriptions.transcription.
+    """
+    row = conn.execute(
+        "SELECT codec, body FROM transcript_bodies WHERE transcription_id = ?", (transcription_id,)
+    ).fetchone()
+    if row:
+        return decode_text(*row)
+    row = conn.execute(
+        "SELECT transcription FROM transcriptions WHERE id = ?", (transcription_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def copy_transcript(conn, source_id, transcription_id):
+    """
+    Copies a stored transcript to another job without decompressing it.
+    """
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO transcript_bodies (transcription_id, codec, size, body)
+        SELECT ?, codec, size, body FROM transcript_bodies WHERE transcription_id = ?
+        """,
+        (transcription_id, source_id),
+    )
+
+
+def move_transcripts_to_bodies(conn, batch=200):
+    """
+    Migration: compresses transcripts still held in transcriptions.transcription
+    into transcript_bodies and clears the column.
+    """
+    conn.execute(TRANSCRIPT_BODIES_TABLE)
+    conn.execute(TRANSCRIPT_BODIES_CLEANUP)
+    moved = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, transcription FROM transcriptions WHERE transcription IS NOT NULL LIMIT ?",
+            (batch,),
+        ).fetchall()
+        if not rows:
+            break
+        for transcription_id, text in rows:
+            save_transcript(conn, transcription_id, text)
+        conn.executemany(
+            "UPDATE transcriptions SET transcription = NULL WHERE id = ?", [(row[0],) for row in rows]
+        )
+        moved += len(rows)
+    if moved:
+        logging.info(f"Compressed {moved} stored transcript(s).")
@@ -0,0 +1,105 @@
+# frontend/subtitles.py
+
+import array
+import json
+import sys
+
+from storage import connect
+
+
+def _unpack(blob, typecode):
+    values = array.array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+# Stored by the backend for segments diarization found no speaker for
+NO_SPEAKER = 0xFFFF
+
+
+def speaker_label(speaker):
+    return f"Speaker {speaker + 1}"
+
+
+def iter_segments(db_path, transcription_id):
+    """
+    Yields (start, end, text, speaker) for the segments the backend stored for a
+    transcription; speaker is a label such as 'Speaker 1', or None unless the
+    job was diarized. The segments table holds blocks of little-endian column
+    arrays (see backend/segments.py); rows are read and decoded one block at a
+    time so memory stays flat however long the transcript is.
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT starts, ends, text_offsets, text, speakers FROM segments
+            WHERE transcription_id = ?
+            ORDER BY block_index
+            """,
+            (transcription_id,),
+        )
+        for starts, ends, offsets, text, speakers in rows:
+            starts = _unpack(starts, "f")
+            ends = _unpack(ends, "f")
+            offsets = _unpack(offsets, "I")
+            speakers = _unpack(speakers, "H") if speakers else None
+            for i in range(len(starts)):
+                speaker = None
+                if speakers and speakers[i] != NO_SPEAKER:
+                    speaker = speaker_label(speakers[i])
+                yield starts[i], ends[i], text[offsets[i] : offsets[i + 1]].decode("utf-8"), speaker
+    finally:
+        conn.close()
+
+
+def format_timestamp(seconds, separator):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def iter_srt(segments):
+    for index, (start, end, text, speaker) in enumerate(segments, start=1):
+        if speaker:
+            text = f"{speaker}: {text}"
+        yield (
+            f"{index}\n{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n"
+            f"{text}\n\n"
+        )
+
+
+def iter_vtt(segments):
+    yield "WEBVTT\n\n"
+    for start, end, text, speaker in segments:
+        # "-->" may not appear in a cue payload
+        text = text.replace("-->", "->")
+        if speaker:
+            text = f"<v {speaker}>{text}"
+        yield f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n\n"
+
+
+def iter_json(segments, **fields):
+    """
+    Streams {**fields, "segments": [{"start", "end", "text"}, ...]} as JSON;
+    segments of diarized jobs also have a "speaker".
+    """
+    header = json.dumps(fields, ensure_ascii=False)
+    yield header[:-1] + (", " if fields else "") + '"segments": ['
+    for index, (start, end, text, speaker) in enumerate(segments):
+        segment = {"start": round(start, 3), "end": round(end, 3), "text": text}
+        if speaker:
+            segment["speaker"] = speaker
+        yield ("," if index else "") + json.dumps(segment, ensure_ascii=False)
+    yield "]}"
+
+
+FORMATS = {
+    "srt": (iter_srt, "application/x-subrip"),
+    "vtt": (iter_vtt, "text/vtt"),
+    "json": (iter_json, "application/json"),
+}
@@ -0,0 +1,211 @@
+# frontend/uploads.py
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from storage import add_columns
+
+READ_BYTES = 1024 * 1024
+
+UPLOADS_TABLE = """
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    profile TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def check_disk_space(folder, incoming_bytes, min_free_bytes, max_folder_bytes=0):
+    """
+    Refuses `incoming_bytes` more in `folder` with a 507 if the disk would keep
+    less than `min_free_bytes` free or the folder would grow beyond
+    `max_folder_bytes` (0 for no limit). Mirrors the backend's admission_error().
+    """
+    free = shutil.disk_usage(folder).free
+    if free - incoming_bytes < min_free_bytes:
+        raise UploadError("Not enough disk space for this upload, try again later.", 507)
+    if max_folder_bytes:
+        used = 0
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        used += entry.stat(follow_symlinks=False).st_size
+                except FileNotFoundError:
+                    continue
+        if used + incoming_bytes > max_folder_bytes:
+            raise UploadError("Too many uploads are waiting to be transcribed, try again later.", 507)
+
+
+class ResumableUploads:
+    """
+    Chunk/offset upload protocol. An upload is created with its final name and
+    size, then its bytes are appended with requests that state the offset they
+    start at. Data is streamed from the request straight into
+    `<filename>.part` in the upload folder, and the SHA-256 is updated as the
+    bytes arrive. The size of the .part file is the authoritative offset, so an
+    interrupted request resumes at whatever reached the disk. The running hashes
+    are kept only while their upload exists; the backend's janitor expires idle
+    uploads with their .part file.
+    """
+
+    def __init__(self, db, upload_folder):
+        self.db = db
+        self.upload_folder = upload_folder
+        self._lock = threading.Lock()
+        self._hashers = {}  # upload_id -> (offset, sha256 object)
+        self._busy = set()
+
+    def ensure_schema(self):
+        conn = self.db.connection()
+        conn.execute(UPLOADS_TABLE)
+        add_columns(conn, "uploads", [("profile", "TEXT")])
+
+    def part_path(self, filename):
+        return os.path.join(self.upload_folder, f"{filename}.part")
+
+    def _forget_expired(self):
+        """
+        Drops the running hashes of uploads that no longer have a row.
+        """
+        if not self._hashers:
+            return
+        live = {upload_id for (upload_id,) in self.db.execute("SELECT upload_id FROM uploads")}
+        for upload_id in list(self._hashers):
+            if upload_id not in live:
+                self._hashers.pop(upload_id, None)
+
+    def create(self, filename, size, sha256=None, profile=None):
+        self._forget_expired()
+        upload_id = uuid.uuid4().hex
+        now = time.time()
+        self.db.execute(
+            """
+            INSERT INTO uploads (upload_id, filename, size, sha256, profile, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (upload_id, filename, size, sha256, profile, now, now),
+        )
+        open(self.part_path(filename), "wb").close()
+        logging.info(f"Started resumable upload {upload_id} for {filename} ({size} bytes)")
+        return self.status(upload_id)
+
+    def _row(self, upload_id):
+        row = self.db.execute(
+            "SELECT filename, size, sha256, profile FROM uploads WHERE upload_id = ?", (upload_id,)
+        ).fetchone()
+        if row is None:
+            self._hashers.pop(upload_id, None)
+            raise UploadError("Unknown upload.", 404)
+        return row
+
+    def status(self, upload_id):
+        filename, size, _, profile = self._row(upload_id)
+        path = self.part_path(filename)
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        return {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "offset": offset,
+            "profile": profile,
+        }
+
+    def _hasher(self, upload_id, path, offset):
+        """
+        Returns the running hash of the first `offset` bytes, rehashing the
+        .part file if the in-memory state was lost (restart) or is stale.
+        """
+        state = self._hashers.get(upload_id)
+        if state is None or state[0] != offset:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                remaining = offset
+                while remaining:
+                    chunk = f.read(min(READ_BYTES, remaining))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+            state = (offset, digest)
+        return state[1]
+
+    def write(self, upload_id, offset, stream, length):
+        """
+        Appends `length` bytes read from `stream` at `offset`. Returns the upload
+        status; 'sha256' is added once the last byte has arrived and the
+        checksum given at creation, if any, matched.
+        """
+        filename, size, expected, _ = self._row(upload_id)
+        with self._lock:
+            if upload_id in self._busy:
+                raise UploadError("Another request is writing to this upload.", 409)
+            self._busy.add(upload_id)
+        try:
+            path = self.part_path(filename)
+            current = os.path.getsize(path)
+            if offset != current:
+                raise UploadError(f"Offset mismatch, upload is at {current}.", 409)
+            if length is None or offset + length > size:
+                raise UploadError("Chunk length missing or beyond the declared size.", 400)
+
+            digest = self._hasher(upload_id, path, offset)
+            written = 0
+            try:
+                with open(path, "ab") as f:
+                    while written < length:
+                        chunk = stream.read(min(READ_BYTES, length - written))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        digest.update(chunk)
+                        written += len(chunk)
+            finally:
+                # Whatever reached the file counts, so an interrupted chunk resumes there
+                self._hashers[upload_id] = (offset + written, digest)
+                self.db.execute(
+                    "UPDATE uploads SET updated_at = ? WHERE upload_id = ?", (time.time(), upload_id)
+                )
+
+            status = self.status(upload_id)
+            if status["offset"] == size:
+                content_hash = digest.hexdigest()
+                if expected and expected.lower() != content_hash:
+                    self.discard(upload_id)
+                    raise UploadError("Checksum mismatch, upload discarded.", 422)
+                status["sha256"] = content_hash
+            return status
+        finally:
+            with self._lock:
+                self._busy.discard(upload_id)
+
+    def finish(self, upload_id):
+        """
+        Forgets a completed upload. Call inside the transaction that queues it.
+        """
+        self._hashers.pop(upload_id, None)
+        self.db.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+
+    def discard(self, upload_id):
+        filename, _, _, _ = self._row(upload_id)
+        self._hashers.pop(upload_id, None)
+        self.db.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+        path = self.part_path(filename)
+        if os.path.exists(path):
+            os.remove(path)